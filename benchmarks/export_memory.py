@@ -0,0 +1,124 @@
+"""
+Пиковая память экспорта библиотеки.
+
+Для каждого размера библиотеки создаётся временная база, после чего экспорт
+выполняется в отдельном процессе тем же путём, что и /export_library:
+main._write_export пишет в SpooledTemporaryFile. Процесс сообщает пиковый
+RSS (ru_maxrss) и пик выделений Python (tracemalloc) за время экспорта.
+Базы открываются профилем хранения default, чтобы mmap и увеличенный кэш
+страниц SQLite не смешивались с памятью самого экспорта.
+
+Скрипт завершается с кодом 1, если пиковый RSS на самой большой библиотеке
+больше, чем на самой маленькой, более чем на --tolerance-mb.
+Запуск из корня проекта:
+
+    python -m benchmarks.export_memory [--books 100 1000 10000 100000] [--format txt] [--gzip]
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from booktracker.migrations import migrate
+
+
+def fill_library(conn, books):
+    series = max(1, books // 20)
+    authors = max(1, books // 10)
+    conn.executemany("INSERT INTO series (name) VALUES (?)", ((f"Серия {i}",) for i in range(series)))
+    conn.executemany("INSERT INTO authors (name) VALUES (?)", ((f"Автор {i}",) for i in range(authors)))
+    conn.executemany(
+        "INSERT INTO books (title, description, isbn, series_id, series_order) VALUES (?, ?, ?, ?, ?)",
+        ((f"Книга {i}", f"Описание книги {i}. " * 20, f"978{i:010d}", i % series + 1, i % 10 + 1)
+         for i in range(books)))
+    conn.executemany("INSERT INTO book_authors (book_id, author_id) VALUES (?, ?)",
+                     ((i + 1, i % authors + 1) for i in range(books)))
+    conn.commit()
+
+
+def child(path, fmt, compress):
+    """Экспорт в этом процессе; печатает JSON с замерами"""
+    logging.getLogger().setLevel(logging.WARNING)
+    import main
+    from booktracker.normalize import register_functions
+    from booktracker.storage import apply_profile
+
+    conn = register_functions(apply_profile(sqlite3.connect(path), "default"))
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    with tempfile.SpooledTemporaryFile(max_size=main.EXPORT_SPOOL_BYTES) as out:
+        count = main._write_export(conn, out, fmt, compress, datetime.now())
+        size = out.tell()
+    elapsed = time.perf_counter() - started
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "books": count, "bytes": size, "seconds": elapsed, "traced_peak": traced_peak,
+        "rss_before": before, "rss_peak": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def measure(books, fmt, compress):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        migrate(conn)
+        fill_library(conn, books)
+        conn.close()
+        command = [sys.executable, "-m", "benchmarks.export_memory", "--child", path, "--format", fmt]
+        if compress:
+            command.append("--gzip")
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        return json.loads(output.splitlines()[-1])
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def run(args):
+    print(f"формат {args.format}{' + gzip' if args.gzip else ''}\n")
+    print(f"{'книг':>8}{'файл, МБ':>10}{'время, с':>10}{'RSS, МБ':>10}{'+RSS, МБ':>10}{'Python, МБ':>12}")
+    peaks = []
+    for books in args.books:
+        r = measure(books, args.format, args.gzip)
+        # ru_maxrss в Linux — в КиБ
+        rss, grown = r["rss_peak"] / 1024, (r["rss_peak"] - r["rss_before"]) / 1024
+        peaks.append(rss)
+        print(f"{r['books']:>8}{r['bytes'] / 2 ** 20:>10.1f}{r['seconds']:>10.2f}{rss:>10.1f}{grown:>10.1f}"
+              f"{r['traced_peak'] / 2 ** 20:>12.2f}")
+
+    growth = peaks[-1] - peaks[0]
+    verdict = "в норме" if growth <= args.tolerance_mb else "ПРЕВЫШЕН"
+    print(f"\nрост пикового RSS от {args.books[0]} до {args.books[-1]} книг: {growth:.1f} МБ "
+          f"при допуске {args.tolerance_mb:.0f} МБ — {verdict}")
+    return growth <= args.tolerance_mb
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, nargs="+", default=[100, 1000, 10000, 100000],
+                        help="размеры библиотеки")
+    parser.add_argument("--format", default="txt", choices=("txt", "csv", "jsonl"))
+    parser.add_argument("--gzip", action="store_true", help="сжимать экспорт")
+    parser.add_argument("--tolerance-mb", type=float, default=10, help="допустимый рост пикового RSS")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.child:
+        child(args.child, args.format, args.gzip)
+        sys.exit(0)
+    sys.exit(0 if run(args) else 1)
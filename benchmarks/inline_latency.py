@@ -0,0 +1,175 @@
+"""
+Задержка ответа на inline-запросы.
+
+Во временной базе создаются книги (часть — с file_id обложки), после чего
+через обработчик main.inline_search прогоняются запросы так, как их
+присылает Telegram: по одному на каждое нажатие клавиши с интервалом
+--keystroke-ms. Задержка — время от прихода последнего запроса до вызова
+answer(); в неё входит пауза INLINE_DEBOUNCE_MS. Отдельно замеряется сам
+поиск без паузы: с пустым кэшем и повторно, из кэша.
+
+Скрипт завершается с кодом 1, если p95 задержки набора превышает --target-ms.
+Запуск из корня проекта:
+
+    python -m benchmarks.inline_latency [--books 10000] [--users 4] [--target-ms 250]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import main
+from booktracker.aiodb import AsyncDatabase
+from booktracker.cache import GenerationCache
+from booktracker.debounce import Debouncer
+from booktracker.migrations import migrate
+
+WORDS = ["дракон", "тайна", "город", "море", "звезда", "ветер", "сад", "остров", "тень", "путь",
+         "огонь", "лес", "север", "зима", "песня", "замок", "река", "ночь", "камень", "птица"]
+
+
+def fill_library(conn, books, seed=1):
+    rng = random.Random(seed)
+    for i in range(books // 10):
+        conn.execute("INSERT INTO authors (name) VALUES (?)", (f"Автор {i}",))
+    for i in range(books):
+        title = f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}"
+        file_id = f"file-{i}" if i % 3 == 0 else None
+        book_id = conn.execute(
+            "INSERT INTO books (title, description, cover_sha256, cover_file_id) VALUES (?, ?, ?, ?)",
+            (title, f"Описание {' '.join(rng.sample(WORDS, 5))}", file_id and f"sha-{i}", file_id)).lastrowid
+        conn.execute("INSERT INTO book_authors (book_id, author_id) VALUES (?, ?)", (book_id, i % (books // 10) + 1))
+    conn.commit()
+
+
+class Answer:
+    """Замена InlineQuery.answer: запоминает момент ответа"""
+
+    def __init__(self):
+        self.at = None
+        self.count = 0
+
+    async def __call__(self, results, **_kwargs):
+        self.at = time.perf_counter()
+        self.count = len(results)
+
+
+def inline_update(text, user_id):
+    return SimpleNamespace(inline_query=SimpleNamespace(query=text, answer=Answer()),
+                           effective_user=SimpleNamespace(id=user_id))
+
+
+async def type_query(context, text, user_id, keystroke):
+    """Набирает text по букве; возвращает задержку ответа на последний запрос, сек"""
+    updates = []
+    tasks = []
+    for length in range(1, len(text) + 1):
+        update = inline_update(text[:length], user_id)
+        update.arrived = time.perf_counter()
+        updates.append(update)
+        tasks.append(asyncio.ensure_future(main.inline_search(update, context)))
+        await asyncio.sleep(keystroke)
+    await asyncio.gather(*tasks)
+    last = updates[-1]
+    stale = sum(1 for update in updates[:-1] if update.inline_query.answer.at is not None)
+    return last.inline_query.answer.at - last.arrived, stale
+
+
+async def single_queries(context, queries, user_id):
+    timings = []
+    for text in queries:
+        update = inline_update(text, user_id)
+        started = time.perf_counter()
+        await main.inline_search(update, context)
+        timings.append(update.inline_query.answer.at - started)
+    return timings
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def report(name, timings):
+    ms = [t * 1000 for t in timings]
+    print(f"{name:<28}{statistics.median(ms):>10.1f}{percentile(ms, 95):>10.1f}{max(ms):>10.1f}")
+    return percentile(ms, 95)
+
+
+async def run(args):
+    # Отладочный вывод обработчиков искажает замеры
+    logging.getLogger().setLevel(logging.WARNING)
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    fill_library(conn, args.books)
+    conn.close()
+
+    db = AsyncDatabase(path, max_workers=args.workers, profile="tuned")
+    main.database = db
+    context = SimpleNamespace(user_data={}, conn=None, cursor=None)
+    users = list(range(1, args.users + 1))
+    main.ALLOWED_IDS.update(users)
+    rng = random.Random(args.seed)
+    queries = [f"{rng.choice(WORDS)} {rng.choice(WORDS)[:rng.randint(2, 5)]}" for _ in range(args.queries)]
+    try:
+        print(f"книг: {args.books}, INLINE_LIMIT={main.INLINE_LIMIT}, пауза {args.debounce_ms} мс, "
+              f"нажатие каждые {args.keystroke_ms} мс, пользователей: {args.users}\n")
+        print(f"{'':<28}{'p50, мс':>10}{'p95, мс':>10}{'max, мс':>10}")
+
+        main.inline_debouncer = Debouncer(0)
+        main.search_cache = GenerationCache(max_entries=0)
+        report("поиск без кэша", await single_queries(context, queries, users[0]))
+        main.search_cache = GenerationCache()
+        await single_queries(context, queries, users[0])
+        report("поиск из кэша", await single_queries(context, queries, users[0]))
+
+        main.search_cache = GenerationCache()
+        main.inline_debouncer = Debouncer(args.debounce_ms / 1000)
+        latencies = []
+        stale = 0
+        for start in range(0, len(queries), len(users)):
+            batch = queries[start:start + len(users)]
+            results = await asyncio.gather(*(type_query(context, text, user, args.keystroke_ms / 1000)
+                                             for text, user in zip(batch, users)))
+            latencies.extend(latency for latency, _ in results)
+            stale += sum(count for _, count in results)
+        p95 = report("набор (с паузой)", latencies)
+        print(f"\nотменено устаревших запросов: {main.inline_debouncer.cancelled}, "
+              f"ответов на устаревшие: {stale}, кэш: {main.search_cache.stats()}")
+    finally:
+        await db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+    target = args.target_ms if args.target_ms is not None else args.debounce_ms + 100
+    verdict = "в норме" if p95 <= target else "ПРЕВЫШЕНА"
+    print(f"p95 задержки набора {p95:.1f} мс при цели {target:.0f} мс — {verdict}")
+    return p95 <= target
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=10000, help="книг в базе")
+    parser.add_argument("--queries", type=int, default=200, help="запросов на каждый замер")
+    parser.add_argument("--users", type=int, default=4, help="пользователей, набирающих одновременно")
+    parser.add_argument("--workers", type=int, default=4, help="потоков пула базы")
+    parser.add_argument("--debounce-ms", type=int, default=main.INLINE_DEBOUNCE_MS, help="пауза перед поиском")
+    parser.add_argument("--keystroke-ms", type=int, default=60, help="интервал между нажатиями")
+    parser.add_argument("--target-ms", type=float,
+                        help="цель для p95 задержки набора (по умолчанию пауза + 100 мс)")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run(parse_args())) else 1)
@@ -0,0 +1,182 @@
+"""
+Сравнение профилей хранения SQLite на нагрузках из tests/test_performance.py.
+
+Для каждого профиля создаётся отдельная временная база, заполняется теми же
+данными, что и в тестах производительности, после чего замеряется время
+обработчиков бота. Запуск из корня проекта:
+
+    python -m benchmarks.storage_profiles [--repeat 5] [--profiles default tuned]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import main
+from booktracker.migrations import migrate
+from booktracker.storage import STORAGE_PROFILES, apply_profile, read_settings
+
+USER_ID = 12345
+
+
+def make_update(text=""):
+    message = MagicMock()
+    message.text = text
+    message.reply_text = AsyncMock(return_value=MagicMock(edit_text=AsyncMock()))
+    message.reply_photo = AsyncMock()
+    message.reply_document = AsyncMock()
+    user = SimpleNamespace(id=USER_ID)
+    return SimpleNamespace(message=message, effective_user=user, effective_chat=SimpleNamespace(id=USER_ID))
+
+
+def make_context(conn):
+    return SimpleNamespace(user_data={}, args=[], conn=conn, cursor=conn.cursor())
+
+
+# --- Наполнение базы (как в tests/test_performance.py) ---
+
+def fill_books(conn, count, with_statuses=False):
+    for i in range(count):
+        cur = conn.execute("INSERT INTO books (title, description) VALUES (?, ?)", (f"Книга {i}", f"Описание {i}"))
+        if with_statuses:
+            conn.execute("INSERT INTO user_books (user_id, book_id, status) VALUES (?, ?, ?)",
+                         (USER_ID, cur.lastrowid, "reading" if i % 2 == 0 else "finished"))
+    conn.commit()
+
+
+def fill_series(conn):
+    for i in range(50):
+        series_id = conn.execute("INSERT INTO series (name) VALUES (?)", (f"Серия {i}",)).lastrowid
+        for j in range(20):
+            conn.execute("INSERT INTO books (title, description, series_id, series_order) VALUES (?, ?, ?, ?)",
+                         (f"Книга {i}-{j}", f"Описание {i}-{j}", series_id, j + 1))
+    conn.commit()
+
+
+def fill_library(conn, books, series, authors):
+    for i in range(series):
+        conn.execute("INSERT INTO series (name) VALUES (?)", (f"Серия {i}",))
+    for i in range(authors):
+        conn.execute("INSERT INTO authors (name) VALUES (?)", (f"Автор {i}",))
+    for i in range(books):
+        book_id = conn.execute(
+            "INSERT INTO books (title, description, series_id, series_order) VALUES (?, ?, ?, ?)",
+            (f"Книга {i}", f"Описание {i}", (i % series) + 1, (i % 10) + 1)).lastrowid
+        conn.execute("INSERT INTO book_authors (book_id, author_id) VALUES (?, ?)", (book_id, (i % authors) + 1))
+        status = "reading" if i % 3 == 0 else "finished" if i % 3 == 1 else "planning"
+        conn.execute("INSERT INTO user_books (user_id, book_id, status) VALUES (?, ?, ?)", (USER_ID, book_id, status))
+    conn.commit()
+
+
+# --- Замеряемые действия ---
+
+async def run_handler(conn, handler, text=""):
+    await handler(make_update(text), make_context(conn))
+
+
+async def add_books(conn, count=100):
+    """Последовательное добавление книг: каждая — отдельная транзакция"""
+    start = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+    for i in range(count):
+        context = make_context(conn)
+        context.user_data['new_book'] = {
+            'title': f"Новая книга {start + i}", 'description': "Описание", 'image_blob': None,
+            'isbn': None, 'authors': [f"Автор {i % 10}"], 'series_id': None, 'series_order': None,
+        }
+        await main.finalize_book(make_update(), context)
+
+
+async def export_library(conn):
+    """Экспорт до готового файла: обработчик только ставит задание, ждём его завершения"""
+    await run_handler(conn, main.export_library)
+    await main.jobs.join()
+
+
+async def status_burst(conn, count=200):
+    """Серия смен статуса — по коммиту на каждое нажатие"""
+    statuses = ["📖 Читаю", "✅ Прочитано", "📋 Запланировано", "❌ Отменено"]
+    books = conn.execute("SELECT id, title FROM books ORDER BY id LIMIT ?", (count,)).fetchall()
+    for i, (book_id, title) in enumerate(books):
+        context = make_context(conn)
+        context.user_data['selected_book_id'] = book_id
+        context.user_data['selected_book'] = title
+        await main.status_select_status(make_update(statuses[i % 4]), context)
+
+
+WORKLOADS = [
+    ("list_books (100)", lambda c: fill_books(c, 100), lambda c: run_handler(c, main.list_books)),
+    ("search (1 000)", lambda c: fill_books(c, 1000), lambda c: run_handler(c, main.search_process, "Книга 500")),
+    ("search (10 000)", lambda c: fill_books(c, 10000), lambda c: run_handler(c, main.search_process, "книга 5000")),
+    ("my_books (500)", lambda c: fill_books(c, 500, with_statuses=True), lambda c: run_handler(c, main.my_books)),
+    ("list_series (50×20)", fill_series, lambda c: run_handler(c, main.list_series)),
+    ("statistics (1 000)", lambda c: fill_library(c, 1000, 20, 100), lambda c: run_handler(c, main.show_statistics)),
+    ("export (500)", lambda c: fill_library(c, 500, 10, 50), export_library),
+    ("add_books ×100", lambda c: None, add_books),
+    ("status_burst ×200", lambda c: fill_books(c, 200), status_burst),
+]
+
+
+class TemporaryDatabase:
+    """Временный файл базы с применённым профилем и схемой"""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def __enter__(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.conn = apply_profile(sqlite3.connect(self.path, check_same_thread=False), self.profile)
+        migrate(self.conn)
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.unlink(self.path + suffix)
+
+
+async def measure(profile, setup, action, repeat):
+    timings = []
+    for _ in range(repeat):
+        with TemporaryDatabase(profile) as conn:
+            setup(conn)
+            started = time.perf_counter()
+            await action(conn)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+async def run(profiles, repeat):
+    main.ALLOWED_IDS.add(USER_ID)
+    for profile in profiles:
+        with TemporaryDatabase(profile) as conn:
+            print(f"{profile}: {read_settings(conn)}")
+    print()
+    header = f"{'нагрузка':<22}" + "".join(f"{p + ', мс':>14}" for p in profiles)
+    if len(profiles) == 2:
+        header += f"{'ускорение':>12}"
+    print(header)
+    for name, setup, action in WORKLOADS:
+        results = [await measure(profile, setup, action, repeat) for profile in profiles]
+        line = f"{name:<22}" + "".join(f"{t * 1000:>14.1f}" for t in results)
+        if len(profiles) == 2:
+            line += f"{results[0] / results[1]:>11.2f}×"
+        print(line)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="повторов на нагрузку (берётся медиана)")
+    parser.add_argument("--profiles", nargs="+", default=["default", "tuned"], choices=sorted(STORAGE_PROFILES))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(run(args.profiles, args.repeat))
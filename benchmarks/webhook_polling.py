@@ -0,0 +1,239 @@
+"""
+Опрос getUpdates против вебхука: задержка и пропускная способность целиком.
+
+FakeTelegram — HTTP-сервер с теми методами Bot API, которые нужны боту
+(getMe, getUpdates, setWebhook, deleteWebhook, sendMessage). Бот собирается
+main.build_application() и ходит к нему через BOT_API_URL. --users
+пользователей шлют /start по кругу: следующее сообщение — после ответа на
+предыдущее. Задержка — от появления обновления в поддельном Telegram до
+прихода sendMessage с ответом.
+
+В режиме polling бот забирает обновления long-poll-запросами getUpdates, в
+режиме webhook поддельный Telegram сам отправляет их POST-ом на сервер
+вебхука PTB (Updater.start_webhook) по --connections соединениям keep-alive.
+Запуск из корня проекта:
+
+    python -m benchmarks.webhook_polling [--users 20] [--messages 50] [--connections 40]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import statistics
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import parse_qs
+
+import main
+
+SECRET = "benchmark-secret"
+
+HttpRequest = namedtuple("HttpRequest", "path body")
+
+
+async def read_request(reader):
+    """Один запрос бота к поддельному Telegram; None — соединение закрыто"""
+    line = await reader.readline()
+    if not line:
+        return None
+    _method, target, _version = line.decode("latin-1").split(" ", 2)
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length) if length else b""
+    return HttpRequest(target.split("?", 1)[0], body)
+
+
+def write_response(writer, body):
+    writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeTelegram:
+    """Поддельный сервер Bot API: выдаёт обновления и замеряет ответы бота"""
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.webhook = None  # (host, port, path), пока задан вебхук
+        self._updates = []
+        self._new_update = asyncio.Event()
+        self._next_id = 1
+        self._sent_at = {}  # chat_id → момент появления последнего обновления
+        self._replied = {}  # chat_id → future ответа бота
+        self._deliveries = None
+        self.latencies = []
+        self.port = None
+        self._server = None
+        self._clients = {}
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        # Будим висящие getUpdates и закрываем соединения бота
+        self._new_update.set()
+        tasks = list(self._clients.values())
+        for writer in list(self._clients):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def send(self, user_id, text):
+        """Сообщение пользователя; ждёт ответа бота"""
+        user = {"id": user_id, "is_bot": False, "first_name": f"Читатель {user_id}"}
+        update = {"update_id": self._next_id,
+                  "message": {"message_id": self._next_id, "date": int(time.time()), "text": text,
+                              "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+                              "chat": {"id": user_id, "type": "private"}, "from": user}}
+        self._next_id += 1
+        replied = asyncio.get_running_loop().create_future()
+        self._replied[user_id] = replied
+        self._sent_at[user_id] = time.perf_counter()
+        if self.webhook:
+            await self._deliveries.put(update)
+        else:
+            self._updates.append(update)
+            self._new_update.set()
+        await replied
+
+    async def start_deliveries(self):
+        """Соединения keep-alive к вебхуку, как у Telegram (до max_connections)"""
+        self._deliveries = asyncio.Queue()
+        return [asyncio.create_task(self._deliver()) for _ in range(self.connections)]
+
+    async def _deliver(self):
+        host, port, path = self.webhook
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while True:
+                body = json.dumps(await self._deliveries.get()).encode()
+                writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                              f"X-Telegram-Bot-Api-Secret-Token: {SECRET}\r\n"
+                              f"Content-Length: {len(body)}\r\n\r\n").encode() + body)
+                await reader.readline()
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+        finally:
+            writer.close()
+
+    async def _serve(self, reader, writer):
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                params = {key: values[0] for key, values in parse_qs(request.body.decode()).items()}
+                result = await self._call(request.path.rsplit("/", 1)[-1], params)
+                write_response(writer, json.dumps({"ok": True, "result": result}).encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _call(self, method, params):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "BookTracker", "username": "booktracker_bot"}
+        if method == "getUpdates":
+            offset = int(params.get("offset") or 0)
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            if not self._updates:
+                self._new_update.clear()
+                try:
+                    await asyncio.wait_for(self._new_update.wait(), float(params.get("timeout") or 0))
+                except asyncio.TimeoutError:
+                    pass
+            return self._updates
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            self.latencies.append(time.perf_counter() - self._sent_at[chat_id])
+            replied = self._replied.pop(chat_id, None)
+            if replied is not None and not replied.done():
+                replied.set_result(None)
+            return {"message_id": 1, "date": int(time.time()), "text": params.get("text", ""),
+                    "chat": {"id": chat_id, "type": "private"}}
+        return True  # setWebhook, deleteWebhook и прочее
+
+
+async def conversation(telegram, user_id, messages):
+    for _ in range(messages):
+        await telegram.send(user_id, "/start")
+
+
+async def measure(mode, args):
+    telegram = FakeTelegram(args.connections)
+    await telegram.start()
+    main.BOT_API_URL = f"http://127.0.0.1:{telegram.port}"
+    app = main.build_application()
+    deliveries = None
+    await app.initialize()
+    try:
+        if mode == "webhook":
+            port = free_port()
+            await app.updater.start_webhook(listen="127.0.0.1", port=port, url_path="hook", secret_token=SECRET,
+                                            webhook_url=f"http://127.0.0.1:{port}/hook")
+            telegram.webhook = ("127.0.0.1", port, "/hook")
+            deliveries = await telegram.start_deliveries()
+        else:
+            await app.updater.start_polling(poll_interval=0, timeout=10)
+        await app.start()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(conversation(telegram, user_id, args.messages)
+                               for user_id in range(1, args.users + 1)))
+        elapsed = time.perf_counter() - started
+    finally:
+        for task in deliveries or ():
+            task.cancel()
+        if app.updater.running:
+            await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        await telegram.stop()
+    return telegram.latencies, elapsed
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def run(args):
+    # Отладочный вывод обработчиков и httpx искажает замеры
+    logging.getLogger().setLevel(logging.WARNING)
+    main.ALLOWED_IDS.update(range(1, args.users + 1))
+    print(f"пользователей: {args.users}, сообщений от каждого: {args.messages}, "
+          f"соединений вебхука: {args.connections}\n")
+    print(f"{'':<10}{'p50, мс':>10}{'p95, мс':>10}{'max, мс':>10}{'обн./с':>10}")
+    for mode in args.modes:
+        latencies, elapsed = await measure(mode, args)
+        ms = [t * 1000 for t in latencies]
+        print(f"{mode:<10}{statistics.median(ms):>10.1f}{percentile(ms, 95):>10.1f}{max(ms):>10.1f}"
+              f"{len(ms) / elapsed:>10.0f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20, help="пользователей, пишущих одновременно")
+    parser.add_argument("--messages", type=int, default=50, help="сообщений от каждого пользователя")
+    parser.add_argument("--connections", type=int, default=main.WEBHOOK_MAX_CONNECTIONS,
+                        help="соединений поддельного Telegram к вебхуку")
+    parser.add_argument("--modes", nargs="+", choices=("polling", "webhook"), default=["polling", "webhook"])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
@@ -0,0 +1,147 @@
+"""
+Асинхронный слой доступа к SQLite.
+
+Все запросы выполняются в небольшом выделенном пуле потоков, у каждого
+потока — собственное подключение к базе. Обработчики только ждут результат
+и не блокируют цикл событий. Изменения данных идут через единственного
+писателя с групповой фиксацией (см. booktracker.writer).
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from booktracker.normalize import register_functions
+from booktracker.storage import apply_profile
+from booktracker.writer import GroupCommitWriter
+
+logger = logging.getLogger(__name__)
+
+
+def _fetchall(conn, sql, params):
+    cur = conn.execute(sql, params)
+    try:
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+def _fetchone(conn, sql, params):
+    cur = conn.execute(sql, params)
+    try:
+        return cur.fetchone()
+    finally:
+        cur.close()
+
+
+def _transaction(conn, fn, args):
+    """Выполняет fn(cursor, *args) в одной транзакции"""
+    cur = conn.cursor()
+    try:
+        result = fn(cur, *args)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+class AsyncDatabase:
+    """Пул потоков для чтения (своё подключение в каждом потоке) и единственный писатель"""
+
+    def __init__(self, path, max_workers=4, timeout=5.0, write_batch_size=64, write_max_wait_ms=5,
+                 profile="default"):
+        self.path = path
+        self.timeout = timeout
+        self.profile = profile
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="booktracker-db")
+        self.writer = GroupCommitWriter(self.connect, max_batch=write_batch_size, max_wait_ms=write_max_wait_ms)
+
+    def connect(self):
+        """Открывает новое подключение (вызывается один раз в каждом потоке пула)"""
+        # check_same_thread=False нужен только для закрытия подключений из close()
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        return register_functions(apply_profile(conn, self.profile))
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn, args):
+        return fn(self._connection(), *args)
+
+    async def run(self, fn, *args):
+        """Выполняет fn(conn, *args) в потоке пула и возвращает результат"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    async def fetchall(self, sql, params=()):
+        return await self.run(_fetchall, sql, params)
+
+    async def fetchone(self, sql, params=()):
+        return await self.run(_fetchone, sql, params)
+
+    async def transaction(self, fn, *args):
+        """Ставит изменение fn(cursor, *args) в очередь писателя; откат — только этого изменения"""
+        return await self.writer.submit(fn, *args)
+
+    @property
+    def generation(self):
+        """Поколение данных: меняется после каждой зафиксированной записи"""
+        return self.writer.generation
+
+    async def close(self):
+        await self.writer.close()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+class ConnectionDatabase:
+    """Тот же интерфейс поверх уже открытого подключения (context.conn в тестах и скриптах)"""
+
+    # В чужое подключение можно писать мимо transaction(), поэтому изменения
+    # не отслеживаются и кэши результатов для него не используются
+    generation = None
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def run(self, fn, *args):
+        return fn(self.conn, *args)
+
+    async def fetchall(self, sql, params=()):
+        return _fetchall(self.conn, sql, params)
+
+    async def fetchone(self, sql, params=()):
+        return _fetchone(self.conn, sql, params)
+
+    async def transaction(self, fn, *args):
+        return _transaction(self.conn, fn, args)
+
+    async def close(self):
+        pass
+
+
+def from_context(context, default):
+    """Возвращает базу для обработчика: подключение из context.conn/context.cursor или общий пул"""
+    db_conn = getattr(context, 'conn', None)
+    if isinstance(db_conn, sqlite3.Connection):
+        return ConnectionDatabase(db_conn)
+    cur = getattr(context, 'cursor', None)
+    if isinstance(cur, sqlite3.Cursor):
+        return ConnectionDatabase(cur.connection)
+    return default
@@ -0,0 +1,38 @@
+"""
+Готовая строка авторов книги.
+
+books.authors_display хранит «Автор 1, Автор 2» в порядке, в котором авторы
+были указаны, чтобы списки, поиск, карточка книги и экспорт читали одну
+таблицу books вместо JOIN book_authors и authors с GROUP_CONCAT. Колонку
+пересчитывают триггеры на book_authors (добавление и удаление связи) и на
+authors (переименование и удаление автора), так что обработчикам ничего
+делать не нужно; JOIN остаётся только на пути записи.
+"""
+
+# Строка авторов книги с id {book_id}; порядок — порядок добавления связей
+AUTHORS_DISPLAY = """(SELECT GROUP_CONCAT(name, ', ') FROM (
+    SELECT a.name FROM book_authors ba JOIN authors a ON a.id = ba.author_id
+    WHERE ba.book_id = {book_id} ORDER BY ba.rowid))"""
+
+
+def _refresh(where_books):
+    return (f"UPDATE books SET authors_display = {AUTHORS_DISPLAY.format(book_id='books.id')} "
+            f"WHERE id IN ({where_books});")
+
+
+AUTHORS_DISPLAY_TRIGGERS = {
+    "book_authors_display_ai": "AFTER INSERT ON book_authors BEGIN " + _refresh("NEW.book_id") + " END",
+    "book_authors_display_ad": "AFTER DELETE ON book_authors BEGIN " + _refresh("OLD.book_id") + " END",
+    "authors_display_au": ("AFTER UPDATE OF name ON authors BEGIN "
+                           + _refresh("SELECT book_id FROM book_authors WHERE author_id = NEW.id") + " END"),
+    "authors_display_ad": ("AFTER DELETE ON authors BEGIN "
+                           + _refresh("SELECT book_id FROM book_authors WHERE author_id = OLD.id") + " END"),
+}
+
+
+def add_authors_display(cur):
+    """Шаг миграции: колонка books.authors_display, её заполнение и триггеры"""
+    cur.execute("ALTER TABLE books ADD COLUMN authors_display TEXT")
+    cur.execute(f"UPDATE books SET authors_display = {AUTHORS_DISPLAY.format(book_id='books.id')}")
+    for name, body in AUTHORS_DISPLAY_TRIGGERS.items():
+        cur.execute(f"CREATE TRIGGER {name} {body}")
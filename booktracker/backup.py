@@ -0,0 +1,133 @@
+"""
+Снимок работающей базы через online backup API SQLite.
+
+Простое копирование books.db при открытых подключениях может дать
+рваный файл: часть страниц до записи, часть после, плюс незафиксированный
+WAL. sqlite3.Connection.backup копирует базу по BACKUP_PAGES_PER_STEP
+страниц за шаг и между шагами отпускает блокировку, поэтому писатели
+(finalize_book, смена статуса) ждут не дольше одного шага. Если базу
+изменило другое подключение, SQLite сам начинает копирование заново, так
+что снимок всегда согласован.
+
+Писатель бота фиксирует пачки постоянно, и под ровной нагрузкой такое
+копирование может начинаться заново бесконечно. Поэтому перезапусков
+допускается не больше BACKUP_MAX_RESTARTS, после чего снимок снимается
+VACUUM INTO: он читает базу одной транзакцией чтения, в WAL не мешает
+писателю и не зависит от его записей (но держит снимок WAL до конца
+копирования и не даёт контрольной точке его освободить).
+
+По желанию снимок сжимается VACUUM INTO (из копии, а не из рабочей базы)
+и упаковывается в gzip. Из командной строки:
+
+    python -m booktracker.backup books.db backup.db [--compact] [--gzip] [--pages 64]
+"""
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Страниц за шаг копирования: чем меньше, тем короче блокировка для писателей
+BACKUP_PAGES_PER_STEP = 64
+
+# Пауза перед повтором шага, если база занята, сек
+BACKUP_RETRY_SLEEP = 0.05
+
+# Сколько раз копирование по шагам может начаться заново из-за чужой записи
+BACKUP_MAX_RESTARTS = 3
+
+
+class TooManyRestarts(Exception):
+    """Копирование по шагам всё время начинается заново"""
+
+
+def snapshot(conn, path, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_RETRY_SLEEP,
+             max_restarts=BACKUP_MAX_RESTARTS, progress=None):
+    """Копирует базу подключения conn в файл path; возвращает число скопированных страниц.
+
+    progress(status, remaining, total) вызывается после каждого шага, как в Connection.backup.
+    """
+    copied = []
+    remaining_before = [None]
+    restarts = [0]
+
+    def on_step(status, remaining, total):
+        copied.append(total)
+        # Перезапуск: осталось не меньше, чем после прошлого шага
+        if remaining_before[0] is not None and remaining >= remaining_before[0]:
+            restarts[0] += 1
+            if restarts[0] > max_restarts:
+                raise TooManyRestarts(f"перезапусков: {restarts[0]}")
+        remaining_before[0] = remaining
+        if progress is not None:
+            progress(status, remaining, total)
+
+    target = sqlite3.connect(path)
+    try:
+        try:
+            conn.backup(target, pages=pages, sleep=sleep, progress=on_step)
+        except TooManyRestarts as e:
+            logger.warning(f"Снимок по шагам не успевает за записью ({e}) — копирую через VACUUM INTO")
+            target.close()
+            os.unlink(path)
+            conn.execute("VACUUM INTO ?", (path,))
+            target = sqlite3.connect(path)
+            copied.append(target.execute("PRAGMA page_count").fetchone()[0])
+        # Снимок рабочей базы в WAL тоже помечен как WAL; отдаём самодостаточный файл без -wal
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+    return copied[-1] if copied else 0
+
+
+def compact(path, compacted_path):
+    """VACUUM INTO: сжатая копия без свободных страниц"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("VACUUM INTO ?", (compacted_path,))
+    finally:
+        conn.close()
+
+
+def gzip_file(path, gz_path):
+    with open(path, "rb") as source, gzip.open(gz_path, "wb") as target:
+        shutil.copyfileobj(source, target)
+
+
+def make_backup(conn, path, compacted=False, compressed=False, pages=BACKUP_PAGES_PER_STEP):
+    """Снимок базы conn в path (с суффиксом .gz при compressed); возвращает путь к итоговому файлу"""
+    raw = path + ".raw" if compacted or compressed else path
+    copied = snapshot(conn, raw, pages)
+    logger.info(f"Снимок базы: {copied} страниц по {pages} за шаг")
+    if compacted:
+        packed = path + ".packed" if compressed else path
+        compact(raw, packed)
+        os.unlink(raw)
+        raw = packed
+    if compressed:
+        path += ".gz"
+        gzip_file(raw, path)
+        os.unlink(raw)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Снимок базы книг без остановки бота")
+    parser.add_argument("source", nargs="?", default="books.db", help="рабочая база")
+    parser.add_argument("target", help="файл снимка")
+    parser.add_argument("--compact", action="store_true", help="сжать снимок VACUUM INTO")
+    parser.add_argument("--gzip", action="store_true", help="упаковать снимок в gzip (к имени добавится .gz)")
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP, help="страниц за шаг")
+    args = parser.parse_args()
+
+    source = sqlite3.connect(args.source)
+    try:
+        result = make_backup(source, args.target, args.compact, args.gzip, args.pages)
+    finally:
+        source.close()
+    print(f"Снимок сохранён: {result} ({os.path.getsize(result)} байт)")
@@ -0,0 +1,63 @@
+"""
+Кэш результатов чтения в памяти процесса.
+
+Записи вытесняются по LRU при превышении max_entries и живут не дольше
+ttl секунд. Кроме того, каждое значение привязано к поколению данных —
+счётчику зафиксированных изменений (GroupCommitWriter.generation). Как
+только поколение меняется, весь кэш сбрасывается, поэтому после добавления,
+правки или удаления книги устаревший результат не вернётся.
+"""
+import time
+from collections import OrderedDict
+
+
+class GenerationCache:
+    """LRU-кэш с TTL, сбрасываемый при смене поколения данных"""
+
+    def __init__(self, max_entries=256, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self, generation):
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key, generation):
+        """Возвращает (True, значение) при попадании или (False, None)"""
+        self._sync(generation)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value, generation):
+        """Запоминает значение, прочитанное при поколении generation"""
+        if self._generation is not None and generation < self._generation:
+            # Пока шёл запрос, данные изменились — результат мог устареть
+            return
+        self._sync(generation)
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,140 @@
+"""
+Материализованные счётчики библиотеки.
+
+Таблица counters хранит итоги, которые раньше пересчитывались COUNT(*)
+и GROUP BY при каждом вызове статистики и экспорта:
+
+* ('total', 0, 'books' | 'series' | 'authors') — всего книг, серий, авторов;
+* ('author', id автора, '') — книг у автора;
+* ('series', id серии, '') — книг в серии;
+* ('status', id пользователя, статус) — книг пользователя в каждом статусе.
+
+Счётчики меняют триггеры на books, series, authors, book_authors и
+user_books, поэтому чтение — поиск по первичному ключу, а топ авторов и
+серий — несколько строк из индекса (kind, value). Если счётчики разошлись
+с данными (например, после правки базы вручную с отключёнными триггерами),
+verify_counters покажет расхождения, а rebuild_counters пересчитает всё:
+
+    python -m booktracker.counters [books.db] [--repair]
+"""
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def _bump(kind, owner, key, delta, condition="1"):
+    """SQL: прибавляет delta к счётчику, создавая его при необходимости"""
+    return (f"INSERT INTO counters (kind, owner, key, value) SELECT '{kind}', {owner}, {key}, {delta} "
+            f"WHERE {condition} ON CONFLICT (kind, owner, key) DO UPDATE SET value = value + excluded.value;")
+
+
+def _drop(kind, owner):
+    return f"DELETE FROM counters WHERE kind = '{kind}' AND owner = {owner};"
+
+
+COUNTER_TRIGGERS = {
+    "books_counters_ai": ("AFTER INSERT ON books BEGIN "
+                          + _bump("total", 0, "'books'", 1)
+                          + _bump("series", "NEW.series_id", "''", 1, "NEW.series_id IS NOT NULL")
+                          + " END"),
+    "books_counters_ad": ("AFTER DELETE ON books BEGIN "
+                          + _bump("total", 0, "'books'", -1)
+                          + _bump("series", "OLD.series_id", "''", -1, "OLD.series_id IS NOT NULL")
+                          + " END"),
+    "books_counters_au": ("AFTER UPDATE OF series_id ON books "
+                          "WHEN OLD.series_id IS NOT NEW.series_id BEGIN "
+                          + _bump("series", "OLD.series_id", "''", -1, "OLD.series_id IS NOT NULL")
+                          + _bump("series", "NEW.series_id", "''", 1, "NEW.series_id IS NOT NULL")
+                          + " END"),
+    "series_counters_ai": "AFTER INSERT ON series BEGIN " + _bump("total", 0, "'series'", 1) + " END",
+    "series_counters_ad": ("AFTER DELETE ON series BEGIN "
+                           + _bump("total", 0, "'series'", -1) + _drop("series", "OLD.id") + " END"),
+    "authors_counters_ai": "AFTER INSERT ON authors BEGIN " + _bump("total", 0, "'authors'", 1) + " END",
+    "authors_counters_ad": ("AFTER DELETE ON authors BEGIN "
+                            + _bump("total", 0, "'authors'", -1) + _drop("author", "OLD.id") + " END"),
+    "book_authors_counters_ai": ("AFTER INSERT ON book_authors BEGIN "
+                                 + _bump("author", "NEW.author_id", "''", 1) + " END"),
+    "book_authors_counters_ad": ("AFTER DELETE ON book_authors BEGIN "
+                                 + _bump("author", "OLD.author_id", "''", -1) + " END"),
+    "user_books_counters_ai": ("AFTER INSERT ON user_books BEGIN "
+                               + _bump("status", "NEW.user_id", "NEW.status", 1) + " END"),
+    "user_books_counters_ad": ("AFTER DELETE ON user_books BEGIN "
+                               + _bump("status", "OLD.user_id", "OLD.status", -1) + " END"),
+    "user_books_counters_au": ("AFTER UPDATE OF user_id, status ON user_books BEGIN "
+                               + _bump("status", "OLD.user_id", "OLD.status", -1)
+                               + _bump("status", "NEW.user_id", "NEW.status", 1) + " END"),
+}
+
+# Фактические значения счётчиков, посчитанные по данным
+_ACTUAL = """
+    SELECT 'total', 0, 'books', COUNT(*) FROM books
+    UNION ALL SELECT 'total', 0, 'series', COUNT(*) FROM series
+    UNION ALL SELECT 'total', 0, 'authors', COUNT(*) FROM authors
+    UNION ALL SELECT 'author', author_id, '', COUNT(*) FROM book_authors GROUP BY author_id
+    UNION ALL SELECT 'series', series_id, '', COUNT(*) FROM books WHERE series_id IS NOT NULL GROUP BY series_id
+    UNION ALL SELECT 'status', user_id, status, COUNT(*) FROM user_books GROUP BY user_id, status
+"""
+
+
+def create_counters(cur):
+    """Шаг миграции: таблица счётчиков, индекс для топов, триггеры и начальные значения"""
+    cur.execute("""
+        CREATE TABLE counters (
+            kind TEXT NOT NULL,
+            owner INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (kind, owner, key)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX idx_counters_top ON counters(kind, value)")
+    for name, body in COUNTER_TRIGGERS.items():
+        cur.execute(f"CREATE TRIGGER {name} {body}")
+    rebuild_counters(cur)
+
+
+def rebuild_counters(cur):
+    """Пересчитывает все счётчики по данным"""
+    cur.execute("DELETE FROM counters")
+    cur.execute(f"INSERT INTO counters (kind, owner, key, value) {_ACTUAL}")
+
+
+def verify_counters(conn):
+    """Возвращает расхождения [(kind, owner, key, хранится, фактически)]; пустой список — всё верно"""
+    stored = {row[:3]: row[3] for row in conn.execute("SELECT kind, owner, key, value FROM counters")}
+    actual = {row[:3]: row[3] for row in conn.execute(_ACTUAL)}
+    drift = []
+    for counter in sorted(stored.keys() | actual.keys(), key=str):
+        if stored.get(counter, 0) != actual.get(counter, 0):
+            drift.append((*counter, stored.get(counter, 0), actual.get(counter, 0)))
+    return drift
+
+
+def repair_counters(cur):
+    """Проверяет счётчики и при расхождениях пересчитывает их; возвращает найденные расхождения"""
+    drift = verify_counters(cur.connection)
+    if drift:
+        logger.warning(f"Счётчики разошлись с данными ({len(drift)}), пересчитываем")
+        rebuild_counters(cur)
+    return drift
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    conn = sqlite3.connect(args[0] if args else "books.db")
+    try:
+        if "--repair" in sys.argv:
+            with conn:
+                drift = repair_counters(conn.cursor())
+        else:
+            drift = verify_counters(conn)
+    finally:
+        conn.close()
+    for kind, owner, key, stored, actual in drift:
+        print(f"{kind}:{owner}:{key} — хранится {stored}, фактически {actual}")
+    print("Расхождений нет" if not drift else f"Расхождений: {len(drift)}")
+    sys.exit(1 if drift and "--repair" not in sys.argv else 0)
@@ -0,0 +1,103 @@
+"""
+Хранилище обложек на диске, адресуемое по содержимому.
+
+Каждая обложка лежит в отдельном файле <каталог>/<2 символа>/<sha256>,
+где sha256 — хеш её байтов; в books хранится только ссылка cover_sha256.
+Сканы books (списки, поиск, группировки) больше не читают страницы
+переполнения с картинками, а одинаковые загрузки хранятся один раз.
+
+По умолчанию каталог covers/ находится рядом с файлом базы, его можно
+переопределить переменной окружения COVERS_DIR.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+def cover_key(data):
+    """Ключ обложки — SHA-256 от её байтов"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def default_covers_dir(db_path):
+    """Каталог обложек для базы: COVERS_DIR или covers/ рядом с файлом базы"""
+    return os.getenv("COVERS_DIR") or os.path.join(os.path.dirname(os.path.abspath(db_path)), "covers")
+
+
+class CoverStore:
+    """Каталог с файлами обложек, имя файла — SHA-256 содержимого"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def put(self, data):
+        """Сохраняет обложку, если такой ещё нет, и возвращает её ключ; для пустых данных — None"""
+        if not data:
+            return None
+        key = cover_key(data)
+        path = self.path(key)
+        if os.path.exists(path):
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Пишем во временный файл и атомарно переименовываем: читатель не увидит половину файла
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return key
+
+    def get(self, key):
+        """Возвращает байты обложки по ключу или None, если файла нет"""
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.warning(f"Файл обложки {key} не найден")
+            return None
+
+    def delete_if_unused(self, cur, key):
+        """Удаляет файл обложки, если на неё больше не ссылается ни одна книга.
+
+        Вызывается только из задания писателя, снявшего ссылку: проверка и
+        удаление не пересекаются с другими записями. Файл, который put успел
+        найти до удаления, задание вставки книги пишет заново (см. _insert_book).
+        """
+        if key is None:
+            return False
+        if cur.execute("SELECT 1 FROM books WHERE cover_sha256 = ? LIMIT 1", (key,)).fetchone():
+            return False
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+
+def move_inline_covers(cur):
+    """Шаг миграции: переносит books.image_blob в файлы хранилища и проставляет ссылки"""
+    db_path = next((row[2] for row in cur.execute("PRAGMA database_list") if row[1] == "main"), "")
+    if not db_path:
+        # База в памяти: переносить некуда, обложки таких баз не сохраняются
+        return
+    store = CoverStore(default_covers_dir(db_path))
+    source = cur.connection.execute("SELECT id, image_blob FROM books WHERE image_blob IS NOT NULL")
+    moved = 0
+    while True:
+        rows = source.fetchmany(100)
+        if not rows:
+            break
+        for book_id, data in rows:
+            cur.execute("UPDATE books SET cover_sha256 = ? WHERE id = ?", (store.put(data), book_id))
+            moved += 1
+    source.close()
+    logger.info(f"Перенесено обложек в {store.root}: {moved}")
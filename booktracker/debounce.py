@@ -0,0 +1,48 @@
+"""
+Подавление устаревших запросов.
+
+Telegram присылает inline-запрос на каждое нажатие клавиши, и отвечать на
+все промежуточные варианты бессмысленно: пользователь увидит только ответ
+на последний. Debouncer выдерживает короткую паузу перед выполнением и
+отменяет ожидающий или уже выполняющийся вызов, как только с тем же ключом
+(обычно id пользователя) приходит новый.
+"""
+import asyncio
+
+
+class Debouncer:
+    """Для каждого ключа выполняет только самый свежий вызов"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._tasks = {}
+        self.cancelled = 0
+
+    async def _delayed(self, func, args, kwargs):
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+        return await func(*args, **kwargs)
+
+    async def run(self, key, func, *args, **kwargs):
+        """Выполняет func(*args, **kwargs) после паузы delay.
+
+        Возвращает (True, результат) или (False, None), если вызов отменён более новым.
+        """
+        previous = self._tasks.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.cancelled += 1
+        task = asyncio.ensure_future(self._delayed(func, args, kwargs))
+        self._tasks[key] = task
+        try:
+            # wait, в отличие от await task, не отменяет task при отмене вызывающего
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if task.cancelled():
+            return False, None
+        return True, task.result()
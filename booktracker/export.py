@@ -0,0 +1,120 @@
+"""
+Потоковый экспорт библиотеки в TXT, CSV и JSON Lines, по желанию — в gzip.
+
+Книги читаются курсором порциями по EXPORT_BATCH строк (fetchmany), каждая
+строка сразу превращается в текст генератором формата и пишется в файл,
+поэтому в памяти одновременно находится одна порция, а не вся библиотека
+или весь текст файла. Обработчик передаёт сюда SpooledTemporaryFile:
+небольшой экспорт остаётся в памяти, большой уходит на диск.
+"""
+import csv
+import gzip
+import io
+import json
+
+# Строк, читаемых из курсора за раз
+EXPORT_BATCH = 500
+
+FORMATS = ("txt", "csv", "jsonl")
+
+# Описание книги в TXT обрезается до этой длины; CSV и JSON Lines содержат его целиком
+TXT_DESCRIPTION_LIMIT = 200
+
+EXPORT_QUERY = """
+    SELECT b.title, b.description, b.isbn, b.series_order,
+           s.name as series_name, b.authors_display
+    FROM books b
+    LEFT JOIN series s ON b.series_id = s.id
+    ORDER BY b.title_sort
+"""
+
+# Колонки CSV и ключи JSON Lines
+FIELDS = ("title", "authors", "series", "series_order", "isbn", "description")
+
+
+def iter_books(conn, batch=EXPORT_BATCH):
+    """Книги в порядке title_sort: (title, description, isbn, series_order, series_name, authors)"""
+    cur = conn.execute(EXPORT_QUERY)
+    try:
+        while rows := cur.fetchmany(batch):
+            yield from rows
+    finally:
+        cur.close()
+
+
+def txt_lines(books, totals, exported_at):
+    """Текстовый отчёт: нумерованные книги и статистика в конце"""
+    yield "📚 МОЯ БИБЛИОТЕКА\n" + "=" * 50 + "\n\n"
+    for i, (title, description, isbn, series_order, series_name, authors) in enumerate(books, 1):
+        lines = [f"{i}. {title}\n"]
+        if authors:
+            lines.append(f"   Авторы: {authors}\n")
+        if series_name:
+            lines.append(f"   Серия: {series_name}" + (f" (книга {series_order})" if series_order else "") + "\n")
+        if isbn:
+            lines.append(f"   ISBN: {isbn}\n")
+        if description:
+            if len(description) > TXT_DESCRIPTION_LIMIT:
+                description = description[:TXT_DESCRIPTION_LIMIT] + "..."
+            lines.append(f"   Описание: {description}\n")
+        lines.append("\n")
+        yield "".join(lines)
+
+    total_books, total_series, total_authors = totals
+    yield ("=" * 50 + "\n📊 СТАТИСТИКА\n"
+           f"Всего книг: {total_books}\nСерий: {total_series}\nАвторов: {total_authors}\n"
+           f"Дата экспорта: {exported_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+
+class _Line:
+    """«Файл» для csv.writer: writerow возвращает готовую строку вместо записи"""
+
+    def write(self, text):
+        return text
+
+
+def csv_lines(books, _totals, _exported_at):
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for title, description, isbn, series_order, series_name, authors in books:
+        yield writer.writerow((title, authors, series_name, series_order, isbn, description))
+
+
+def jsonl_lines(books, _totals, _exported_at):
+    for title, description, isbn, series_order, series_name, authors in books:
+        yield json.dumps(dict(zip(FIELDS, (title, authors, series_name, series_order, isbn, description))),
+                         ensure_ascii=False) + "\n"
+
+
+_WRITERS = {"txt": txt_lines, "csv": csv_lines, "jsonl": jsonl_lines}
+
+
+def export_filename(fmt, compress, exported_at):
+    name = f"library_export_{exported_at.strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return name + ".gz" if compress else name
+
+
+def write_export(conn, out, fmt, compress, totals, exported_at):
+    """Пишет экспорт в двоичный файл out; возвращает число книг.
+
+    totals — (книг, серий, авторов) для статистики TXT. out остаётся открытым.
+    """
+    counted = [0]
+
+    def counting(books):
+        for book in books:
+            counted[0] += 1
+            yield book
+
+    raw = gzip.GzipFile(fileobj=out, mode="wb") if compress else out
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    try:
+        for chunk in _WRITERS[fmt](counting(iter_books(conn)), totals, exported_at):
+            text.write(chunk)
+        text.flush()
+    finally:
+        # Отсоединяем обёртку, чтобы её закрытие не закрыло out
+        text.detach()
+        if compress:
+            raw.close()
+    return counted[0]
@@ -0,0 +1,212 @@
+"""
+Массовый импорт книг из CSV, JSON Lines и экспорта Goodreads.
+
+Файл читается потоком: csv.DictReader и построчный разбор JSON Lines
+отдают по одной записи, обработчик забирает их порциями по IMPORT_BATCH и
+каждую порцию записывает одним заданием писателя (import_batch). Внутри
+порции всё делается пакетно: дубликаты ищутся одним IN (…) по title_norm,
+недостающие авторы и серии добавляются resolve_names (executemany и один
+IN (…) за id) и запоминаются в словаре на весь импорт (следующие порции их
+уже не ищут), книги, связи с авторами и статусы — тоже executemany.
+
+Поддерживаемые файлы:
+
+* CSV экспорта бота (/export_library csv): title, authors, series,
+  series_order, isbn, description; необязательная колонка status;
+* JSON Lines с теми же ключами, authors — строка «А, Б» или список;
+* CSV экспорта Goodreads (колонки Book Id, Title, Author, …): серия
+  берётся из названия «Книга (Серия, #2)», статус — из Exclusive Shelf.
+"""
+import csv
+import io
+import json
+import re
+from collections import namedtuple
+
+from booktracker.names import resolve_names
+from booktracker.normalize import normalize
+
+# Записей в одном задании писателя (и между обновлениями прогресса)
+IMPORT_BATCH = 500
+
+STATUSES = ("planning", "reading", "finished", "cancelled")
+
+# Полка Goodreads → статус
+GOODREADS_SHELVES = {"read": "finished", "currently-reading": "reading", "to-read": "planning"}
+
+# «Название (Серия, #3)» в колонке Title экспорта Goodreads
+_GOODREADS_SERIES = re.compile(r"^(?P<title>.*?)\s*\((?P<series>[^()]*?),?\s*#(?P<order>[\d.]+)\)$")
+
+# Поля записи в CSV и JSON Lines бота (как в /export_library csv и jsonl) и необязательный статус
+FIELDS = ("title", "authors", "series", "series_order", "isbn", "description", "status")
+
+# Книга из файла; line — номер строки для сообщений об ошибках
+Record = namedtuple("Record", "line title authors series series_order isbn description status")
+
+
+class ImportFormatError(ValueError):
+    """Файл не похож ни на один поддерживаемый формат"""
+
+
+def _split_authors(value):
+    if isinstance(value, list):
+        return [str(name).strip() for name in value if str(name).strip()]
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def _order(value):
+    """Номер в серии: целое число или None; дробные номера Goodreads (1.5) не сохраняются"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if not value.isdigit():
+        raise ValueError(f"номер в серии «{value}» — не целое число")
+    return int(value)
+
+
+def _record(line, title, authors=None, series=None, series_order=None, isbn=None, description=None,
+            status=None):
+    """Запись из полей файла; ValueError — строку нужно пропустить"""
+    title = (title or "").strip()
+    if not title:
+        raise ValueError("нет названия")
+    status = (status or "").strip() or None
+    if status is not None and status not in STATUSES:
+        raise ValueError(f"неизвестный статус «{status}»")
+    series = (series or "").strip() or None
+    return Record(line, title, _split_authors(authors), series, _order(series_order) if series else None,
+                  (isbn or "").strip() or None, (description or "").strip() or None, status)
+
+
+def _checked(line, **fields):
+    try:
+        return _record(line, **fields), None
+    except ValueError as e:
+        return None, (line, str(e))
+
+
+def _goodreads_isbn(value):
+    # Goodreads пишет ISBN как ="9780765326355", чтобы Excel не превращал его в число
+    return (value or "").strip().lstrip("=").strip('"') or None
+
+
+def _goodreads_records(rows):
+    for line, row in enumerate(rows, 2):
+        title, series, order = (row.get("Title") or "").strip(), None, None
+        match = _GOODREADS_SERIES.match(title)
+        if match:
+            title, series = match["title"], match["series"]
+            order = match["order"] if match["order"].isdigit() else None
+        authors = [row.get("Author") or ""] + _split_authors(row.get("Additional Authors"))
+        yield _checked(line, title=title, authors=authors, series=series, series_order=order,
+                       isbn=_goodreads_isbn(row.get("ISBN13")) or _goodreads_isbn(row.get("ISBN")),
+                       description=row.get("My Review"),
+                       status=GOODREADS_SHELVES.get((row.get("Exclusive Shelf") or "").strip()))
+
+
+def _csv_records(rows):
+    for line, row in enumerate(rows, 2):
+        yield _checked(line, **{field: row.get(field) for field in FIELDS})
+
+
+def _jsonl_records(lines):
+    for line, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield None, (line, f"неверный JSON: {e.msg}")
+            continue
+        if not isinstance(item, dict):
+            yield None, (line, "ожидался объект JSON")
+            continue
+        yield _checked(line, **{field: item.get(field) for field in FIELDS})
+
+
+def read_records(stream, filename):
+    """Записи файла по одной: (Record или None, (строка, причина) или None).
+
+    stream — двоичный файл; формат определяется по расширению и заголовку CSV.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".json", ".ndjson")):
+        return _jsonl_records(text)
+    if not name.endswith(".csv"):
+        raise ImportFormatError("поддерживаются файлы .csv, .jsonl и .json (JSON Lines)")
+    reader = csv.DictReader(text)
+    fields = set(reader.fieldnames or ())
+    if {"Book Id", "Title", "Exclusive Shelf"} <= fields:
+        return _goodreads_records(reader)
+    if "title" in fields:
+        return _csv_records(reader)
+    raise ImportFormatError("в CSV нет колонки title (или колонок экспорта Goodreads)")
+
+
+def _resolve(cur, table, names, known):
+    """id строк table (authors или series) по именам, добавляя недостающие: {name_norm: id}.
+
+    known — уже найденные за импорт id; сюда не записывается, это делает import_batch
+    после успешной порции, чтобы откат не оставил в нём id несуществующих строк.
+    """
+    resolved, unknown = {}, []
+    for name in names:
+        key = normalize(name)
+        if key in known:
+            resolved[key] = known[key]
+        else:
+            unknown.append(name)
+    resolved.update(resolve_names(cur, table, unknown))
+    return resolved
+
+
+class ImportState:
+    """Что импорт уже знает: title_norm встреченных книг и id авторов и серий по name_norm"""
+
+    def __init__(self):
+        self.seen = set()
+        self.authors = {}
+        self.series = {}
+
+
+def import_batch(cur, records, user_id, state):
+    """Шаг писателя: записывает порцию книг; возвращает (добавлено, [названия дубликатов])"""
+    fresh, duplicates = {}, []
+    for record in records:
+        key = normalize(record.title)
+        if key in state.seen or key in fresh:
+            duplicates.append(record.title)
+        else:
+            fresh[key] = record
+    if fresh:
+        marks = ",".join("?" * len(fresh))
+        for (key,) in cur.execute(f"SELECT title_norm FROM books WHERE title_norm IN ({marks})", list(fresh)):
+            duplicates.append(fresh.pop(key).title)
+    if not fresh:
+        state.seen.update(normalize(title) for title in duplicates)
+        return 0, duplicates
+
+    authors = _resolve(cur, "authors", [name for r in fresh.values() for name in r.authors], state.authors)
+    series = _resolve(cur, "series", [r.series for r in fresh.values() if r.series], state.series)
+    cur.executemany("""
+        INSERT INTO books (title, description, isbn, series_id, series_order) VALUES (?, ?, ?, ?, ?)
+    """, ((r.title, r.description, r.isbn, series[normalize(r.series)] if r.series else None, r.series_order)
+          for r in fresh.values()))
+
+    marks = ",".join("?" * len(fresh))
+    book_ids = dict(cur.execute(f"SELECT title_norm, id FROM books WHERE title_norm IN ({marks})", list(fresh)))
+    # Порядок связей book_authors — порядок авторов в файле (по нему строится authors_display)
+    cur.executemany("INSERT OR IGNORE INTO book_authors (book_id, author_id) VALUES (?, ?)",
+                    ((book_ids[key], authors[normalize(name)])
+                     for key, r in fresh.items() for name in r.authors))
+    cur.executemany("INSERT INTO user_books (user_id, book_id, status) VALUES (?, ?, ?)",
+                    ((user_id, book_ids[key], r.status) for key, r in fresh.items() if r.status))
+
+    state.seen.update(fresh)
+    state.seen.update(normalize(title) for title in duplicates)
+    state.authors.update(authors)
+    state.series.update(series)
+    return len(fresh), duplicates
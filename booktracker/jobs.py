@@ -0,0 +1,185 @@
+"""
+Фоновые задания для тяжёлых команд.
+
+Экспорт, импорт и снимок базы занимают секунды и минуты. Обработчик не
+ждёт их: он ставит задание в JobEngine, сразу отвечает номером задания и
+освобождает очередь обновлений пользователя — следующие команды того же
+пользователя обрабатываются, пока задание идёт.
+
+Задания выполняются asyncio-задачами, одновременно не больше workers;
+остальные ждут в куче по (приоритет, номер). Число исполнителей меньше
+пула потоков базы, поэтому обычным запросам всегда остаются свободные
+потоки. Ход задания показывается в одном сообщении (Job.report правит его
+не чаще progress_interval), /jobs показывает и отменяет задания.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше — раньше
+HIGH, NORMAL, LOW = 0, 1, 2
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+STATE_LABELS = {
+    QUEUED: "🕒 в очереди",
+    RUNNING: "⏳ выполняется",
+    DONE: "✅ готово",
+    FAILED: "❌ ошибка",
+    CANCELLED: "🚫 отменено",
+}
+
+
+async def shielded(aw):
+    """Ждёт aw до конца даже при отмене задания, затем пропускает отмену дальше.
+
+    Для работы в потоке базы: поток не прервать, а файл, в который он пишет,
+    нельзя закрыть раньше, чем он закончит.
+    """
+    task = asyncio.ensure_future(aw)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait([task])
+        raise
+
+
+class Job:
+    """Фоновое задание: чьё, что делает и на каком этапе"""
+
+    def __init__(self, job_id, owner, title, priority, fn, args, progress_interval, clock):
+        self.id = job_id
+        self.owner = owner
+        self.title = title
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.state = QUEUED
+        self.progress = None  # Последний показанный ход задания
+        self.message = None  # Сообщение, которое правит report
+        self.task = None
+        self.created_at = clock()
+        self.started_at = None
+        self.finished_at = None
+        self._progress_interval = progress_interval
+        self._clock = clock
+        self._shown_at = None
+
+    async def report(self, text, force=False):
+        """Показывает ход задания; промежуточный — не чаще progress_interval, force — сразу"""
+        self.progress = text
+        now = self._clock()
+        if not force and self._shown_at is not None and now - self._shown_at < self._progress_interval:
+            return
+        self._shown_at = now
+        if self.message is None:
+            return
+        try:
+            await self.message.edit_text(text)
+        except BadRequest as e:
+            logger.debug(f"Сообщение задания #{self.id} не обновлено: {e}")
+
+
+class JobEngine:
+    """Очередь фоновых заданий с приоритетами и ограниченным числом исполнителей"""
+
+    def __init__(self, workers=2, progress_interval=2.0, history=20, clock=time.monotonic):
+        self.workers = workers
+        self.progress_interval = progress_interval
+        self.history = history  # Сколько завершённых заданий помнить для /jobs
+        self._clock = clock
+        self._ids = itertools.count(1)
+        self._queue = []
+        self._running = set()
+        self._jobs = {}
+
+    async def submit(self, owner, title, fn, *args, priority=NORMAL, announce=None):
+        """Ставит fn(job, *args) в очередь и возвращает Job.
+
+        announce(job) — корутина, возвращающая сообщение для хода задания;
+        вызывается до постановки в очередь, чтобы номер задания был в нём с самого начала.
+        """
+        job = Job(next(self._ids), owner, title, priority, fn, args, self.progress_interval, self._clock)
+        if announce is not None:
+            job.message = await announce(job)
+        self._jobs[job.id] = job
+        heapq.heappush(self._queue, (priority, job.id, job))
+        self._dispatch()
+        return job
+
+    def _dispatch(self):
+        while self._queue and len(self._running) < self.workers:
+            _priority, _id, job = heapq.heappop(self._queue)
+            if job.state != QUEUED:
+                continue  # Отменено в очереди
+            job.state = RUNNING
+            job.started_at = self._clock()
+            self._running.add(job)
+            job.task = asyncio.get_running_loop().create_task(self._run(job))
+
+    async def _run(self, job):
+        try:
+            await job.fn(job, *job.args)
+            job.state = DONE
+        except asyncio.CancelledError:
+            job.state = CANCELLED
+            await job.report(self._stopped_text(job, "🚫 Задание #{id} отменено"), force=True)
+        except Exception as e:
+            logger.error(f"Задание #{job.id} «{job.title}» завершилось ошибкой: {e}")
+            job.state = FAILED
+            await job.report(self._stopped_text(job, "❌ Задание #{id} не выполнено: ошибка"), force=True)
+        finally:
+            job.finished_at = self._clock()
+            self._running.discard(job)
+            self._forget_finished()
+            self._dispatch()
+
+    @staticmethod
+    def _stopped_text(job, template):
+        # Последний ход остаётся в сообщении: видно, докуда задание успело дойти
+        head = template.format(id=job.id)
+        return f"{job.progress}\n\n{head}" if job.progress else f"{head}: {job.title}"
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state not in ACTIVE]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        """Задания owner (или все): сначала активные, затем недавно завершённые, новые выше"""
+        jobs = [job for job in self._jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: (job.state not in ACTIVE, -job.id))
+
+    async def cancel(self, job):
+        """Отменяет задание в очереди или выполняющееся; False — оно уже завершено"""
+        if job.state == QUEUED:
+            job.state = CANCELLED
+            job.finished_at = self._clock()
+            await job.report(self._stopped_text(job, "🚫 Задание #{id} отменено"), force=True)
+            self._forget_finished()
+            return True
+        if job.state == RUNNING:
+            job.task.cancel()
+            await asyncio.wait([job.task])
+            return True
+        return False
+
+    async def join(self):
+        """Ждёт, пока очередь опустеет и все задания завершатся"""
+        while self._running:
+            await asyncio.wait([job.task for job in self._running])
+
+    async def close(self):
+        """Отменяет все задания (при остановке бота)"""
+        for job in [job for job in self._jobs.values() if job.state in ACTIVE]:
+            await self.cancel(job)
@@ -0,0 +1,182 @@
+"""
+Версионированные миграции схемы базы данных.
+
+Текущая версия схемы хранится в PRAGMA user_version. При запуске бота
+применяются по порядку все миграции с номером больше текущей версии;
+каждая миграция выполняется в отдельной транзакции вместе с обновлением
+user_version, поэтому прерванный запуск не оставляет базу в промежуточном
+состоянии. Существующая books.db (версия 0) обновляется на месте.
+
+Шаг миграции — SQL-строка или функция, принимающая курсор. После миграций
+из COMPACT_AFTER файл базы сжимается VACUUM (вне транзакции).
+"""
+import logging
+import sqlite3
+
+from booktracker.authors import add_authors_display
+from booktracker.counters import create_counters
+from booktracker.covers import move_inline_covers
+from booktracker.normalize import add_normalized_columns, register_functions
+from booktracker.search import create_search_index, rebuild_search_index
+from booktracker.shelf import add_shelf_keys
+
+logger = logging.getLogger(__name__)
+
+
+MIGRATIONS = [
+    (1, "Базовая схема", [
+        """
+        CREATE TABLE IF NOT EXISTS series (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT UNIQUE,
+            description TEXT,
+            image_blob BLOB,
+            series_id INTEGER,
+            series_order INTEGER,
+            isbn TEXT,
+            FOREIGN KEY (series_id) REFERENCES series(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS authors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS book_authors (
+            book_id INTEGER,
+            author_id INTEGER,
+            PRIMARY KEY (book_id, author_id),
+            FOREIGN KEY (book_id) REFERENCES books(id),
+            FOREIGN KEY (author_id) REFERENCES authors(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_books (
+            user_id INTEGER,
+            book_id INTEGER,
+            status TEXT CHECK(status IN ('planning', 'reading', 'finished', 'cancelled')),
+            PRIMARY KEY (user_id, book_id),
+            FOREIGN KEY (book_id) REFERENCES books(id)
+        )
+        """,
+    ]),
+    (2, "Индексы для запросов обработчиков", [
+        # list_series: книги серии в порядке series_order
+        "CREATE INDEX IF NOT EXISTS idx_books_series ON books(series_id, series_order)",
+        # my_books и статистика пользователя по статусам
+        "CREATE INDEX IF NOT EXISTS idx_user_books_user_status ON user_books(user_id, status)",
+        # удаление книги: DELETE FROM user_books WHERE book_id = ?
+        "CREATE INDEX IF NOT EXISTS idx_user_books_book ON user_books(book_id)",
+        # поиск по автору и топ авторов
+        "CREATE INDEX IF NOT EXISTS idx_book_authors_author ON book_authors(author_id)",
+        # add_series: WHERE name = ? COLLATE NOCASE
+        "CREATE INDEX IF NOT EXISTS idx_series_name_nocase ON series(name COLLATE NOCASE)",
+    ]),
+    (3, "Обложки вынесены из базы в каталог по SHA-256", [
+        "ALTER TABLE books ADD COLUMN cover_sha256 TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_books_cover ON books(cover_sha256)",
+        move_inline_covers,
+        "ALTER TABLE books DROP COLUMN image_blob",
+    ]),
+    (4, "Кэш file_id обложек в Telegram", [
+        "ALTER TABLE books ADD COLUMN cover_file_id TEXT",
+    ]),
+    (5, "Полнотекстовый индекс books_fts", [
+        create_search_index,
+    ]),
+    (6, "Нормализованные ключи поиска и сортировки", [
+        add_normalized_columns,
+        # Поиск серии теперь идёт по series.name_norm
+        "DROP INDEX IF EXISTS idx_series_name_nocase",
+    ]),
+    (7, "Индекс для постраничного списка обложек", [
+        "CREATE INDEX IF NOT EXISTS idx_books_covered_sort ON books(title_sort, id) WHERE cover_sha256 IS NOT NULL",
+    ]),
+    (8, "books_fts: «ё» приравнена к «е»", [
+        rebuild_search_index,
+    ]),
+    (9, "Счётчики библиотеки, обновляемые триггерами", [
+        create_counters,
+    ]),
+    (10, "Готовая строка авторов books.authors_display", [
+        add_authors_display,
+    ]),
+    (11, "Ключи сортировки «Моих книг» в user_books", [
+        add_shelf_keys,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Миграции, после которых освобождённое место возвращается системе
+COMPACT_AFTER = {3}
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Применяет недостающие миграции и возвращает итоговую версию схемы"""
+    # Триггеры схемы вызывают bt_normalize/bt_sort_key — они нужны и этому подключению
+    register_functions(conn)
+    current = get_version(conn)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return current
+
+    conn.commit()
+    isolation_level = conn.isolation_level
+    # Транзакциями управляем сами: иначе DDL выполнялся бы вне транзакции
+    conn.isolation_level = None
+    cur = conn.cursor()
+    compact = False
+    try:
+        for version, description, steps in pending:
+            cur.execute("BEGIN")
+            try:
+                for step in steps:
+                    if callable(step):
+                        step(cur)
+                    else:
+                        cur.execute(step)
+                cur.execute(f"PRAGMA user_version = {int(version)}")
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                logger.error(f"Ошибка при применении миграции {version} ({description})")
+                raise
+            logger.info(f"Применена миграция {version}: {description}")
+            current = version
+            compact = compact or version in COMPACT_AFTER
+        if compact:
+            cur.execute("VACUUM")
+            logger.info("База данных сжата (VACUUM)")
+    finally:
+        cur.close()
+        conn.isolation_level = isolation_level
+    return current
+
+
+def migrate_path(path):
+    """Открывает базу по пути, применяет миграции и закрывает подключение"""
+    conn = sqlite3.connect(path)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Версия схемы: {migrate_path(sys.argv[1] if len(sys.argv) > 1 else 'books.db')}")
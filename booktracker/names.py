@@ -0,0 +1,117 @@
+"""
+Поиск и создание авторов и серий по именам.
+
+resolve_names превращает список имён в id за постоянное число запросов,
+сколько бы имён ни было: один SELECT … WHERE name_norm IN (…), executemany
+для недостающих и ещё один IN (…) за их id. Перед базой стоит NameCache —
+ограниченный LRU-кэш name_norm → id.
+
+Кэш заполняется только на подключении писателя (bind), поэтому всё, что он
+помнит, записано самим писателем или прочитано им. Удаление или
+переименование автора и серии на этом подключении убирает запись из кэша
+временными триггерами; откат задания или пачки сбрасывает кэш целиком —
+в нём могли остаться id строк, которых больше нет.
+"""
+from collections import OrderedDict
+
+from booktracker.normalize import normalize
+
+TABLES = ("authors", "series")
+
+
+def _forget_trigger(table, suffix, event):
+    return (f"CREATE TEMP TRIGGER IF NOT EXISTS {table}_name_cache_{suffix} AFTER {event} ON {table} "
+            f"BEGIN SELECT bt_forget_name('{table}', OLD.name_norm); END")
+
+
+class NameCache:
+    """LRU-кэш id авторов и серий по name_norm для подключения писателя"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def bind(self, conn):
+        """Привязывает кэш к подключению писателя и ставит на нём триггеры сброса"""
+        self.clear()
+        conn.create_function("bt_forget_name", 2, self.forget)
+        for table in TABLES:
+            conn.execute(_forget_trigger(table, "ad", "DELETE"))
+            conn.execute(_forget_trigger(table, "au", "UPDATE OF name_norm"))
+        self._conn = conn
+        return conn
+
+    def serves(self, conn):
+        """Можно ли пользоваться кэшем на этом подключении"""
+        return conn is not None and conn is self._conn
+
+    def get_many(self, table, keys):
+        """Известные id: {name_norm: id} для ключей из keys, что есть в кэше"""
+        found = {}
+        for key in keys:
+            value = self._entries.get((table, key))
+            if value is None:
+                self.misses += 1
+                continue
+            self._entries.move_to_end((table, key))
+            self.hits += 1
+            found[key] = value
+        return found
+
+    def put_many(self, table, ids):
+        for key, value in ids.items():
+            self._entries[(table, key)] = value
+            self._entries.move_to_end((table, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def forget(self, table, key):
+        """Убирает запись; вызывается триггером при удалении или переименовании"""
+        self._entries.pop((table, key), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def _select_ids(cur, table, keys):
+    marks = ",".join("?" * len(keys))
+    return dict(cur.execute(f"SELECT name_norm, id FROM {table} WHERE name_norm IN ({marks})", keys))
+
+
+def resolve_names(cur, table, names, cache=None):
+    """id строк table (authors или series) по именам, добавляя недостающие: {name_norm: id}.
+
+    Не больше трёх запросов на любой список; cache используется, только если
+    он привязан к подключению cur.
+    """
+    wanted = {}
+    for name in names:
+        wanted.setdefault(normalize(name), name)
+    if cache is not None and not cache.serves(cur.connection):
+        cache = None
+    resolved = cache.get_many(table, wanted) if cache is not None else {}
+    missing = [key for key in wanted if key not in resolved]
+    if missing:
+        found = _select_ids(cur, table, missing)
+        new = [key for key in missing if key not in found]
+        if new:
+            cur.executemany(f"INSERT INTO {table} (name) VALUES (?)", ((wanted[key],) for key in new))
+            found.update(_select_ids(cur, table, new))
+        # В порядке имён: при переполнении кэша вытесняются первые
+        found = {key: found[key] for key in missing}
+        if cache is not None:
+            cache.put_many(table, found)
+        resolved.update(found)
+    return resolved
@@ -0,0 +1,79 @@
+"""
+Нормализованные ключи для поиска, сравнения и сортировки названий.
+
+LIKE и NOCASE в SQLite сворачивают регистр только у ASCII, а ORDER BY
+сортирует по кодам символов. Поэтому у books, authors и series есть
+предвычисленные индексируемые колонки:
+
+* *_norm — casefold, «ё» → «е», знаки препинания убраны, пробелы схлопнуты;
+  по ней ищутся дубликаты и выполняется поиск через LIKE;
+* *_sort — ключ сортировки: нормализованная строка, в которой числа
+  дополнены нулями, чтобы «Книга 2» шла раньше «Книга 10».
+
+Ключ сортировки не учитывает правила языка: после нормализации строки
+сравниваются по кодам символов. Внутри русского или английского алфавита
+порядок правильный (регистр и «ё» уже свёрнуты), но латиница с диакритикой
+(«é» идёт после «z») и смешанные алфавиты (латиница раньше кириллицы)
+сортируются по кодам. Сопоставление ICU сюда не подключено намеренно:
+ключ хранится в индексированной колонке и не должен зависеть от того,
+установлена ли библиотека на машине, записавшей строку.
+
+Колонки заполняют триггеры через функции bt_normalize и bt_sort_key,
+поэтому register_functions нужно вызывать для каждого подключения,
+которое пишет в эти таблицы (это делают migrate, AsyncDatabase.connect
+и GroupCommitWriter).
+"""
+import re
+import unicodedata
+
+_PUNCTUATION = re.compile(r"[\W_]+")
+_NUMBER = re.compile(r"\d+")
+
+# Ширина, до которой дополняются числа в ключе сортировки
+SORT_NUMBER_WIDTH = 10
+
+
+def normalize(text):
+    """Ключ сравнения: «Ёлка, 2-е изд.» → «елка 2 е изд»"""
+    if text is None:
+        return None
+    text = unicodedata.normalize("NFKC", text).casefold().replace("ё", "е")
+    return _PUNCTUATION.sub(" ", text).strip()
+
+
+def codepoint_sort_key(text):
+    """Ключ сортировки по кодам символов: нормализованная строка с выровненными числами"""
+    text = normalize(text)
+    if text is None:
+        return None
+    return _NUMBER.sub(lambda m: m.group().zfill(SORT_NUMBER_WIDTH), text)
+
+
+def register_functions(conn):
+    """Регистрирует bt_normalize и bt_sort_key, которые вызывают триггеры"""
+    conn.create_function("bt_normalize", 1, normalize, deterministic=True)
+    conn.create_function("bt_sort_key", 1, codepoint_sort_key, deterministic=True)
+    return conn
+
+
+# (таблица, исходная колонка, колонка ключа сравнения, колонка ключа сортировки)
+NORMALIZED_COLUMNS = [
+    ("books", "title", "title_norm", "title_sort"),
+    ("authors", "name", "name_norm", "name_sort"),
+    ("series", "name", "name_norm", "name_sort"),
+]
+
+
+def add_normalized_columns(cur):
+    """Шаг миграции: добавляет колонки ключей, заполняет их, индексирует и ставит триггеры"""
+    register_functions(cur.connection)
+    for table, column, norm, sort in NORMALIZED_COLUMNS:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {norm} TEXT")
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {sort} TEXT")
+        cur.execute(f"UPDATE {table} SET {norm} = bt_normalize({column}), {sort} = bt_sort_key({column})")
+        cur.execute(f"CREATE INDEX idx_{table}_{norm} ON {table}({norm})")
+        cur.execute(f"CREATE INDEX idx_{table}_{sort} ON {table}({sort})")
+        fill = (f"UPDATE {table} SET {norm} = bt_normalize(NEW.{column}), {sort} = bt_sort_key(NEW.{column}) "
+                f"WHERE id = NEW.id;")
+        cur.execute(f"CREATE TRIGGER {table}_{norm}_ai AFTER INSERT ON {table} BEGIN {fill} END")
+        cur.execute(f"CREATE TRIGGER {table}_{norm}_au AFTER UPDATE OF {column} ON {table} BEGIN {fill} END")
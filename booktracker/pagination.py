@@ -0,0 +1,81 @@
+"""
+Постраничный вывод списков с пагинацией по ключу (keyset / seek).
+
+Страница выбирается условием (ключ сортировки, id) > ключ последней
+показанной строки и LIMIT, а не OFFSET: каждая страница — один запрос,
+который читает из индекса не больше page_size + 1 строк, сколько бы книг
+ни было в библиотеке. Якорем служит id строки, ключ по нему достаётся
+подзапросом, поэтому в callback_data кнопок помещается только id
+(Telegram ограничивает её 64 байтами).
+"""
+from collections import namedtuple
+
+# Направление перехода от якоря
+NEXT = "n"
+PREV = "p"
+
+# Префикс callback_data кнопок навигации: pg:<вид>:<направление>:<id якоря>
+CALLBACK_PREFIX = "pg"
+
+Page = namedtuple("Page", "rows has_prev has_next")
+
+
+class KeysetView:
+    """Описание постраничного списка: что выбирать, откуда и в каком порядке.
+
+    columns — выражения в SELECT (id строки добавляется последней колонкой),
+    source — FROM с JOIN, where — условие с параметрами, которые передаются
+    в fetch_page; sort_key и id_column должны быть покрыты индексом.
+    descending=True показывает список от больших ключей к меньшим.
+    """
+
+    def __init__(self, name, columns, source, sort_key, id_column, where="1", page_size=20, descending=False):
+        self.name = name
+        self.columns = columns
+        self.source = source
+        self.sort_key = sort_key
+        self.id_column = id_column
+        self.where = where
+        self.page_size = page_size
+        self.descending = descending
+
+    def _query(self, direction, anchored):
+        key = f"({self.sort_key}, {self.id_column})"
+        condition = self.where
+        # Вперёд по убывающему списку — то же, что назад по возрастающему
+        backwards = (direction == PREV) != self.descending
+        if anchored:
+            # Ключ якоря ищем той же выборкой: строка должна существовать и подходить под where
+            # (параметры where передаются второй раз), иначе страница пуста и список начнётся сначала
+            anchor = (f"(SELECT {self.sort_key}, {self.id_column} FROM {self.source} "
+                      f"WHERE ({self.where}) AND {self.id_column} = ?)")
+            condition = f"({condition}) AND {key} {'<' if backwards else '>'} {anchor}"
+        order = "DESC" if backwards else "ASC"
+        return (f"SELECT {self.columns}, {self.id_column} FROM {self.source} WHERE {condition} "
+                f"ORDER BY {self.sort_key} {order}, {self.id_column} {order} LIMIT ?")
+
+    def fetch_page(self, conn, params=(), anchor_id=None, direction=NEXT):
+        """Возвращает Page; строки — кортежи columns + id в порядке сортировки"""
+        limit = self.page_size + 1
+        if anchor_id is None:
+            rows = conn.execute(self._query(NEXT, False), (*params, limit)).fetchall()
+            return Page(rows[:self.page_size], False, len(rows) > self.page_size)
+
+        rows = conn.execute(self._query(direction, True), (*params, *params, anchor_id, limit)).fetchall()
+        if not rows:
+            # Якорь удалён или страница опустела — начинаем сначала
+            return self.fetch_page(conn, params)
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == PREV:
+            return Page(rows[::-1], more, True)
+        return Page(rows, True, more)
+
+    def callback_data(self, direction, anchor_id):
+        return f"{CALLBACK_PREFIX}:{self.name}:{direction}:{anchor_id}"
+
+
+def parse_callback_data(data):
+    """Разбирает callback_data кнопки навигации: (вид, направление, id якоря)"""
+    _, name, direction, anchor_id = data.split(":")
+    return name, direction, int(anchor_id)
@@ -0,0 +1,83 @@
+"""
+Выбор книги inline-кнопками.
+
+Вместо нумерованного списка всех книг показывается страница из page_size
+книг (KeysetView по title_sort): по кнопке на книгу и кнопки «назад/вперёд».
+В callback_data кнопки книги — только её id, а в состоянии пользователя
+хранится лишь курсор текущей страницы (id якоря и направление), поэтому
+выбранный book_id сразу передаётся следующему шагу диалога без повторного
+поиска книги по названию. Номер, введённый текстом, относится к кнопкам
+текущей страницы.
+
+Вместо номера можно ввести название или его часть: resolve ищет сначала
+точное совпадение по индексу title_norm, затем по полнотекстовому индексу
+и возвращает не больше CHOICES_LIMIT книг — вся библиотека не выводится
+никогда.
+"""
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from booktracker.normalize import normalize
+from booktracker.pagination import NEXT, PREV, KeysetView, Page
+from booktracker.search import find_book_cards
+
+# Префикс callback_data: pick:<id книги>, pick:<направление>:<id якоря> или pick:cancel
+PICK_PREFIX = "pick"
+CANCEL = "cancel"
+
+# Ключ курсора текущей страницы в user_data
+CURSOR_KEY = "picker_cursor"
+
+# Сколько книг предлагать на выбор, если введённому названию подходят несколько
+CHOICES_LIMIT = 5
+
+
+class BookPicker:
+    """Постраничный выбор книги"""
+
+    def __init__(self, page_size=10):
+        self.view = KeysetView("pick", "title", "books", "title_sort", "id", page_size=page_size)
+
+    def fetch_page(self, conn, cursor=None):
+        """Страница книг (title, id) для курсора (id якоря, направление); None — первая страница"""
+        anchor_id, direction = cursor or (None, NEXT)
+        return self.view.fetch_page(conn, (), anchor_id, direction)
+
+    def resolve(self, conn, text, limit=CHOICES_LIMIT):
+        """Книги, подходящие под введённое название, в виде страницы (has_next — нашлось больше limit)"""
+        key = normalize(text)
+        if not key:
+            return Page([], False, False)
+        rows = conn.execute("SELECT title, id FROM books WHERE title_norm = ? ORDER BY title_sort, id LIMIT ?",
+                            (key, limit + 1)).fetchall()
+        if not rows:
+            rows = [(title, book_id) for book_id, title, _, _ in find_book_cards(conn, text, limit + 1)]
+        return Page(rows[:limit], False, len(rows) > limit)
+
+    def keyboard(self, page, numbered=True, navigation=True):
+        """Кнопка на каждую книгу страницы, строка навигации и отмена.
+
+        navigation=False — без листания: для книг из resolve, которые не являются страницей KeysetView.
+        """
+        rows = [[InlineKeyboardButton(f"{i}. {title}" if numbered else title, callback_data=f"{PICK_PREFIX}:{book_id}")]
+                for i, (title, book_id) in enumerate(page.rows, 1)]
+        buttons = []
+        if navigation and page.has_prev:
+            buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"{PICK_PREFIX}:{PREV}:{page.rows[0][-1]}"))
+        if navigation and page.has_next:
+            buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=f"{PICK_PREFIX}:{NEXT}:{page.rows[-1][-1]}"))
+        if buttons:
+            rows.append(buttons)
+        rows.append([InlineKeyboardButton("🔙 Отмена", callback_data=f"{PICK_PREFIX}:{CANCEL}")])
+        return InlineKeyboardMarkup(rows)
+
+
+def parse_pick_data(data):
+    """Разбирает callback_data: (id книги, None) при выборе, (None, (id якоря, направление))
+    при листании и (None, None) при отмене"""
+    parts = data.split(":")
+    if len(parts) == 2:
+        return (None, None) if parts[1] == CANCEL else (int(parts[1]), None)
+    _, direction, anchor_id = parts
+    if direction not in (NEXT, PREV):
+        raise ValueError(f"Неизвестное направление: {direction}")
+    return None, (int(anchor_id), direction)
@@ -0,0 +1,62 @@
+"""
+Быстрое добавление книг одним сообщением.
+
+Одна строка — одна книга, поля разделены «|», первое поле — название:
+
+    Дюна | Фрэнк Герберт | Хроники Дюны #1 | 978-5-17-090001-6
+    Пикник на обочине | Аркадий Стругацкий, Борис Стругацкий
+
+Остальные поля распознаются по виду: 10 или 13 цифр (можно с дефисами и
+приставкой ISBN) — ISBN, «Название #N» — серия и номер в ней, поле с
+приставкой «описание:» — описание, первое прочее поле — авторы через
+запятую. Порядок полей после названия любой. Сообщение разбирается за один
+проход, книги записываются одним заданием писателя тем же _insert_book,
+что и в диалоге добавления.
+"""
+import re
+
+# ISBN-10 (последняя цифра может быть X) или ISBN-13, как в шаге add_isbn
+_ISBN = re.compile(r"^(?:isbn[:\s]*)?(?P<isbn>[\d\- ]{9,}[\dXx])$", re.IGNORECASE)
+_ISBN_DIGITS = re.compile(r"^\d{9}[\dXx]$|^\d{13}$")
+_SERIES = re.compile(r"^(?P<series>.+?)\s*#\s*(?P<order>\d+)$")
+_DESCRIPTION = re.compile(r"^(?:описание|description)\s*:\s*(?P<text>.*)$", re.IGNORECASE | re.DOTALL)
+
+# Книг в одном сообщении: всё сообщение — одна транзакция
+QUICKADD_LIMIT = 50
+
+
+def _parse_line(line):
+    """Поля книги из строки; ValueError — строка не разобрана"""
+    title, *fields = [field.strip() for field in line.split("|")]
+    if not title:
+        raise ValueError("нет названия")
+    book = {'title': title, 'description': None, 'isbn': None, 'authors': [],
+            'series': None, 'series_order': None}
+    for field in fields:
+        if not field:
+            continue
+        isbn = _ISBN.match(field)
+        if isbn and _ISBN_DIGITS.match(re.sub(r"[\- ]", "", isbn['isbn'])):
+            book['isbn'] = isbn['isbn'].strip()
+        elif description := _DESCRIPTION.match(field):
+            book['description'] = description['text'].strip() or None
+        elif series := _SERIES.match(field):
+            book['series'], book['series_order'] = series['series'], int(series['order'])
+        elif not book['authors']:
+            book['authors'] = [name.strip() for name in field.split(",") if name.strip()]
+        else:
+            raise ValueError(f"непонятное поле «{field}»")
+    return book
+
+
+def parse_quick_add(text):
+    """Книги из текста сообщения: ([данные книги], [(номер строки, причина)])"""
+    books, errors = [], []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            books.append(_parse_line(line))
+        except ValueError as e:
+            errors.append((number, str(e)))
+    return books, errors
@@ -0,0 +1,174 @@
+"""
+Полнотекстовый поиск книг.
+
+Таблица books_fts (FTS5) хранит для каждой книги название, авторов, серию
+и описание; rowid совпадает с books.id. Триггеры на books, book_authors,
+authors и series пересобирают строку индекса при любом изменении, поэтому
+обработчикам не нужно ничего делать отдельно. Результаты сортируются по
+bm25 (совпадение в названии весит больше, чем в описании) и содержат
+фрагмент текста с подсвеченными словами.
+
+Токенизатор unicode61 сворачивает регистр кириллицы, но не «ё», поэтому
+в индекс текст попадает с «ё», заменённой на «е», а запрос проходит ту же
+замену. Название и авторы в результатах берутся из books как есть.
+
+Если SQLite собран без FTS5, миграция пропускает создание индекса,
+а поиск работает через LIKE по нормализованным колонкам
+(см. booktracker.normalize).
+"""
+import logging
+import re
+import sqlite3
+
+from booktracker.normalize import normalize
+
+logger = logging.getLogger(__name__)
+
+# Максимум результатов в одном ответе
+SEARCH_LIMIT = 50
+
+# Маркеры подсветки в snippet(); заменяются на разметку при выводе
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# Веса колонок для bm25: title, authors, series, description
+BM25_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+
+def _fold_yo(expression):
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+_AUTHORS = """(SELECT GROUP_CONCAT(a.name, ', ') FROM book_authors ba
+               JOIN authors a ON a.id = ba.author_id WHERE ba.book_id = b.id)"""
+
+# Строка индекса для книг, выбранных условием {{where}}
+_INDEX_ROWS = f"""
+    INSERT INTO books_fts (rowid, title, authors, series, description)
+    SELECT b.id, {_fold_yo("b.title")},
+           {_fold_yo(_AUTHORS)},
+           {_fold_yo("(SELECT s.name FROM series s WHERE s.id = b.series_id)")},
+           {_fold_yo("b.description")}
+    FROM books b WHERE {{where}};
+"""
+
+
+def _refresh(where_books):
+    """Тело триггера: удаляет и заново вставляет строки индекса для книг из подзапроса"""
+    return (f"DELETE FROM books_fts WHERE rowid IN ({where_books});\n"
+            + _INDEX_ROWS.format(where=f"b.id IN ({where_books})"))
+
+
+SEARCH_TRIGGERS = {
+    "books_fts_ai": "AFTER INSERT ON books BEGIN " + _INDEX_ROWS.format(where="b.id = NEW.id") + " END",
+    "books_fts_au": ("AFTER UPDATE OF title, description, series_id ON books BEGIN "
+                     "DELETE FROM books_fts WHERE rowid = OLD.id; "
+                     + _INDEX_ROWS.format(where="b.id = NEW.id") + " END"),
+    "books_fts_ad": "AFTER DELETE ON books BEGIN DELETE FROM books_fts WHERE rowid = OLD.id; END",
+    "book_authors_fts_ai": "AFTER INSERT ON book_authors BEGIN " + _refresh("SELECT NEW.book_id") + " END",
+    "book_authors_fts_ad": "AFTER DELETE ON book_authors BEGIN " + _refresh("SELECT OLD.book_id") + " END",
+    "authors_fts_au": ("AFTER UPDATE OF name ON authors BEGIN "
+                       + _refresh("SELECT book_id FROM book_authors WHERE author_id = NEW.id") + " END"),
+    "series_fts_au": ("AFTER UPDATE OF name ON series BEGIN "
+                      + _refresh("SELECT id FROM books WHERE series_id = NEW.id") + " END"),
+    "series_fts_ad": ("AFTER DELETE ON series BEGIN "
+                      + _refresh("SELECT id FROM books WHERE series_id = OLD.id") + " END"),
+}
+
+
+def create_search_index(cur):
+    """Шаг миграции: создаёт books_fts с триггерами и заполняет его; без FTS5 ничего не делает"""
+    try:
+        cur.execute("""
+            CREATE VIRTUAL TABLE books_fts USING fts5(
+                title, authors, series, description,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 недоступен ({e}), поиск будет работать через LIKE")
+        return
+    for name, body in SEARCH_TRIGGERS.items():
+        cur.execute(f"CREATE TRIGGER {name} {body}")
+    cur.execute(_INDEX_ROWS.format(where="1"))
+
+
+def rebuild_search_index(cur):
+    """Шаг миграции: пересоздаёт books_fts и его триггеры по текущему определению"""
+    for name in SEARCH_TRIGGERS:
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cur.execute("DROP TABLE IF EXISTS books_fts")
+    create_search_index(cur)
+
+
+def has_search_index(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'").fetchone() is not None
+
+
+def fts_query(query):
+    """Превращает ввод пользователя в запрос FTS5: каждое слово ищется по префиксу"""
+    words = re.findall(r"\w+", _fold(query))
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _search(conn, query, limit, columns):
+    """Строки books (алиас b) с колонками columns, лучшие совпадения первыми.
+
+    {snippet} в columns заменяется фрагментом с совпадением, а при поиске через LIKE — на NULL.
+    """
+    if not has_search_index(conn):
+        return _find_books_like(conn, query, limit, columns.format(snippet="NULL"))
+    match = fts_query(query)
+    if not match:
+        return []
+    columns = columns.format(snippet=f"snippet(books_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 12)")
+    return conn.execute(f"""
+        SELECT {columns}
+        FROM books_fts
+        JOIN books b ON b.id = books_fts.rowid
+        WHERE books_fts MATCH ?
+        ORDER BY bm25(books_fts, {", ".join(map(str, BM25_WEIGHTS))})
+        LIMIT ?
+    """, (match, limit)).fetchall()
+
+
+def find_books(conn, query, limit=SEARCH_LIMIT):
+    """Ищет книги и возвращает список (title, authors, snippet), лучшие совпадения первыми.
+
+    snippet содержит фрагмент с совпадением, слова отмечены HIGHLIGHT_START/HIGHLIGHT_END;
+    при поиске через LIKE он всегда None.
+    """
+    rows = _search(conn, query, limit, "b.title, b.authors_display, {snippet}")
+    # Фрагмент, совпадающий с названием или авторами целиком, ничего не добавляет
+    return [(title, authors, None if _plain(snippet) in (_fold(title), _fold(authors)) else snippet)
+            for title, authors, snippet in rows]
+
+
+def find_book_cards(conn, query, limit=SEARCH_LIMIT):
+    """Ищет книги для карточек inline-режима: список (id, title, authors, cover_file_id)"""
+    return _search(conn, query, limit, "b.id, b.title, b.authors_display, b.cover_file_id")
+
+
+def _fold(text):
+    return text.replace("ё", "е").replace("Ё", "Е") if text else text
+
+
+def _plain(snippet):
+    return _fold(snippet.replace(HIGHLIGHT_START, "").replace(HIGHLIGHT_END, "")) if snippet else snippet
+
+
+def _find_books_like(conn, query, limit, columns="b.title, b.authors_display, NULL"):
+    search_term = f"%{normalize(query)}%"
+    return conn.execute(f"""
+        SELECT {columns}
+        FROM books b
+        WHERE b.id IN (
+            SELECT b2.id FROM books b2
+            LEFT JOIN book_authors ba2 ON b2.id = ba2.book_id
+            LEFT JOIN authors a2 ON ba2.author_id = a2.id
+            WHERE b2.title_norm LIKE ? OR a2.name_norm LIKE ?
+        )
+        ORDER BY b.title_sort
+        LIMIT ?
+    """, (search_term, search_term, limit)).fetchall()
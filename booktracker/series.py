@@ -0,0 +1,96 @@
+"""
+Просмотр серий с прогрессом пользователя.
+
+Страница серий загружается одним запросом: CTE выбирает page_size + 1
+серий по ключу (как KeysetView), к ним присоединяются книги по индексу
+idx_books_series (series_id, series_order) и статусы пользователя, а оконные
+функции считают для каждой серии всего книг и сколько из них прочитано.
+Строки приходят упорядоченными по серии и series_order, поэтому группировка
+в Python идёт потоком по курсору, без отдельного запроса на каждую серию.
+"""
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+
+from booktracker.normalize import normalize
+from booktracker.pagination import NEXT, PREV, KeysetView, Page
+
+# Серия на странице: книги — список (series_order, title, статус пользователя или None);
+# id последним, как в строках KeysetView (по нему строятся кнопки навигации)
+SeriesEntry = namedtuple("SeriesEntry", "name finished total books id")
+
+# Сколько серий предлагать, если /series <название> подходит к нескольким
+MATCHES_LIMIT = 10
+
+
+class SeriesBrowser(KeysetView):
+    """Постраничный список серий с книгами и прогрессом; params в fetch_page — (user_id,)"""
+
+    def __init__(self, page_size=5):
+        super().__init__("series", "s.name, s.name_sort", "series s", "s.name_sort", "s.id", page_size=page_size)
+
+    def fetch_page(self, conn, params=(), anchor_id=None, direction=NEXT):
+        (user_id,) = params
+        anchored = anchor_id is not None
+        series_page = self._query(direction, anchored)
+        cursor = conn.execute(f"""
+            WITH page (name, name_sort, id) AS ({series_page})
+            SELECT p.id, p.name, b.series_order, b.title, ub.status,
+                   COUNT(b.id) OVER series,
+                   COUNT(CASE WHEN ub.status = 'finished' THEN 1 END) OVER series
+            FROM page p
+            LEFT JOIN books b ON b.series_id = p.id
+            LEFT JOIN user_books ub ON ub.user_id = ? AND ub.book_id = b.id
+            WINDOW series AS (PARTITION BY p.id)
+            ORDER BY p.name_sort, p.id, b.series_order, b.id
+        """, (*((anchor_id,) if anchored else ()), self.page_size + 1, user_id))
+
+        entries = []
+        for series_id, rows in groupby(cursor, key=itemgetter(0)):
+            first = next(rows)
+            books = [(order, title, status) for _, _, order, title, status, _, _ in (first, *rows)
+                     if title is not None]
+            entries.append(SeriesEntry(first[1], first[6], first[5], books, series_id))
+
+        if not entries and anchored:
+            # Якорь удалён — начинаем сначала
+            return self.fetch_page(conn, params)
+        more = len(entries) > self.page_size
+        if not anchored:
+            return Page(entries[:self.page_size], False, more)
+        if direction == PREV:
+            # Строки всегда идут по возрастанию: лишняя серия — первая
+            return Page(entries[-self.page_size:], more, True)
+        return Page(entries[:self.page_size], True, more)
+
+
+def find_series(conn, name, limit=MATCHES_LIMIT):
+    """Серии по названию: точное совпадение name_norm, иначе начинающиеся с него; [(id, name)]"""
+    key = normalize(name)
+    if not key:
+        return []
+    rows = conn.execute("SELECT id, name FROM series WHERE name_norm = ?", (key,)).fetchall()
+    if rows:
+        return rows
+    # Диапазон вместо LIKE, чтобы поиск по префиксу шёл по индексу name_norm
+    return conn.execute("""
+        SELECT id, name FROM series WHERE name_norm >= ? AND name_norm < ?
+        ORDER BY name_sort LIMIT ?
+    """, (key, key + "\U0010ffff", limit)).fetchall()
+
+
+def load_series(conn, series_id, user_id):
+    """Книги серии по порядку с прогрессом пользователя; (name, finished, total, books) или None"""
+    series = conn.execute("SELECT name FROM series WHERE id = ?", (series_id,)).fetchone()
+    if series is None:
+        return None
+    # WHERE series_id = ? ORDER BY series_order — обход индекса idx_books_series без сортировки
+    books = conn.execute("""
+        SELECT b.series_order, b.title, ub.status
+        FROM books b
+        LEFT JOIN user_books ub ON ub.user_id = ? AND ub.book_id = b.id
+        WHERE b.series_id = ?
+        ORDER BY b.series_order
+    """, (user_id, series_id)).fetchall()
+    finished = sum(1 for _, _, status in books if status == 'finished')
+    return series[0], finished, len(books), books
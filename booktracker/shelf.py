@@ -0,0 +1,123 @@
+"""
+«Мои книги»: список книг пользователя с фильтром по статусу и сортировкой.
+
+Чтобы страница читалась одним проходом по индексу, ключи сортировки лежат
+в самой user_books: title_sort, author_sort и series_sort копируются из
+books и series, а changed_at — время последней смены статуса. Индекс
+(user_id, status, ключ, book_id) покрывает и фильтр, и порядок, поэтому книги
+других пользователей и других статусов не читаются; список без фильтра идёт
+по (user_id, ключ, book_id). Временное B-дерево для сортировки не строится.
+status в индексы без фильтра не входит: смена статуса переписывает только
+индексы со статусом и индекс changed_at.
+
+Ключи поддерживают триггеры: при добавлении строки user_books, смене
+статуса и при правке названия, авторов или серии книги, переименовании
+серии. Книги без автора или серии идут в конце списка.
+"""
+from booktracker.pagination import KeysetView
+
+# Ключ для книг без автора или серии: больше любого нормализованного названия
+_LAST = "char(1114111)"
+
+# Ключи сортировки книги {book_id}: (title_sort, author_sort, series_sort)
+_BOOK_KEYS = f"""(SELECT COALESCE(b.title_sort, ''),
+           COALESCE(bt_sort_key(b.authors_display), {_LAST}),
+           COALESCE(s.name_sort || ' ' || printf('%010d', COALESCE(b.series_order, 0)), {_LAST})
+    FROM books b LEFT JOIN series s ON s.id = b.series_id WHERE b.id = {{book_id}})"""
+
+# Время с миллисекундами: порядок «недавно изменённые» различает частые правки
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def _refresh_keys(where):
+    return (f"UPDATE user_books SET (title_sort, author_sort, series_sort) = "
+            f"{_BOOK_KEYS.format(book_id='user_books.book_id')} WHERE {where};")
+
+
+SHELF_TRIGGERS = {
+    "user_books_shelf_ai": ("AFTER INSERT ON user_books BEGIN "
+                            + _refresh_keys("user_id = NEW.user_id AND book_id = NEW.book_id")
+                            + f"UPDATE user_books SET changed_at = {_NOW} "
+                              "WHERE user_id = NEW.user_id AND book_id = NEW.book_id; END"),
+    "user_books_shelf_au": ("AFTER UPDATE OF status ON user_books WHEN OLD.status IS NOT NEW.status BEGIN "
+                            f"UPDATE user_books SET changed_at = {_NOW} "
+                            "WHERE user_id = NEW.user_id AND book_id = NEW.book_id; END"),
+    "books_shelf_au": ("AFTER UPDATE OF title_sort, authors_display, series_id, series_order ON books BEGIN "
+                       + _refresh_keys("book_id = NEW.id") + " END"),
+    "series_shelf_au": ("AFTER UPDATE OF name_sort ON series BEGIN "
+                        + _refresh_keys("book_id IN (SELECT id FROM books WHERE series_id = NEW.id)") + " END"),
+}
+
+# Сортировка: колонка user_books и порядок (недавно изменённые — сверху)
+SORTS = {
+    "title": ("title_sort", False),
+    "author": ("author_sort", False),
+    "series": ("series_sort", False),
+    "recent": ("changed_at", True),
+}
+DEFAULT_SORT = "title"
+
+# Слова после /my: английские имена и русские синонимы
+STATUS_ALIASES = {
+    "reading": "reading", "читаю": "reading",
+    "finished": "finished", "прочитано": "finished", "прочитанные": "finished",
+    "planning": "planning", "planned": "planning", "запланировано": "planning", "планы": "planning",
+    "cancelled": "cancelled", "отменено": "cancelled", "брошенные": "cancelled",
+    "all": None, "все": None,
+}
+SORT_ALIASES = {
+    "title": "title", "название": "title",
+    "author": "author", "автор": "author",
+    "series": "series", "серия": "series",
+    "recent": "recent", "недавние": "recent",
+}
+STATUSES = ("planning", "reading", "finished", "cancelled")
+
+
+def add_shelf_keys(cur):
+    """Шаг миграции: ключи сортировки в user_books, их заполнение, индексы и триггеры"""
+    for column in ("title_sort", "author_sort", "series_sort", "changed_at"):
+        cur.execute(f"ALTER TABLE user_books ADD COLUMN {column} TEXT")
+    # Время смены статуса у старых строк неизвестно — считаем, что все изменены сейчас
+    cur.execute(f"UPDATE user_books SET (title_sort, author_sort, series_sort) = "
+                f"{_BOOK_KEYS.format(book_id='user_books.book_id')}, changed_at = {_NOW}")
+    # (user_id, status) из миграции 2 — префикс idx_user_books_status_title_sort
+    cur.execute("DROP INDEX IF EXISTS idx_user_books_user_status")
+    for column, _ in SORTS.values():
+        cur.execute(f"CREATE INDEX idx_user_books_status_{column} ON user_books(user_id, status, {column}, book_id)")
+        # Без status: смена статуса не переписывает индексы списка без фильтра (кроме changed_at)
+        cur.execute(f"CREATE INDEX idx_user_books_{column} ON user_books(user_id, {column}, book_id)")
+    for name, body in SHELF_TRIGGERS.items():
+        cur.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def parse_shelf_args(args):
+    """Слова после /my → (статус или None, сортировка); неизвестное слово — ValueError"""
+    status, sort = None, DEFAULT_SORT
+    for word in args:
+        word = word.lower()
+        if word in STATUS_ALIASES:
+            status = STATUS_ALIASES[word]
+        elif word in SORT_ALIASES:
+            sort = SORT_ALIASES[word]
+        else:
+            raise ValueError(word)
+    return status, sort
+
+
+def shelf_view_name(status, sort):
+    """Имя вида для PAGED_LISTS и callback_data: my.<статус|all>.<сортировка>"""
+    return f"my.{status or 'all'}.{sort}"
+
+
+def shelf_views(page_size):
+    """Все сочетания фильтра и сортировки: [(status, sort, KeysetView)]; where ждёт (user_id[, status])"""
+    views = []
+    for status in (None, *STATUSES):
+        where = "ub.user_id = ?" if status is None else "ub.user_id = ? AND ub.status = ?"
+        for sort, (column, descending) in SORTS.items():
+            views.append((status, sort, KeysetView(
+                shelf_view_name(status, sort), "b.title, b.authors_display, ub.status",
+                "user_books ub CROSS JOIN books b ON b.id = ub.book_id", f"ub.{column}", "ub.book_id",
+                where=where, page_size=page_size, descending=descending)))
+    return views
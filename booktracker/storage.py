@@ -0,0 +1,50 @@
+"""
+Профили хранения SQLite.
+
+Профиль — именованный набор PRAGMA, который применяется к каждому новому
+подключению. «default» оставляет настройки SQLite по умолчанию (журнал
+отката, synchronous=FULL), «tuned» включает WAL: читатели не блокируют
+писателя, а COMMIT не делает полный fsync базы.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+STORAGE_PROFILES = {
+    "default": {},
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16384,  # отрицательное значение — в КиБ, т.е. 16 МБ
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+# Настройки, о которых сообщаем при запуске
+REPORTED_SETTINGS = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+
+def apply_profile(conn, name):
+    """Применяет профиль хранения к подключению"""
+    try:
+        settings = STORAGE_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный профиль хранения: {name}") from None
+    for pragma, value in settings.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def read_settings(conn):
+    """Возвращает фактические значения настроек хранения подключения"""
+    return {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in REPORTED_SETTINGS}
+
+
+def checkpoint(conn):
+    """Пассивная контрольная точка WAL: переносит страницы в базу, не мешая читателям и писателю.
+
+    Возвращает (busy, страниц в WAL, перенесено страниц).
+    """
+    return conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
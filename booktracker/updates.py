@@ -0,0 +1,63 @@
+"""
+Параллельная обработка обновлений с очередью на каждого пользователя.
+
+Без concurrent_updates Application обрабатывает обновления строго по одному,
+и долгий экспорт или загрузка обложки одного пользователя задерживают всех.
+PerUserUpdateProcessor разрешает до max_concurrent_updates обработчиков
+одновременно, но обновления одного пользователя идут по очереди, в порядке
+прихода: шаги ConversationHandler и правки одной книги не перемешиваются.
+
+Сначала берётся замок пользователя, и только потом — общий слот. Иначе
+пользователь, приславший много сообщений подряд, занял бы ожидающими
+обновлениями все слоты, и остальные ждали бы его очередь.
+"""
+import asyncio
+
+from telegram.ext import BaseUpdateProcessor
+
+
+def update_owner(update):
+    """Чьи обновления идут по очереди: id пользователя, иначе чата; None — без очереди"""
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(update, "effective_chat", None)
+    return chat.id if chat is not None else None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Общий предел одновременных обновлений и порядок обновлений каждого пользователя"""
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # id → [замок, сколько обновлений его ждут или держат]; пустые удаляются
+        self._locks = {}
+
+    @property
+    def waiting_users(self):
+        """Пользователей с обновлениями в обработке или в очереди"""
+        return len(self._locks)
+
+    async def process_update(self, update, coroutine):
+        owner = update_owner(update)
+        if owner is None:
+            await super().process_update(update, coroutine)
+            return
+        entry = self._locks.setdefault(owner, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[owner]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
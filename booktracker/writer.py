@@ -0,0 +1,147 @@
+"""
+Единственный писатель в базу с групповой фиксацией (group commit).
+
+Все изменения данных ставятся в очередь. Задача-писатель забирает задания
+пачками (не больше max_batch штук или сколько успело прийти за max_wait_ms)
+и выполняет их в одной транзакции на своём подключении: N изменений — один
+COMMIT и один fsync. Каждое задание выполняется внутри SAVEPOINT, поэтому
+ошибка одного задания не откатывает остальные, а вызывающий получает именно
+свой результат или своё исключение.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from booktracker.normalize import register_functions
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Очередь изменений с пакетной фиксацией на единственном подключении для записи"""
+
+    def __init__(self, connect, max_batch=64, max_wait_ms=5):
+        self._connect = connect
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._conn = None
+        self._queue = None
+        self._task = None
+        # Отдельный поток, чтобы запись тоже не блокировала цикл событий
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="booktracker-writer")
+        self.commits = 0  # Количество зафиксированных транзакций
+        self.jobs = 0  # Количество выполненных заданий
+        # Поколение данных: растёт после каждой фиксации, изменившей базу (для сброса кэшей)
+        self.generation = 0
+        # Кэши, которые задания заполняют на подключении писателя (NameCache):
+        # привязываются к нему и сбрасываются при любом откате
+        self.caches = []
+
+    def _ensure_started(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, fn, *args):
+        """Ставит fn(cursor, *args) в очередь и ждёт результат после фиксации пачки"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, args, future))
+        return await future
+
+    async def _collect_batch(self, first):
+        """Добирает задания к первому, пока не заполнится пачка или не истечёт ожидание"""
+        loop = asyncio.get_running_loop()
+        batch = [first]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if job is None:
+                # Сигнал остановки обработаем после текущей пачки
+                self._queue.put_nowait(None)
+                break
+            batch.append(job)
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                break
+            batch = await self._collect_batch(job)
+            jobs = [(fn, args) for fn, args, _future in batch]
+            results = await loop.run_in_executor(self._executor, self._commit_batch, jobs)
+            for (_fn, _args, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _connection(self):
+        if self._conn is None:
+            # Триггеры нормализованных ключей вызывают bt_normalize/bt_sort_key
+            self._conn = register_functions(self._connect())
+            # Транзакциями управляем сами: BEGIN/SAVEPOINT/COMMIT
+            self._conn.isolation_level = None
+            for cache in self.caches:
+                cache.bind(self._conn)
+        return self._conn
+
+    def _clear_caches(self):
+        for cache in self.caches:
+            cache.clear()
+
+    def _commit_batch(self, jobs):
+        """Выполняет пачку заданий в одной транзакции (в потоке писателя)"""
+        conn = self._connection()
+        cur = conn.cursor()
+        results = []
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for fn, args in jobs:
+                cur.execute("SAVEPOINT job")
+                try:
+                    results.append((True, fn(cur, *args)))
+                    cur.execute("RELEASE job")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO job")
+                    cur.execute("RELEASE job")
+                    self._clear_caches()
+                    results.append((False, e))
+            cur.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Ошибка при фиксации пачки изменений: {e}")
+            if conn.in_transaction:
+                conn.rollback()
+            self._clear_caches()
+            return [(False, e)] * len(jobs)
+        finally:
+            cur.close()
+        self.commits += 1
+        self.jobs += len(jobs)
+        if any(ok for ok, _value in results):
+            self.generation += 1
+        return results
+
+    async def close(self):
+        """Дожидается обработки очереди и закрывает подключение"""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+        self._executor.shutdown(wait=True)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
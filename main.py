@@ -8,20 +8,50 @@
 # По мере переноса кода, этот план будет обновляться.
 # ------------------------------
 # mypy: disable-error-code="union-attr,index"
+import asyncio
+import functools
+import html
 import logging
 import os
 import re
+import secrets
 import sqlite3
+import tempfile
 from datetime import datetime
+from itertools import islice
+from urllib.parse import urlsplit
 
 from dotenv import load_dotenv
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import (
+    Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup,
+    InlineQueryResultArticle, InlineQueryResultCachedPhoto, InputTextMessageContent
+)
+from telegram.error import BadRequest
 from telegram.ext import (
-    ApplicationBuilder, CommandHandler, MessageHandler,
+    ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler, InlineQueryHandler,
     filters, ContextTypes, ConversationHandler
 )
 
-from booktracker.db import conn, cursor
+from booktracker.aiodb import AsyncDatabase, from_context
+from booktracker.backup import make_backup
+from booktracker.cache import GenerationCache
+from booktracker.counters import repair_counters
+from booktracker.covers import CoverStore, default_covers_dir
+from booktracker.debounce import Debouncer
+from booktracker.export import FORMATS as EXPORT_FORMATS, export_filename, write_export
+from booktracker.importer import IMPORT_BATCH, ImportFormatError, ImportState, import_batch, read_records
+from booktracker.jobs import LOW, NORMAL, RUNNING, STATE_LABELS, JobEngine, shielded
+from booktracker.migrations import migrate_path
+from booktracker.names import NameCache, resolve_names
+from booktracker.normalize import normalize
+from booktracker.pagination import CALLBACK_PREFIX, NEXT, PREV, KeysetView, parse_callback_data
+from booktracker.picker import CURSOR_KEY, PICK_PREFIX, BookPicker, parse_pick_data
+from booktracker.quickadd import QUICKADD_LIMIT, parse_quick_add
+from booktracker.search import SEARCH_LIMIT, HIGHLIGHT_START, HIGHLIGHT_END, find_books, find_book_cards
+from booktracker.series import SeriesBrowser, find_series, load_series
+from booktracker.shelf import DEFAULT_SORT, parse_shelf_args, shelf_view_name, shelf_views
+from booktracker.storage import checkpoint, read_settings
+from booktracker.updates import PerUserUpdateProcessor
 from booktracker.utils import owner_only
 from booktracker.keyboards import menu_keyboard, cancel_keyboard, status_keyboard
 from booktracker.handlers import universal_cancel, add_cancel, status_cancel, search_cancel, book_info_cancel, delete_book_cancel, edit_book_cancel
@@ -30,7 +60,15 @@ from booktracker.handlers import universal_cancel, add_cancel, status_cancel, se
 load_dotenv()
 
 TOKEN = os.getenv("BOT_TOKEN")  # Токен бота, полученный от BotFather
+BOT_API_URL = os.getenv("BOT_API_URL")  # Свой сервер Bot API (по умолчанию https://api.telegram.org)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Публичный HTTPS-адрес вебхука; не задан — опрос getUpdates
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")  # Адрес встроенного HTTP-сервера (TLS — на обратном прокси)
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))  # Порт встроенного HTTP-сервера
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)  # Секрет в заголовке запросов Telegram; по умолчанию новый при каждом запуске
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))  # Одновременных соединений Telegram к вебхуку
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "16"))  # Обновлений в обработке одновременно; у одного пользователя — по очереди
 ALLOWED_IDS = set(map(int, os.getenv("ALLOWED_IDS", "").split(",")))  # Список ID пользователей, которым разрешён доступ
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").split(",") if i.strip()}  # Кому доступны снимки базы (/export_db); не задано — никому
 
 # Настройка логирования
 logging.basicConfig(
@@ -40,62 +78,81 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)  # Создание логгера для текущего модуля
 
+DB_PATH = os.getenv("DB_PATH", "books.db")  # Путь к файлу базы данных
+DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))  # Количество потоков для запросов к базе
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "64"))  # Максимум изменений в одной транзакции
+DB_WRITE_MAX_WAIT_MS = int(os.getenv("DB_WRITE_MAX_WAIT_MS", "5"))  # Сколько ждать попутные изменения, мс
+DB_STORAGE_PROFILE = os.getenv("DB_STORAGE_PROFILE", "tuned")  # Профиль хранения из booktracker/storage.py
+DB_CHECKPOINT_INTERVAL = int(os.getenv("DB_CHECKPOINT_INTERVAL", "300"))  # Период контрольной точки WAL, сек
+COVERS_DIR = default_covers_dir(DB_PATH)  # Каталог с файлами обложек
+COVER_CACHE_CHAT_ID = os.getenv("COVER_CACHE_CHAT_ID")  # Чат для получения file_id старых обложек
+COVER_BACKFILL_INTERVAL = int(os.getenv("COVER_BACKFILL_INTERVAL", "60"))  # Период дозаполнения file_id, сек
+COVER_BACKFILL_BATCH = int(os.getenv("COVER_BACKFILL_BATCH", "10"))  # Обложек за один запуск
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "20"))  # Строк на странице списков
+SERIES_PAGE_SIZE = int(os.getenv("SERIES_PAGE_SIZE", "5"))  # Серий на странице (каждая — со всеми книгами)
+PICKER_PAGE_SIZE = int(os.getenv("PICKER_PAGE_SIZE", "10"))  # Книг на странице выбора книги
+MESSAGE_LIMIT = 4096  # Максимальная длина сообщения Telegram
+DOCUMENT_LIMIT = 50 * 1024 * 1024  # Максимальный размер файла, который бот может отправить
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))  # Запросов в кэше поиска
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))  # Время жизни результата поиска, сек
+NAME_CACHE_SIZE = int(os.getenv("NAME_CACHE_SIZE", "4096"))  # id авторов и серий в кэше писателя
+INLINE_LIMIT = min(int(os.getenv("INLINE_LIMIT", "20")), 50)  # Результатов в ответе на inline-запрос (Telegram: до 50)
+EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(1024 * 1024)))  # Экспорт до этого размера — в памяти, больше — во временном файле
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Фоновых заданий (экспорт, импорт, снимок базы) одновременно; меньше DB_WORKERS
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "2"))  # Как часто обновлять сообщение о ходе задания, сек
+INLINE_DEBOUNCE_MS = int(os.getenv("INLINE_DEBOUNCE_MS", "150"))  # Пауза перед поиском по inline-запросу, мс
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "30"))  # Сколько Telegram кэширует найденные результаты, сек
+INLINE_EMPTY_CACHE_TIME = int(os.getenv("INLINE_EMPTY_CACHE_TIME", "5"))  # То же для пустого ответа, сек
+
+# Пул потоков с отдельным подключением в каждом — запросы не блокируют цикл событий,
+# изменения фиксируются пачками единственным писателем
+database = AsyncDatabase(
+    DB_PATH,
+    max_workers=DB_WORKERS,
+    write_batch_size=DB_WRITE_BATCH_SIZE,
+    write_max_wait_ms=DB_WRITE_MAX_WAIT_MS,
+    profile=DB_STORAGE_PROFILE,
+)
+
+# Обложки хранятся файлами по SHA-256, в базе — только ссылка
+cover_store = CoverStore(COVERS_DIR)
+
+# Выбор книги кнопками в диалогах статуса, просмотра, удаления и редактирования
+book_picker = BookPicker(page_size=PICKER_PAGE_SIZE)
+
+# Результаты поиска по нормализованному запросу; сбрасываются при любой записи в базу
+search_cache = GenerationCache(max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# id авторов и серий по нормализованному имени; живёт на подключении писателя
+name_cache = NameCache(max_entries=NAME_CACHE_SIZE)
+database.writer.caches.append(name_cache)
+
+# Экспорт, импорт и снимок базы идут в фоне; обработчик сразу отвечает номером задания
+jobs = JobEngine(workers=JOB_WORKERS, progress_interval=JOB_PROGRESS_INTERVAL)
+
+# Inline-запросы приходят на каждое нажатие клавиши; отвечаем только на последний от пользователя
+inline_debouncer = Debouncer(INLINE_DEBOUNCE_MS / 1000)
+
+
+def get_db(context):
+    """База для обработчика: context.conn/context.cursor, если переданы, иначе общий пул"""
+    return from_context(context, database)
+
+
+def owner_only_callback(func):
+    """Аналог owner_only для нажатий inline-кнопок: у таких обновлений нет update.message"""
+    @functools.wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        user = update.effective_user
+        if user is None or user.id not in ALLOWED_IDS:
+            await update.callback_query.answer("⛔ У вас нет доступа.", show_alert=True)
+            return None
+        return await func(update, context, *args, **kwargs)
+    return wrapper
+
 # --- НАСТРОЙКА БАЗЫ ДАННЫХ ---
-# Подключение к базе данных SQLite (или создание, если её нет)
-# conn = sqlite3.connect("books.db", check_same_thread=False)
-# cursor = conn.cursor()
-# Создание таблицы для серий книг, если она ещё не существует
-# cursor.execute("""
-# CREATE TABLE IF NOT EXISTS series (
-#     id INTEGER PRIMARY KEY AUTOINCREMENT,
-#     name TEXT UNIQUE COLLATE NOCASE
-# )
-# """)
-
-# Создание таблицы для книг, если она ещё не существует
-# cursor.execute("""
-# CREATE TABLE IF NOT EXISTS books (
-#     id INTEGER PRIMARY KEY AUTOINCREMENT,
-#     title TEXT UNIQUE,
-#     description TEXT,
-#     image_blob BLOB,
-#     series_id INTEGER,
-#     series_order INTEGER,
-#     isbn TEXT,
-#     FOREIGN KEY (series_id) REFERENCES series(id)
-# )
-# """)
-
-# Создание таблицы для авторов, если она ещё не существует
-# cursor.execute("""
-# CREATE TABLE IF NOT EXISTS authors (
-#     id INTEGER PRIMARY KEY AUTOINCREMENT,
-#     name TEXT UNIQUE
-# )
-# """)
-
-# Создание таблицы для связи книг и авторов, если она ещё не существует
-# cursor.execute("""
-# CREATE TABLE IF NOT EXISTS book_authors (
-#     book_id INTEGER,
-#     author_id INTEGER,
-#     PRIMARY KEY (book_id, author_id),
-#     FOREIGN KEY (book_id) REFERENCES books(id),
-#     FOREIGN KEY (author_id) REFERENCES authors(id)
-# )
-# """)
-
-# Создание таблицы для связи пользователей и книг, если она ещё не существует
-# cursor.execute("""
-# CREATE TABLE IF NOT EXISTS user_books (
-#     user_id INTEGER,
-#     book_id INTEGER,
-#     status TEXT CHECK(status IN ('planning', 'reading', 'finished', 'cancelled')),
-#     PRIMARY KEY (user_id, book_id),
-#     FOREIGN KEY (book_id) REFERENCES books(id)
-# )
-# """)
-# conn.commit()  # Сохранение изменений в базе данных
+# Схема базы данных и её версии описаны в booktracker/migrations.py;
+# недостающие миграции применяются при запуске бота (см. main()).
 
 
 # --- ДЕКОРАТОР ДЛЯ КОНТРОЛЯ ДОСТУПА ---
@@ -154,6 +211,8 @@ async def add_cover(update: Update, context: ContextTypes.DEFAULT_TYPE):
         file = await update.message.photo[-1].get_file()  # Получение файла изображения
         byte_data = await file.download_as_bytearray()  # Преобразование изображения в байты
         context.user_data['new_book']['image_blob'] = byte_data  # Сохранение обложки
+        # file_id уже есть у присланного фото — по нему обложку можно отправлять без повторной загрузки
+        context.user_data['new_book']['cover_file_id'] = photo_file_id(update.message)
         await update.message.reply_text("Введите ISBN книги (или пропусти, отправив '-'):")
         return ADD_ISBN  # Переход к состоянию ADD_ISBN
     except Exception as e:
@@ -193,14 +252,7 @@ async def add_authors(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def add_series(update: Update, context: ContextTypes.DEFAULT_TYPE):
     series_name = update.message.text.strip()
     if series_name != "-":  # Если серия указана
-        cursor.execute("SELECT id FROM series WHERE name = ? COLLATE NOCASE", (series_name,))
-        result = cursor.fetchone()
-
-        if result:
-            series_id = result[0]
-        else:
-            cursor.execute("INSERT INTO series (name) VALUES (?)", (series_name,))
-            series_id = cursor.lastrowid
+        series_id = await get_db(context).transaction(_get_or_create_series, series_name)
         context.user_data['new_book']['series_id'] = series_id  # Сохранение ID серии
         await update.message.reply_text("Введите номер книги в серии:")
         return ADD_SERIES_ORDER  # Переход к состоянию ADD_SERIES_ORDER
@@ -221,45 +273,135 @@ async def add_series_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return await finalize_book(update, context)
 
 
+def _get_or_create_series(cur, series_name):
+    """Возвращает ID серии по названию, создавая её при необходимости"""
+    return resolve_names(cur, "series", [series_name], name_cache)[normalize(series_name)]
+
+
+def _set_book_authors(cur, book_id, author_names):
+    """Привязывает авторов к книге, создавая отсутствующих"""
+    author_ids = resolve_names(cur, "authors", author_names, name_cache)
+    # Порядок связей — порядок ввода (по нему строится authors_display)
+    cur.executemany("INSERT OR IGNORE INTO book_authors (book_id, author_id) VALUES (?, ?)",
+                    ((book_id, author_ids[normalize(name)]) for name in author_names))
+
+
+def _book_exists(cur, title):
+    """Есть ли книга с таким названием (без учёта регистра, «ё» и пунктуации)"""
+    return cur.execute("SELECT 1 FROM books WHERE title_norm = ?", (normalize(title),)).fetchone() is not None
+
+
+def _insert_book(cur, data):
+    """Добавляет книгу с авторами; возвращает None, если книга с таким названием уже есть"""
+    if _book_exists(cur, data['title']):
+        # Книгу с тем же названием успели добавить между проверкой и транзакцией
+        cover_store.delete_if_unused(cur, data.get('cover_sha256'))
+        return None
+
+    # Добавляем книгу; обложка уже сохранена в хранилище, в книге — только ссылка на неё.
+    # Если файл успело удалить задание писателя, снявшее прежнюю ссылку, — пишем его заново
+    if data.get('cover_sha256'):
+        cover_store.put(data['image_blob'])
+    cur.execute("""
+        INSERT INTO books (title, description, cover_sha256, cover_file_id, isbn, series_id, series_order)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (data['title'], data['description'], data.get('cover_sha256'), data.get('cover_file_id'), data['isbn'],
+          data.get('series_id'), data.get('series_order')))
+
+    book_id = cur.lastrowid
+
+    # Добавляем авторов
+    _set_book_authors(cur, book_id, data['authors'])
+    return book_id
+
+
 async def finalize_book(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         data = context.user_data['new_book']
+        db = get_db(context)
+        # Файл обложки пишем до транзакции и вне цикла событий; для дубликата — не пишем
+        if not await db.run(_book_exists, data['title']):
+            data['cover_sha256'] = await asyncio.to_thread(cover_store.put, data.get('image_blob'))
 
-        # Проверяем, не существует ли уже книга с таким названием
-        cursor.execute("SELECT id FROM books WHERE title = ?", (data['title'],))
-        existing_book = cursor.fetchone()
-        if existing_book:
+        book_id = await db.transaction(_insert_book, data)
+        if book_id is None:
             await update.message.reply_text(f"Книга «{data['title']}» уже существует в базе данных.", reply_markup=menu_keyboard)
             return ConversationHandler.END
 
-        # Добавляем книгу
-        cursor.execute("""
-            INSERT INTO books (title, description, image_blob, isbn, series_id, series_order)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (data['title'], data['description'], data['image_blob'], data['isbn'], data.get('series_id'),
-              data.get('series_order')))
-
-        book_id = cursor.lastrowid
-
-        # Добавляем авторов
-        for name in data['authors']:
-            cursor.execute("INSERT OR IGNORE INTO authors (name) VALUES (?)", (name,))
-            cursor.execute("SELECT id FROM authors WHERE name = ?", (name,))
-            author_id = cursor.fetchone()[0]
-            cursor.execute("INSERT OR IGNORE INTO book_authors (book_id, author_id) VALUES (?, ?)",
-                           (book_id, author_id))
-
-        conn.commit()
         await update.message.reply_text(f"Книга «{data['title']}» добавлена ✅", reply_markup=menu_keyboard)
         return ConversationHandler.END
 
     except Exception as e:
-        conn.rollback()
         logger.error(f"Ошибка при добавлении книги: {e}")
         await update.message.reply_text("Произошла ошибка при добавлении книги. Попробуйте еще раз.", reply_markup=menu_keyboard)
         return ConversationHandler.END
 
 
+def _insert_books(cur, books):
+    """Добавляет книги одной транзакцией тем же _insert_book; [(название, id или None, если уже есть)]"""
+    added = []
+    for data in books:
+        # Серия создаётся только для книги, которая действительно будет добавлена
+        if _book_exists(cur, data['title']):
+            cover_store.delete_if_unused(cur, data.get('cover_sha256'))
+            added.append((data['title'], None))
+            continue
+        data['series_id'] = _get_or_create_series(cur, data['series']) if data.get('series') else None
+        added.append((data['title'], _insert_book(cur, data)))
+    return added
+
+
+QUICKADD_USAGE = ("Формат: /quickadd Название | Автор, Автор | Серия #2 | ISBN\n"
+                  "Несколько книг — по одной на строке. Поле «описание: …» добавляет описание, "
+                  "а фото с такой подписью становится обложкой.")
+
+
+@owner_only
+async def quick_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Добавление книг одним сообщением: /quickadd или фото с подписью /quickadd"""
+    message = update.message
+    parts = ((message.caption if message.photo else message.text) or "").split(maxsplit=1)
+    books, errors = parse_quick_add(parts[1] if len(parts) > 1 else "")
+    if not books and not errors:
+        await message.reply_text(QUICKADD_USAGE)
+        return
+    if len(books) > QUICKADD_LIMIT:
+        await message.reply_text(f"За один раз можно добавить до {QUICKADD_LIMIT} книг. "
+                                 "Для больших списков пришлите файл CSV или JSON Lines.")
+        return
+    if message.photo and len(books) != 1:
+        await message.reply_text("Обложку можно приложить только к одной книге.")
+        return
+
+    db = get_db(context)
+    try:
+        # Обложку дубликата не скачиваем и не сохраняем
+        if message.photo and books and not await db.run(_book_exists, books[0]['title']):
+            file = await message.photo[-1].get_file()
+            blob = await file.download_as_bytearray()
+            # Файл обложки пишем до транзакции и вне цикла событий, как в finalize_book
+            books[0]['cover_sha256'] = await asyncio.to_thread(cover_store.put, blob)
+            books[0]['image_blob'] = blob
+            books[0]['cover_file_id'] = photo_file_id(message)
+        results = await db.transaction(_insert_books, books) if books else []
+    except Exception as e:
+        logger.error(f"Ошибка при быстром добавлении книг: {e}")
+        await message.reply_text("Произошла ошибка при добавлении книг. Попробуйте еще раз.")
+        return
+
+    added = [title for title, book_id in results if book_id is not None]
+    existing = [title for title, book_id in results if book_id is None]
+    lines = []
+    if added:
+        lines.append(f"✅ Добавлено: {len(added)}\n" + "\n".join(f"• {title}" for title in added))
+    if existing:
+        lines.append("Уже есть в базе:\n" + "\n".join(f"• {title}" for title in existing))
+    if errors:
+        lines.append("Не разобраны:\n" + "\n".join(f"• строка {number}: {reason}" for number, reason in errors)
+                     + "\n\n" + QUICKADD_USAGE)
+    await message.reply_text("\n\n".join(lines)[:MESSAGE_LIMIT], reply_markup=menu_keyboard)
+
+
 @owner_only
 async def add_cancel(update: Update, _context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Добавление книги отменено", reply_markup=menu_keyboard)
@@ -271,68 +413,274 @@ async def menu_handler(update: Update, _context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Выберите действие:", reply_markup=menu_keyboard)
 
 
+def _format_books_page(rows):
+    return "📚 Список книг:\n" + "\n".join(title for title, _ in rows)
+
+
+# Значки статусов в списках
+STATUS_EMOJI = {
+    'planning': '📋',
+    'reading': '📖',
+    'finished': '✅',
+    'cancelled': '❌'
+}
+
+
+# Названия статусов; таблицы заполнены один раз, строки списков только читают их
+STATUS_LABELS = {
+    'planning': 'Запланировано',
+    'reading': 'Читаю',
+    'finished': 'Прочитано',
+    'cancelled': 'Отменено'
+}
+
+# Подписи сортировок «Моих книг»
+SORT_LABELS = {
+    'title': 'по названию',
+    'author': 'по автору',
+    'series': 'по серии',
+    'recent': 'недавно изменённые'
+}
+
+
+def _format_my_books_page(rows, status=None, sort=DEFAULT_SORT):
+    """Страница «Моих книг»; при фильтре по статусу статус в строках не повторяется"""
+    header = "📖 Ваши книги"
+    if status is not None:
+        header += f" — {STATUS_LABELS[status]}"
+    if sort != DEFAULT_SORT:
+        header += f" ({SORT_LABELS[sort]})"
+    lines = []
+    for title, authors, book_status, _ in rows:
+        line = f"{STATUS_EMOJI.get(book_status, '❓')} {title}"
+        if authors:
+            line += f" — {authors}"
+        if status is None:
+            line += f" · {STATUS_LABELS.get(book_status, book_status)}"
+        lines.append(line)
+    return header + ":\n\n" + "\n".join(lines)
+
+
+def _shelf_list(status, sort, view):
+    """Запись PAGED_LISTS для «Моих книг» с фильтром status (None — все статусы)"""
+    if status is None:
+        empty_text = "У вас нет отмеченных книг. Используйте кнопку «🏷 Статусы» чтобы добавить книги в свой список."
+        return (view, lambda rows: _format_my_books_page(rows, None, sort), empty_text,
+                lambda update: (update.effective_user.id,))
+    return (view, lambda rows: _format_my_books_page(rows, status, sort),
+            f"У вас нет книг со статусом «{STATUS_LABELS[status]}».",
+            lambda update: (update.effective_user.id, status))
+
+
+def _format_series(name, finished, total, books):
+    """Серия с прогрессом пользователя и книгами по порядку"""
+    if not total:
+        return f"📚 {name}: книг пока нет"
+    lines = [f"📚 {name} — прочитано {finished} из {total}:"]
+    for order, title, status in books:
+        mark = f" {STATUS_EMOJI[status]}" if status in STATUS_EMOJI else ""
+        lines.append(f"  {f'{order}.' if order else '•'} {title}{mark}")
+    return "\n".join(lines)
+
+
+def _format_series_page(rows):
+    return "\n\n".join(_format_series(*entry[:4]) for entry in rows)
+
+
+def _format_covers_page(rows):
+    return "📷 Книги с обложками:\n\n" + "\n".join(title for title, _ in rows)
+
+
+# Постраничные списки: вид, форматирование страницы, текст для пустого списка, параметры where
+PAGED_LISTS = {
+    view.name: (view, render, empty_text, params)
+    for view, render, empty_text, params in [
+        (KeysetView("books", "title", "books", "title_sort", "id", page_size=PAGE_SIZE),
+         _format_books_page, "Библиотека пуста", lambda update: ()),
+        # Серии страницы вместе с книгами и прогрессом пользователя — один запрос (booktracker/series.py)
+        (SeriesBrowser(page_size=SERIES_PAGE_SIZE),
+         _format_series_page, "Серии не найдены", lambda update: (update.effective_user.id,)),
+        (KeysetView("covers", "title", "books", "title_sort", "id", where="cover_sha256 IS NOT NULL",
+                    page_size=PAGE_SIZE),
+         _format_covers_page, "В библиотеке пока нет книг с обложками.", lambda update: ()),
+        # «Мои книги»: все сочетания фильтра по статусу и сортировки, каждое — обход своего индекса
+        # user_books (booktracker/shelf.py)
+        *(_shelf_list(*entry) for entry in shelf_views(PAGE_SIZE)),
+    ]
+}
+
+
+def page_keyboard(view, page):
+    """Inline-кнопки «назад/вперёд» для страницы или None, если страница единственная"""
+    buttons = []
+    if page.has_prev:
+        buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=view.callback_data(PREV, page.rows[0][-1])))
+    if page.has_next:
+        buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=view.callback_data(NEXT, page.rows[-1][-1])))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+async def show_page(update: Update, context: ContextTypes.DEFAULT_TYPE, name, anchor_id=None, direction=NEXT,
+                    query=None):
+    """Показывает страницу списка новым сообщением или, для нажатия кнопки query, правкой того же сообщения"""
+    view, render, empty_text, params = PAGED_LISTS[name]
+    page = await get_db(context).run(view.fetch_page, params(update), anchor_id, direction)
+    text = render(page.rows) if page.rows else empty_text
+    if len(text) > MESSAGE_LIMIT:
+        text = text[:MESSAGE_LIMIT - 1] + "…"
+    markup = page_keyboard(view, page) if page.rows else None
+
+    if query is None:
+        await update.message.reply_text(text, reply_markup=markup)
+        return
+    try:
+        await query.edit_message_text(text, reply_markup=markup)
+    except BadRequest as e:
+        # «message is not modified» — страница не изменилась, править нечего
+        logger.debug(f"Страница «{name}» не обновлена: {e}")
+
+
 @owner_only
 async def list_books(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    cur = getattr(context, 'cursor', cursor)
-    cur.execute("SELECT title FROM books")
-    rows = cur.fetchall()
-    if rows:
-        text = "\n".join([row[0] for row in rows])
-        await update.message.reply_text("📚 Список книг:\n" + text)
-    else:
-        await update.message.reply_text("Библиотека пуста")
+    await show_page(update, context, "books")
 
 
 @owner_only
 async def my_books(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    cur = getattr(context, 'cursor', cursor)
-    user_id = update.effective_user.id
-    cur.execute("""
-        SELECT b.title, ub.status FROM books b
-        JOIN user_books ub ON b.id = ub.book_id
-        WHERE ub.user_id = ?
-        ORDER BY b.title
-    """, (user_id,))
-    rows = cur.fetchall()
-
-    if rows:
-        status_emoji = {
-            'planning': '📋',
-            'reading': '📖',
-            'finished': '✅',
-            'cancelled': '❌'
-        }
-
-        lines = []
-        for title, status in rows:
-            emoji = status_emoji.get(status, '❓')
-            status_text = {
-                'planning': 'Запланировано',
-                'reading': 'Читаю',
-                'finished': 'Прочитано',
-                'cancelled': 'Отменено'
-            }.get(status, status)
-            lines.append(f"{emoji} {title} — {status_text}")
-
-        await update.message.reply_text("📖 Ваши книги:\n\n" + "\n".join(lines))
-    else:
-        await update.message.reply_text("У вас нет отмеченных книг. Используйте кнопку «🏷 Статусы» чтобы добавить книги в свой список.")
+    """Мои книги; /my [статус] [сортировка], например /my reading author или /my прочитано недавние"""
+    try:
+        status, sort = parse_shelf_args(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(
+            f"Не понимаю «{e}». Использование: /my [статус] [сортировка]\n"
+            "Статусы: reading, finished, planning, cancelled (или читаю, прочитано, запланировано, отменено)\n"
+            "Сортировка: title, author, series, recent (или название, автор, серия, недавние)")
+        return
+    await show_page(update, context, shelf_view_name(status, sort))
 
 
 @owner_only
 async def list_series(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    cur = getattr(context, 'cursor', cursor)
-    cur.execute("SELECT id, name FROM series")
-    rows = cur.fetchall()
-    if not rows:
-        await update.message.reply_text("Серии не найдены")
+    """Список серий по страницам или, для /series <название>, книги одной серии"""
+    if not context.args:
+        await show_page(update, context, "series")
+        return
+
+    name = ' '.join(context.args)
+    db = get_db(context)
+    matches = await db.run(find_series, name)
+    if not matches:
+        await update.message.reply_text(f"Серия «{name}» не найдена.")
+        return
+    if len(matches) > 1:
+        names = "\n".join(f"• {series_name}" for _, series_name in matches)
+        await update.message.reply_text(f"Под «{name}» подходит несколько серий, уточните название:\n\n{names}")
+        return
+
+    series = await db.run(load_series, matches[0][0], update.effective_user.id)
+    text = _format_series(*series) if series else f"Серия «{name}» не найдена."
+    if len(text) > MESSAGE_LIMIT:
+        text = text[:MESSAGE_LIMIT - 1] + "…"
+    await update.message.reply_text(text)
+
+
+@owner_only_callback
+async def page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Нажатие «назад/вперёд» под постраничным списком"""
+    query = update.callback_query
+    await query.answer()
+    try:
+        name, direction, anchor_id = parse_callback_data(query.data)
+    except ValueError:
         return
-    result = []
-    for series_id, name in rows:
-        cur.execute("SELECT title FROM books WHERE series_id = ? ORDER BY series_order", (series_id,))
-        books = [row[0] for row in cur.fetchall()]
-        result.append(f"📚 {name}:\n  " + "\n  ".join(books))
-    await update.message.reply_text("\n\n".join(result))
+    if name in PAGED_LISTS:
+        await show_page(update, context, name, anchor_id, direction, query=query)
+
+
+async def start_book_picker(update: Update, context: ContextTypes.DEFAULT_TYPE, prompt, empty_text, state):
+    """Показывает первую страницу выбора книги; возвращает state или END, если книг нет"""
+    page = await get_db(context).run(book_picker.fetch_page)
+    if not page.rows:
+        await update.message.reply_text(empty_text)
+        return ConversationHandler.END
+
+    context.user_data[CURSOR_KEY] = None
+    await update.message.reply_text(f"{prompt}\n\nНажмите на книгу, введите её номер или часть названия.",
+                                    reply_markup=book_picker.keyboard(page), parse_mode='Markdown')
+    return state
+
+
+async def typed_book_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """id книги по номеру на открытой странице или по введённому названию.
+
+    Если книга не определена однозначно, отправляет подсказку или кнопки с подходящими книгами
+    и возвращает None.
+    """
+    text = update.message.text.strip()
+    db = get_db(context)
+    if text.isdigit():
+        page = await db.run(book_picker.fetch_page, context.user_data.get(CURSOR_KEY))
+        book_index = int(text) - 1
+        if 0 <= book_index < len(page.rows):
+            context.user_data.pop(CURSOR_KEY, None)
+            return page.rows[book_index][-1]
+
+    # Не номер со страницы — ищем по названию (название может состоять и из цифр)
+    matches = await db.run(book_picker.resolve, text)
+    if len(matches.rows) == 1:
+        context.user_data.pop(CURSOR_KEY, None)
+        return matches.rows[0][-1]
+    if not matches.rows:
+        if text.isdigit():
+            await update.message.reply_text("Неверный номер книги. Попробуйте еще раз:")
+        else:
+            await update.message.reply_text(f"Книга «{text}» не найдена. Уточните название или выберите книгу кнопкой:")
+        return None
+
+    note = f"\n\nПоказаны первые {len(matches.rows)} — уточните название." if matches.has_next else ""
+    await update.message.reply_text(f"Под «{text}» подходит несколько книг, выберите нужную:{note}",
+                                    reply_markup=book_picker.keyboard(matches, numbered=False, navigation=False))
+    return None
+
+
+def book_picker_handler(on_chosen):
+    """Обработчик кнопок выбора книги для состояния диалога.
+
+    Листание правит клавиатуру того же сообщения и оставляет диалог в текущем состоянии,
+    «Отмена» завершает диалог, а выбранный book_id передаётся в
+    on_chosen(message, context, user_id, book_id), который возвращает следующее состояние.
+    """
+    @owner_only_callback
+    async def pick_book(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        await query.answer()
+        try:
+            book_id, cursor = parse_pick_data(query.data)
+        except ValueError:
+            return None
+
+        if cursor is not None:
+            page = await get_db(context).run(book_picker.fetch_page, cursor)
+            context.user_data[CURSOR_KEY] = cursor
+            try:
+                await query.edit_message_reply_markup(book_picker.keyboard(page))
+            except BadRequest as e:
+                logger.debug(f"Страница выбора книги не обновлена: {e}")
+            return None
+
+        context.user_data.pop(CURSOR_KEY, None)
+        if book_id is None:
+            await query.edit_message_text("Выбор книги отменён")
+            await query.message.reply_text("Выберите действие:", reply_markup=menu_keyboard)
+            return ConversationHandler.END
+        try:
+            # Кнопки больше не нужны — повторное нажатие не должно запускать шаг заново
+            await query.edit_message_reply_markup(None)
+        except BadRequest as e:
+            logger.debug(f"Не удалось убрать кнопки выбора книги: {e}")
+        return await on_chosen(query.message, context, update.effective_user.id, book_id)
+
+    return CallbackQueryHandler(pick_book, pattern=f"^{PICK_PREFIX}:")
 
 
 # Константы для состояний управления статусами
@@ -348,55 +696,51 @@ STATUS_SELECT_BOOK, STATUS_SELECT_STATUS = range(7, 9)
 @owner_only
 async def status_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса изменения статуса книги"""
-    cursor.execute("SELECT title FROM books ORDER BY title")
-    books = cursor.fetchall()
-    if not books:
-        await update.message.reply_text("В библиотеке нет книг для изменения статуса.")
+    return await start_book_picker(update, context, "Выберите книгу для изменения статуса:",
+                                   "В библиотеке нет книг для изменения статуса.", STATUS_SELECT_BOOK)
+
+
+async def status_book_chosen(message, context: ContextTypes.DEFAULT_TYPE, user_id, book_id):
+    """Книга для смены статуса выбрана: показываем текущий статус и клавиатуру статусов"""
+    book = await get_db(context).fetchone("""
+        SELECT b.title, ub.status FROM books b
+        LEFT JOIN user_books ub ON ub.book_id = b.id AND ub.user_id = ?
+        WHERE b.id = ?
+    """, (user_id, book_id))
+    if not book:
+        await message.reply_text("Книга не найдена.", reply_markup=menu_keyboard)
         return ConversationHandler.END
 
-    book_list = "\n".join([f"{i+1}. {book[0]}" for i, book in enumerate(books)])
-    context.user_data['available_books'] = [book[0] for book in books]
+    selected_book, current_status = book
+    context.user_data['selected_book_id'] = book_id
+    context.user_data['selected_book'] = selected_book  # Название для сообщений
 
-    await update.message.reply_text(
-        f"Выберите книгу для изменения статуса (введите номер):\n\n{book_list}",
-        reply_markup=cancel_keyboard
+    status_text = f"Текущий статус: {current_status or 'Не установлен'}"
+    await message.reply_text(
+        f"Книга: {selected_book}\n{status_text}\n\nВыберите новый статус:",
+        reply_markup=status_keyboard
     )
-    return STATUS_SELECT_BOOK
+    return STATUS_SELECT_STATUS
 
 
 @owner_only
 async def status_select_book(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка выбора книги"""
-    try:
-        book_index = int(update.message.text.strip()) - 1
-        available_books = context.user_data.get('available_books', [])
-
-        if book_index < 0 or book_index >= len(available_books):
-            await update.message.reply_text("Неверный номер книги. Попробуйте еще раз:")
-            return STATUS_SELECT_BOOK
-
-        selected_book = available_books[book_index]
-        context.user_data['selected_book'] = selected_book
+    """Обработка выбора книги по введённому номеру"""
+    book_id = await typed_book_id(update, context)
+    if book_id is None:
+        return STATUS_SELECT_BOOK
+    return await status_book_chosen(update.message, context, update.effective_user.id, book_id)
 
-        # Получаем текущий статус книги
-        user_id = update.effective_user.id
-        cursor.execute("""
-            SELECT ub.status FROM user_books ub
-            JOIN books b ON ub.book_id = b.id
-            WHERE b.title = ? AND ub.user_id = ?
-        """, (selected_book, user_id))
-        current_status = cursor.fetchone()
 
-        status_text = f"Текущий статус: {current_status[0] if current_status else 'Не установлен'}"
-        await update.message.reply_text(
-            f"Книга: {selected_book}\n{status_text}\n\nВыберите новый статус:",
-            reply_markup=status_keyboard
-        )
-        return STATUS_SELECT_STATUS
-
-    except ValueError:
-        await update.message.reply_text("Пожалуйста, введите числовой номер книги:")
-        return STATUS_SELECT_BOOK
+def _set_status(cur, user_id, book_id, status):
+    """Устанавливает статус книги для пользователя"""
+    # Обновляем или добавляем статус; UPSERT, а не REPLACE: замена строки не вызывает
+    # триггеры удаления, и счётчики статусов разошлись бы с данными
+    cur.execute("""
+        INSERT INTO user_books (user_id, book_id, status)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id, book_id) DO UPDATE SET status = excluded.status
+    """, (user_id, book_id, status))
 
 
 @owner_only
@@ -414,22 +758,13 @@ async def status_select_status(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("Неверный статус. Выберите из предложенных вариантов:")
         return STATUS_SELECT_STATUS
 
+    book_id = context.user_data['selected_book_id']
     selected_book = context.user_data['selected_book']
     status = status_mapping[status_text]
     user_id = update.effective_user.id
 
     try:
-        # Получаем ID книги
-        cursor.execute("SELECT id FROM books WHERE title = ?", (selected_book,))
-        book_id = cursor.fetchone()[0]
-
-        # Обновляем или добавляем статус
-        cursor.execute("""
-            INSERT OR REPLACE INTO user_books (user_id, book_id, status)
-            VALUES (?, ?, ?)
-        """, (user_id, book_id, status))
-
-        conn.commit()
+        await get_db(context).transaction(_set_status, user_id, book_id, status)
         await update.message.reply_text(
             f"Статус книги «{selected_book}» изменен на: {status_text}",
             reply_markup=menu_keyboard
@@ -452,41 +787,94 @@ async def status_cancel(update: Update, _context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
+async def cached_search(db, query, finder=find_books, limit=SEARCH_LIMIT):
+    """Результаты finder из кэша поиска; для внешнего подключения кэш не используется"""
+    text = normalize(query)
+    generation = db.generation
+    if generation is None:
+        return await db.run(finder, text, limit)
+    key = (finder.__name__, text, limit)
+    found, results = search_cache.get(key, generation)
+    if not found:
+        results = await db.run(finder, text, limit)
+        search_cache.put(key, results, generation)
+    logger.debug(f"Кэш поиска: {search_cache.stats()}")
+    return results
+
+
+def format_search_results(query, results):
+    """Текст ответа с результатами поиска (HTML, совпадения выделены жирным).
+
+    Книги добавляются целиком, пока текст с пометкой «уточните запрос» помещается в сообщение,
+    поэтому теги никогда не обрезаются.
+    """
+    text = f"🔍 Результаты поиска по запросу «{html.escape(query[:100])}»:\n"
+    # Место под пометку о неполном списке — с запасом на самое длинное число
+    note = "\n\nПоказаны первые {} совпадений — уточните запрос."
+    limit = MESSAGE_LIMIT - len(note.format(SEARCH_LIMIT))
+    shown = 0
+    for title, authors, snippet in results:
+        author_text = f" ({html.escape(authors)})" if authors else ""
+        entry = f"\n📚 {html.escape(title)}{author_text}"
+        if snippet:
+            snippet = html.escape(snippet).replace(HIGHLIGHT_START, "<b>").replace(HIGHLIGHT_END, "</b>")
+            entry += f"\n    <i>{snippet}</i>"
+        if len(text) + len(entry) > limit:
+            break
+        text += entry
+        shown += 1
+    if shown < len(results) or len(results) >= SEARCH_LIMIT:
+        text += note.format(shown)
+    return text
+
+
 @owner_only
 async def search_books(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Поиск книг по названию или автору"""
+    """Поиск книг по названию, автору, серии или описанию"""
     if not context.args:
         await update.message.reply_text("Использование: /search <поисковый запрос>\nИли нажмите кнопку «🔍 Поиск» и введите запрос.")
         return
 
     query = ' '.join(context.args)
-    search_term = f"%{query}%"
-    print("SEARCH_TERM:", search_term)
-
-    cursor.execute("""
-        SELECT DISTINCT b.title, GROUP_CONCAT(a.name, ', ') as authors
-        FROM books b
-        LEFT JOIN book_authors ba ON b.id = ba.book_id
-        LEFT JOIN authors a ON ba.author_id = a.id
-        WHERE b.title LIKE ? OR a.name LIKE ?
-        GROUP BY b.id, b.title
-        ORDER BY b.title
-    """, (search_term, search_term))
-
-    results = cursor.fetchall()
-    print("SEARCH_RESULTS:", results)
+    results = await cached_search(get_db(context), query)
 
     if results:
-        lines = []
-        for title, authors in results:
-            author_text = f" ({authors})" if authors else ""
-            lines.append(f"📚 {title}{author_text}")
-
-        await update.message.reply_text(f"🔍 Результаты поиска по запросу «{query}»:\n\n" + "\n".join(lines))
+        await update.message.reply_text(format_search_results(query, results), parse_mode='HTML')
     else:
         await update.message.reply_text(f"По запросу «{query}» ничего не найдено.")
 
 
+def inline_result(book_id, title, authors, cover_file_id):
+    """Карточка книги для inline-ответа: обложка по file_id, а без неё — текстовая статья"""
+    text = f"📚 {title}" + (f"\n✍️ {authors}" if authors else "")
+    if cover_file_id:
+        return InlineQueryResultCachedPhoto(id=str(book_id), photo_file_id=cover_file_id,
+                                            title=title, description=authors, caption=text)
+    return InlineQueryResultArticle(id=str(book_id), title=title, description=authors,
+                                    input_message_content=InputTextMessageContent(text))
+
+
+async def answer_inline_query(inline_query, db):
+    """Ищет книги по тексту inline-запроса и отвечает не более чем INLINE_LIMIT карточками"""
+    query = inline_query.query.strip()
+    books = await cached_search(db, query, find_book_cards, INLINE_LIMIT) if query else []
+    # Пустой ответ кэшируется ненадолго, чтобы только что добавленная книга быстро находилась
+    await inline_query.answer([inline_result(*book) for book in books],
+                              cache_time=INLINE_CACHE_TIME if books else INLINE_EMPTY_CACHE_TIME,
+                              is_personal=True)
+
+
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Поиск книг из любого чата: @бот <запрос>"""
+    user = update.effective_user
+    if user is None or user.id not in ALLOWED_IDS:
+        await update.inline_query.answer([], cache_time=INLINE_CACHE_TIME, is_personal=True)
+        return
+    answered, _ = await inline_debouncer.run(user.id, answer_inline_query, update.inline_query, get_db(context))
+    if not answered:
+        logger.debug(f"Inline-запрос «{update.inline_query.query}» устарел и отменён")
+
+
 # Константы для состояний поиска
 SEARCH_QUERY = 9
 
@@ -510,35 +898,17 @@ async def search_start(update: Update, _context: ContextTypes.DEFAULT_TYPE):
 @owner_only
 async def search_process(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка поискового запроса"""
-    cur = getattr(context, 'cursor', cursor)
     query = update.message.text.strip()
     if not query:
         await update.message.reply_text("Поисковый запрос не может быть пустым. Попробуйте еще раз:")
         return SEARCH_QUERY
 
-    search_term = f"%{query}%"
-    print("SEARCH_TERM:", search_term)
-
-    cur.execute("""
-        SELECT DISTINCT b.title, GROUP_CONCAT(a.name, ', ') as authors
-        FROM books b
-        LEFT JOIN book_authors ba ON b.id = ba.book_id
-        LEFT JOIN authors a ON ba.author_id = a.id
-        WHERE b.title LIKE ? OR a.name LIKE ?
-        GROUP BY b.id, b.title
-        ORDER BY b.title
-    """, (search_term, search_term))
-    results = cur.fetchall()
-    print("SEARCH_RESULTS:", results)
+    results = await cached_search(get_db(context), query)
 
     if results:
-        lines = []
-        for title, authors in results:
-            author_text = f" ({authors})" if authors else ""
-            lines.append(f"📚 {title}{author_text}")
-
         await update.message.reply_text(
-            f"🔍 Результаты поиска по запросу «{query}»:\n\n" + "\n".join(lines),
+            format_search_results(query, results),
+            parse_mode='HTML',
             reply_markup=menu_keyboard
         )
     else:
@@ -560,101 +930,142 @@ async def search_cancel(update: Update, _context: ContextTypes.DEFAULT_TYPE):
 @owner_only
 async def book_info_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса просмотра информации о книге"""
-    cursor.execute("SELECT title FROM books ORDER BY title")
-    books = cursor.fetchall()
-    if not books:
-        await update.message.reply_text("В библиотеке нет книг.")
-        return ConversationHandler.END
+    return await start_book_picker(update, context, "Выберите книгу для просмотра информации:",
+                                   "В библиотеке нет книг.", BOOK_INFO_SELECT)
 
-    book_list = "\n".join([f"{i+1}. {book[0]}" for i, book in enumerate(books)])
-    context.user_data['available_books'] = [book[0] for book in books]
 
-    await update.message.reply_text(
-        f"Выберите книгу для просмотра информации (введите номер):\n\n{book_list}",
-        reply_markup=cancel_keyboard
-    )
-    return BOOK_INFO_SELECT
+def photo_file_id(message):
+    """file_id самого большого размера фото в сообщении или None"""
+    photos = getattr(message, 'photo', None)
+    if not photos:
+        return None
+    file_id = getattr(photos[-1], 'file_id', None)
+    return file_id if isinstance(file_id, str) else None
 
 
-@owner_only
-async def book_info_select(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка выбора книги для просмотра информации"""
-    try:
-        book_index = int(update.message.text.strip()) - 1
-        available_books = context.user_data.get('available_books', [])
+def _set_cover_file_id(cur, cover_sha256, file_id):
+    """Запоминает file_id для всех книг с этой обложкой"""
+    cur.execute("UPDATE books SET cover_file_id = ? WHERE cover_sha256 = ?", (file_id, cover_sha256))
 
-        if book_index < 0 or book_index >= len(available_books):
-            await update.message.reply_text("Неверный номер книги. Попробуйте еще раз:")
-            return BOOK_INFO_SELECT
 
-        selected_book = available_books[book_index]
+async def reply_with_cover(message, db, cover_sha256, file_id, **kwargs):
+    """Отвечает обложкой по file_id; байты загружаются, только если file_id нет или Telegram его отклонил.
 
-        # Получаем подробную информацию о книге
-        cursor.execute("""
-            SELECT b.title, b.description, b.isbn, b.series_order, b.image_blob,
-                   s.name as series_name,
-                   GROUP_CONCAT(a.name, ', ') as authors
-            FROM books b
-            LEFT JOIN series s ON b.series_id = s.id
-            LEFT JOIN book_authors ba ON b.id = ba.book_id
-            LEFT JOIN authors a ON ba.author_id = a.id
-            WHERE b.title = ?
-            GROUP BY b.id, b.title, b.description, b.isbn, b.series_order, b.image_blob, s.name
-        """, (selected_book,))
-
-        book_info = cursor.fetchone()
-        if not book_info:
-            await update.message.reply_text("Книга не найдена.", reply_markup=menu_keyboard)
-            return ConversationHandler.END
+    Возвращает отправленное сообщение или None, если файла обложки нет.
+    """
+    if file_id:
+        try:
+            return await message.reply_photo(photo=file_id, **kwargs)
+        except BadRequest as e:
+            logger.warning(f"Telegram отклонил file_id обложки {cover_sha256}: {e}")
+
+    image_blob = await asyncio.to_thread(cover_store.get, cover_sha256)
+    if image_blob is None:
+        return None
+    sent = await message.reply_photo(photo=image_blob, **kwargs)
+    new_file_id = photo_file_id(sent)
+    if new_file_id:
+        await db.transaction(_set_cover_file_id, cover_sha256, new_file_id)
+    return sent
+
+
+async def backfill_cover_file_ids(context: ContextTypes.DEFAULT_TYPE):
+    """Фоновая задача: получает file_id для обложек, загруженных до появления кэша"""
+    db = get_db(context)
+    rows = await db.fetchall("""
+        SELECT DISTINCT cover_sha256 FROM books
+        WHERE cover_sha256 IS NOT NULL AND cover_file_id IS NULL
+        LIMIT ?
+    """, (COVER_BACKFILL_BATCH,))
+    if not rows:
+        logger.info("Все обложки имеют file_id — дозаполнение завершено")
+        context.job.schedule_removal()
+        return
 
-        title, description, isbn, series_order, image_blob, series_name, authors = book_info
+    for (cover_sha256,) in rows:
+        image_blob = await asyncio.to_thread(cover_store.get, cover_sha256)
+        if image_blob is None:
+            continue
+        try:
+            sent = await context.bot.send_photo(chat_id=COVER_CACHE_CHAT_ID, photo=image_blob,
+                                                disable_notification=True)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке обложки {cover_sha256} для получения file_id: {e}")
+            continue
+        file_id = photo_file_id(sent)
+        if file_id:
+            await db.transaction(_set_cover_file_id, cover_sha256, file_id)
+        try:
+            await sent.delete()
+        except Exception as e:
+            logger.warning(f"Не удалось удалить служебное сообщение с обложкой: {e}")
 
-        # Формируем текст с информацией
-        info_text = f"📚 **{title}**\n\n"
 
-        if authors:
-            info_text += f"👤 **Авторы:** {authors}\n\n"
+async def book_info_chosen(message, context: ContextTypes.DEFAULT_TYPE, _user_id, book_id):
+    """Книга выбрана: показываем подробную информацию и обложку"""
+    # Получаем подробную информацию о книге
+    db = get_db(context)
+    book_info = await db.fetchone("""
+        SELECT b.title, b.description, b.isbn, b.series_order, b.cover_sha256, b.cover_file_id,
+               s.name as series_name, b.authors_display
+        FROM books b
+        LEFT JOIN series s ON b.series_id = s.id
+        WHERE b.id = ?
+    """, (book_id,))
 
-        if description:
-            info_text += f"📝 **Описание:** {description}\n\n"
+    if not book_info:
+        await message.reply_text("Книга не найдена.", reply_markup=menu_keyboard)
+        return ConversationHandler.END
 
-        if series_name:
-            series_text = f"📚 **Серия:** {series_name}"
-            if series_order:
-                series_text += f" (книга {series_order})"
-            info_text += series_text + "\n\n"
+    title, description, isbn, series_order, cover_sha256, cover_file_id, series_name, authors = book_info
 
-        if isbn:
-            info_text += f"🔢 **ISBN:** {isbn}\n\n"
+    # Формируем текст с информацией
+    info_text = f"📚 **{title}**\n\n"
 
-        # Отправляем обложку, если есть
-        if image_blob:
-            try:
-                await update.message.reply_photo(
-                    photo=image_blob,
-                    caption=info_text,
-                    parse_mode='Markdown',
-                    reply_markup=menu_keyboard
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при отправке изображения: {e}")
-                await update.message.reply_text(
-                    info_text,
-                    parse_mode='Markdown',
-                    reply_markup=menu_keyboard
-                )
-        else:
-            await update.message.reply_text(
-                info_text,
+    if authors:
+        info_text += f"👤 **Авторы:** {authors}\n\n"
+
+    if description:
+        info_text += f"📝 **Описание:** {description}\n\n"
+
+    if series_name:
+        series_text = f"📚 **Серия:** {series_name}"
+        if series_order:
+            series_text += f" (книга {series_order})"
+        info_text += series_text + "\n\n"
+
+    if isbn:
+        info_text += f"🔢 **ISBN:** {isbn}\n\n"
+
+    # Отправляем обложку, если есть
+    sent = None
+    if cover_sha256:
+        try:
+            sent = await reply_with_cover(
+                message, db, cover_sha256, cover_file_id,
+                caption=info_text,
                 parse_mode='Markdown',
                 reply_markup=menu_keyboard
             )
+        except Exception as e:
+            logger.error(f"Ошибка при отправке изображения: {e}")
+    if sent is None:
+        await message.reply_text(
+            info_text,
+            parse_mode='Markdown',
+            reply_markup=menu_keyboard
+        )
 
-        return ConversationHandler.END
+    return ConversationHandler.END
 
-    except ValueError:
-        await update.message.reply_text("Пожалуйста, введите числовой номер книги:")
+
+@owner_only
+async def book_info_select(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработка выбора книги по введённому номеру"""
+    book_id = await typed_book_id(update, context)
+    if book_id is None:
         return BOOK_INFO_SELECT
+    return await book_info_chosen(update.message, context, update.effective_user.id, book_id)
 
 
 @owner_only
@@ -667,67 +1078,63 @@ async def book_info_cancel(update: Update, _context: ContextTypes.DEFAULT_TYPE):
 @owner_only
 async def delete_book_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса удаления книги"""
-    cursor.execute("SELECT title FROM books ORDER BY title")
-    books = cursor.fetchall()
-    if not books:
-        await update.message.reply_text("В библиотеке нет книг для удаления.")
-        return ConversationHandler.END
+    return await start_book_picker(update, context,
+                                   "⚠️ **ВНИМАНИЕ:** Удаление книги необратимо!\n\nВыберите книгу для удаления:",
+                                   "В библиотеке нет книг для удаления.", DELETE_SELECT_BOOK)
 
-    book_list = "\n".join([f"{i+1}. {book[0]}" for i, book in enumerate(books)])
-    context.user_data['available_books'] = [book[0] for book in books]
 
-    await update.message.reply_text(
-        f"⚠️ **ВНИМАНИЕ:** Удаление книги необратимо!\n\n"
-        f"Выберите книгу для удаления (введите номер):\n\n{book_list}",
-        reply_markup=cancel_keyboard,
-        parse_mode='Markdown'
+async def delete_book_chosen(message, context: ContextTypes.DEFAULT_TYPE, _user_id, book_id):
+    """Книга для удаления выбрана: просим подтверждение"""
+    book = await get_db(context).fetchone("SELECT title FROM books WHERE id = ?", (book_id,))
+    if not book:
+        await message.reply_text("Книга не найдена. Попробуйте еще раз:")
+        return DELETE_SELECT_BOOK
+
+    selected_book = book[0]
+    context.user_data['book_to_delete'] = book_id
+
+    # Создаем клавиатуру подтверждения
+    confirm_keyboard = ReplyKeyboardMarkup(
+        keyboard=[
+            ["✅ Да, удалить", "❌ Нет, отменить"]
+        ],
+        resize_keyboard=True
     )
-    return DELETE_SELECT_BOOK
+
+    await message.reply_text(
+        f"Вы действительно хотите удалить книгу «{selected_book}»?\n\n"
+        f"Это действие нельзя отменить!",
+        reply_markup=confirm_keyboard
+    )
+    return DELETE_CONFIRM
 
 
 @owner_only
 async def delete_book_select(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка выбора книги для удаления"""
-    try:
-        book_index = int(update.message.text.strip()) - 1
-        available_books = context.user_data.get('available_books', [])
+    """Обработка выбора книги для удаления по введённому номеру"""
+    book_id = await typed_book_id(update, context)
+    if book_id is None:
+        return DELETE_SELECT_BOOK
+    return await delete_book_chosen(update.message, context, update.effective_user.id, book_id)
 
-        if book_index < 0 or book_index >= len(available_books):
-            await update.message.reply_text("Неверный номер книги. Попробуйте еще раз:")
-            return DELETE_SELECT_BOOK
-
-        selected_book = available_books[book_index]
-        
-        # Получаем ID книги по названию
-        cur = getattr(context, 'cursor', cursor)
-        cur.execute("SELECT id FROM books WHERE title = ?", (selected_book,))
-        book_id_result = cur.fetchone()
-        
-        if not book_id_result:
-            await update.message.reply_text("Книга не найдена. Попробуйте еще раз:")
-            return DELETE_SELECT_BOOK
-            
-        book_id = book_id_result[0]
-        context.user_data['book_to_delete'] = book_id
-
-        # Создаем клавиатуру подтверждения
-        confirm_keyboard = ReplyKeyboardMarkup(
-            keyboard=[
-                ["✅ Да, удалить", "❌ Нет, отменить"]
-            ],
-            resize_keyboard=True
-        )
 
-        await update.message.reply_text(
-            f"Вы действительно хотите удалить книгу «{selected_book}»?\n\n"
-            f"Это действие нельзя отменить!",
-            reply_markup=confirm_keyboard
-        )
-        return DELETE_CONFIRM
+def _delete_book(cur, book_id):
+    """Удаляет книгу со связанными записями; возвращает (название, ключ обложки) или None"""
+    # Получаем название книги по ID
+    cur.execute("SELECT title, cover_sha256 FROM books WHERE id = ?", (book_id,))
+    book_title_result = cur.fetchone()
+    if not book_title_result:
+        return None
 
-    except ValueError:
-        await update.message.reply_text("Пожалуйста, введите числовой номер книги:")
-        return DELETE_SELECT_BOOK
+    # Удаляем связанные записи
+    cur.execute("DELETE FROM user_books WHERE book_id = ?", (book_id,))
+    cur.execute("DELETE FROM book_authors WHERE book_id = ?", (book_id,))
+
+    # Удаляем саму книгу
+    cur.execute("DELETE FROM books WHERE id = ?", (book_id,))
+    # Файл обложки — в том же задании писателя, если он больше ни к чему не привязан
+    cover_store.delete_if_unused(cur, book_title_result[1])
+    return book_title_result
 
 
 @owner_only
@@ -739,35 +1146,20 @@ async def delete_book_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE
         book_id = context.user_data.get('book_to_delete')
 
         try:
-            # Получаем название книги по ID
-            cur = getattr(context, 'cursor', cursor)
-            cur.execute("SELECT title FROM books WHERE id = ?", (book_id,))
-            book_title_result = cur.fetchone()
+            db = get_db(context)
+            deleted = await db.transaction(_delete_book, book_id)
 
-            if not book_title_result:
+            if deleted is None:
                 await update.message.reply_text("Книга не найдена.", reply_markup=menu_keyboard)
                 return ConversationHandler.END
 
-            book_title = book_title_result[0]
-
-            # Удаляем связанные записи
-            cur.execute("DELETE FROM user_books WHERE book_id = ?", (book_id,))
-            cur.execute("DELETE FROM book_authors WHERE book_id = ?", (book_id,))
-
-            # Удаляем саму книгу
-            cur.execute("DELETE FROM books WHERE id = ?", (book_id,))
-
-            db_conn = getattr(context, 'conn', conn)
-            db_conn.commit()
-
+            book_title = deleted[0]
             await update.message.reply_text(
                 f"Книга «{book_title}» успешно удалена из библиотеки.",
                 reply_markup=menu_keyboard
             )
 
         except Exception as e:
-            db_conn = getattr(context, 'conn', conn)
-            db_conn.rollback()
             logger.error(f"Ошибка при удалении книги: {e}")
             await update.message.reply_text(
                 "Произошла ошибка при удалении книги. Попробуйте еще раз.",
@@ -792,53 +1184,55 @@ async def delete_book_cancel(update: Update, _context: ContextTypes.DEFAULT_TYPE
     return ConversationHandler.END
 
 
+def _load_totals(cur):
+    """Всего книг, серий и авторов из таблицы счётчиков"""
+    cur.execute("SELECT key, value FROM counters WHERE kind = 'total' AND owner = 0")
+    totals = dict(cur.fetchall())
+    return totals.get('books', 0), totals.get('series', 0), totals.get('authors', 0)
+
+
+def _load_statistics(conn, user_id):
+    """Собирает статистику библиотеки и пользователя из таблицы счётчиков"""
+    cur = conn.cursor()
+    # Общая статистика библиотеки
+    total_books, total_series, total_authors = _load_totals(cur)
+
+    # Статистика пользователя
+    cur.execute("SELECT key, value FROM counters WHERE kind = 'status' AND owner = ?", (user_id,))
+    user_stats = {status: count for status, count in cur.fetchall() if count > 0}
+
+    # Статистика по авторам
+    cur.execute("""
+        SELECT a.name, c.value
+        FROM counters c
+        JOIN authors a ON a.id = c.owner
+        WHERE c.kind = 'author' AND c.value > 0
+        ORDER BY c.value DESC
+        LIMIT 5
+    """)
+    top_authors = cur.fetchall()
+
+    # Статистика по сериям
+    cur.execute("""
+        SELECT s.name, c.value
+        FROM counters c
+        JOIN series s ON s.id = c.owner
+        WHERE c.kind = 'series' AND c.value > 0
+        ORDER BY c.value DESC
+        LIMIT 5
+    """)
+    top_series = cur.fetchall()
+    return total_books, total_series, total_authors, user_stats, top_authors, top_series
+
+
 @owner_only
 async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать статистику библиотеки и чтения"""
-    cur = getattr(context, 'cursor', cursor)
     user_id = update.effective_user.id
 
     try:
-        # Общая статистика библиотеки
-        cur.execute("SELECT COUNT(*) FROM books")
-        total_books = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM series")
-        total_series = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM authors")
-        total_authors = cur.fetchone()[0]
-
-        # Статистика пользователя
-        cur.execute("""
-            SELECT status, COUNT(*) as count
-            FROM user_books
-            WHERE user_id = ?
-            GROUP BY status
-        """, (user_id,))
-        user_stats = dict(cur.fetchall())
-
-        # Статистика по авторам
-        cur.execute("""
-            SELECT a.name, COUNT(ba.book_id) as book_count
-            FROM authors a
-            JOIN book_authors ba ON a.id = ba.author_id
-            GROUP BY a.id, a.name
-            ORDER BY book_count DESC
-            LIMIT 5
-        """)
-        top_authors = cur.fetchall()
-
-        # Статистика по сериям
-        cur.execute("""
-            SELECT s.name, COUNT(b.id) as book_count
-            FROM series s
-            JOIN books b ON s.id = b.series_id
-            GROUP BY s.id, s.name
-            ORDER BY book_count DESC
-            LIMIT 5
-        """)
-        top_series = cur.fetchall()
+        (total_books, total_series, total_authors,
+         user_stats, top_authors, top_series) = await get_db(context).run(_load_statistics, user_id)
 
         # Формируем отчет
         stats_text = "📊 **Статистика библиотеки**\n\n"
@@ -850,16 +1244,9 @@ async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # Статистика пользователя
         stats_text += "📖 **Ваши книги:**\n"
-        status_names = {
-            'planning': 'Запланировано',
-            'reading': 'Читаю',
-            'finished': 'Прочитано',
-            'cancelled': 'Отменено'
-        }
-
         total_user_books = 0
         for status, count in user_stats.items():
-            status_name = status_names.get(status, status)
+            status_name = STATUS_LABELS.get(status, status)
             stats_text += f"  • {status_name}: {count}\n"
             total_user_books += count
 
@@ -888,164 +1275,249 @@ async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Произошла ошибка при получении статистики.")
 
 
-@owner_only
-async def export_library(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Экспорт библиотеки в текстовый файл"""
-    cur = getattr(context, 'cursor', cursor)
-    db_conn = getattr(context, 'conn', conn)
+def _write_export(conn, out, fmt, compress, exported_at):
+    """Пишет экспорт в файл out потоком из курсора; возвращает число книг"""
+    cur = conn.cursor()
     try:
-        # Получаем все книги с полной информацией
-        cur.execute("""
-            SELECT b.title, b.description, b.isbn, b.series_order,
-                   s.name as series_name,
-                   GROUP_CONCAT(a.name, ', ') as authors
-            FROM books b
-            LEFT JOIN series s ON b.series_id = s.id
-            LEFT JOIN book_authors ba ON b.id = ba.book_id
-            LEFT JOIN authors a ON ba.author_id = a.id
-            GROUP BY b.id, b.title, b.description, b.isbn, b.series_order, s.name
-            ORDER BY b.title
-        """)
+        totals = _load_totals(cur)
+    finally:
+        cur.close()
+    return write_export(conn, out, fmt, compress, totals, exported_at)
 
-        books = cur.fetchall()
 
-        if not books:
-            await update.message.reply_text("Библиотека пуста.")
+@owner_only
+async def recount(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Проверка счётчиков библиотеки и пересчёт при расхождениях"""
+    drift = await get_db(context).transaction(repair_counters)
+    if not drift:
+        await update.message.reply_text("✅ Счётчики совпадают с данными.")
+        return
+    lines = [f"{kind}:{owner}:{key} — было {stored}, стало {actual}" for kind, owner, key, stored, actual in drift[:20]]
+    if len(drift) > 20:
+        lines.append(f"… и ещё {len(drift) - 20}")
+    await update.message.reply_text(f"🔧 Исправлено расхождений: {len(drift)}\n\n" + "\n".join(lines))
+
+
+def _job_announcer(message):
+    """Первый ответ на тяжёлую команду: номер задания и как его отменить"""
+    async def announce(job):
+        return await message.reply_text(f"🕒 Задание #{job.id} в очереди: {job.title}.\n"
+                                        f"Отмена: /jobs cancel {job.id}")
+    return announce
+
+
+async def _export_library_job(job, message, db, fmt, compress, exported_at):
+    await job.report("⏳ Экспорт: выгружаю книги…", force=True)
+    # Файл заполняется в потоке базы порциями из курсора; маленький экспорт так и не покидает память
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as out:
+        count = await shielded(db.run(_write_export, out, fmt, compress, exported_at))
+        if not count:
+            await job.report("Библиотека пуста.", force=True)
             return
 
-        # Формируем содержимое файла
-        export_content = "📚 МОЯ БИБЛИОТЕКА\n"
-        export_content += "=" * 50 + "\n\n"
-
-        for i, book in enumerate(books, 1):
-            title, description, isbn, series_order, series_name, authors = book
-
-            export_content += f"{i}. {title}\n"
-
-            if authors:
-                export_content += f"   Авторы: {authors}\n"
+        await job.report(f"📤 Экспорт: отправляю файл, книг {count}…", force=True)
+        out.seek(0)
+        await message.reply_document(
+            document=out,
+            filename=export_filename(fmt, compress, exported_at),
+            caption="📚 Экспорт вашей библиотеки"
+        )
+    await job.report(f"✅ Экспорт готов: книг {count}.", force=True)
 
-            if series_name:
-                series_text = f"   Серия: {series_name}"
-                if series_order:
-                    series_text += f" (книга {series_order})"
-                export_content += series_text + "\n"
 
-            if isbn:
-                export_content += f"   ISBN: {isbn}\n"
+@owner_only
+async def export_library(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Экспорт библиотеки в файл: /export_library [txt|csv|jsonl] [gz]"""
+    args = [arg.lower() for arg in context.args or []]
+    unknown = [arg for arg in args if arg not in EXPORT_FORMATS and arg not in ("gz", "gzip")]
+    if unknown:
+        await update.message.reply_text(
+            f"Не понимаю «{unknown[0]}». Использование: /export_library [txt|csv|jsonl] [gz]")
+        return
+    fmt = next((arg for arg in args if arg in EXPORT_FORMATS), "txt")
+    compress = "gz" in args or "gzip" in args
+
+    await jobs.submit(update.effective_user.id, f"экспорт библиотеки ({fmt}{' gz' if compress else ''})",
+                      _export_library_job, update.message, get_db(context), fmt, compress, datetime.now(),
+                      priority=NORMAL, announce=_job_announcer(update.message))
+
+
+async def _export_db_job(job, message, db, filename, compacted, compressed):
+    await job.report("⏳ Снимок базы: копирую…", force=True)
+    with tempfile.TemporaryDirectory() as directory:
+        # backup API копирует базу короткими шагами, не останавливая писателя
+        path = await shielded(db.run(make_backup, os.path.join(directory, filename), compacted, compressed))
+        size = os.path.getsize(path)
+        if size > DOCUMENT_LIMIT:
+            await job.report(
+                f"Снимок занимает {size // (1024 * 1024)} МБ — больше, чем Telegram позволяет отправить. "
+                "Попробуйте /export_db compact gz или снимите копию на сервере: python -m booktracker.backup",
+                force=True)
+            return
+        await job.report(f"📤 Снимок базы: отправляю файл, {size // 1024} КБ…", force=True)
+        with open(path, 'rb') as f:
+            await message.reply_document(document=f, filename=os.path.basename(path),
+                                         caption="🗄 Снимок базы данных")
+    await job.report("✅ Снимок базы отправлен.", force=True)
 
-            if description:
-                # Обрезаем длинное описание
-                desc = description[:200] + "..." if len(description) > 200 else description
-                export_content += f"   Описание: {desc}\n"
 
-            export_content += "\n"
+@owner_only
+async def export_db(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Снимок базы без остановки бота: /export_db [compact] [gz]"""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("⛔ Снимок базы доступен только администратору.")
+        return
+    args = {arg.lower() for arg in context.args or []}
+    unknown = args - {"compact", "gz", "gzip"}
+    if unknown:
+        await update.message.reply_text(
+            f"Не понимаю «{min(unknown)}». Использование: /export_db [compact] [gz]")
+        return
+    compacted = "compact" in args
+    compressed = bool(args & {"gz", "gzip"})
+    filename = f"books_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+
+    # Снимок нужен редко и может подождать экспорт и импорт пользователей
+    await jobs.submit(update.effective_user.id, "снимок базы", _export_db_job, update.message,
+                      get_db(context), filename, compacted, compressed,
+                      priority=LOW, announce=_job_announcer(update.message))
+
+
+def _format_import_summary(added, duplicates, errors, finished=True):
+    """Итог импорта: счётчики и первые дубликаты и ошибки"""
+    head = "✅ Импорт завершён" if finished else "⚠️ Импорт прерван"
+    text = f"{head}: добавлено {added}, дубликатов {len(duplicates)}, ошибок {len(errors)}."
+    for title, items in (("Уже были в библиотеке", duplicates),
+                         ("Пропущены", [f"строка {line}: {reason}" for line, reason in errors])):
+        if items:
+            text += f"\n\n{title}:\n" + "\n".join(f"• {item}" for item in items[:10])
+            if len(items) > 10:
+                text += f"\n… и ещё {len(items) - 10}"
+    return text[:MESSAGE_LIMIT]
+
+
+async def _import_job(job, document, db, user_id):
+    await job.report(f"⏳ Импорт «{document.file_name}»: загружаю файл…", force=True)
+    state = ImportState()
+    added, processed, duplicates, errors = 0, 0, [], []
 
-        # Добавляем статистику
-        cur.execute("SELECT COUNT(*) FROM books")
-        total_books = cur.fetchone()[0]
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as stream:
+            telegram_file = await document.get_file()
+            await telegram_file.download_to_memory(stream)
+            stream.seek(0)
+            try:
+                rows = read_records(stream, document.file_name)
+            except ImportFormatError as e:
+                await job.report(f"Не удалось импортировать файл: {e}.", force=True)
+                return
+
+            # Файл разбирается потоком; каждая порция — одно задание писателя
+            while batch := list(islice(rows, IMPORT_BATCH)):
+                processed += len(batch)
+                records = [record for record, _ in batch if record is not None]
+                errors.extend(error for _, error in batch if error is not None)
+                if records:
+                    count, skipped = await db.transaction(import_batch, records, user_id, state)
+                    added += count
+                    duplicates.extend(skipped)
+                await job.report(f"⏳ Импорт: обработано строк {processed}, добавлено книг {added}…")
+
+    except asyncio.CancelledError:
+        # Уже записанные порции остаются в библиотеке — показываем, сколько успело добавиться
+        job.progress = _format_import_summary(added, duplicates, errors, finished=False)
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при импорте книг: {e}")
+        await job.report(_format_import_summary(added, duplicates, errors, finished=False), force=True)
+        return
 
-        cur.execute("SELECT COUNT(*) FROM series")
-        total_series = cur.fetchone()[0]
+    await job.report(_format_import_summary(added, duplicates, errors), force=True)
 
-        cur.execute("SELECT COUNT(*) FROM authors")
-        total_authors = cur.fetchone()[0]
 
-        export_content += "=" * 50 + "\n"
-        export_content += f"📊 СТАТИСТИКА\n"
-        export_content += f"Всего книг: {total_books}\n"
-        export_content += f"Серий: {total_series}\n"
-        export_content += f"Авторов: {total_authors}\n"
-        export_content += f"Дата экспорта: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+@owner_only
+async def import_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Импорт книг из присланного файла: CSV или JSON Lines бота, CSV экспорта Goodreads"""
+    document = update.message.document
+    await jobs.submit(update.effective_user.id, f"импорт «{document.file_name}»", _import_job,
+                      document, get_db(context), update.effective_user.id,
+                      priority=NORMAL, announce=_job_announcer(update.message))
 
-        # Создаем временный файл
-        import tempfile
-        import os
 
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-            f.write(export_content)
-            temp_file_path = f.name
+def _format_job(job):
+    line = f"#{job.id} {job.title} — {STATE_LABELS[job.state]}"
+    if job.state == RUNNING and job.progress:
+        line += f"\n    {job.progress.splitlines()[0]}"
+    return line
 
-        # Отправляем файл
-        with open(temp_file_path, 'rb') as f:
-            await update.message.reply_document(
-                document=f,
-                filename=f"library_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                caption="📚 Экспорт вашей библиотеки"
-            )
 
-        # Удаляем временный файл
-        os.unlink(temp_file_path)
+@owner_only
+async def show_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Фоновые задания пользователя: /jobs — список, /jobs cancel N — отмена"""
+    user_id = update.effective_user.id
+    args = [arg.lower().lstrip("#") for arg in context.args or []]
+    if args and args[0] == "cancel":
+        job = jobs.get(int(args[1])) if len(args) == 2 and args[1].isdigit() else None
+        if job is None or job.owner != user_id:
+            await update.message.reply_text("Задание не найдено. Использование: /jobs cancel <номер>")
+        elif await jobs.cancel(job):
+            await update.message.reply_text(f"🚫 Задание #{job.id} отменено.")
+        else:
+            await update.message.reply_text(f"Задание #{job.id} уже завершено: {STATE_LABELS[job.state]}.")
+        return
+    if args:
+        await update.message.reply_text(f"Не понимаю «{args[0]}». Использование: /jobs [cancel <номер>]")
+        return
 
-    except Exception as e:
-        logger.error(f"Ошибка при экспорте библиотеки: {e}")
-        await update.message.reply_text("Произошла ошибка при экспорте библиотеки.")
+    own = jobs.jobs(user_id)
+    if not own:
+        await update.message.reply_text("Фоновых заданий нет.")
+        return
+    await update.message.reply_text("🗂 Ваши задания:\n\n" + "\n".join(_format_job(job) for job in own))
 
 
 @owner_only
 async def edit_book_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса редактирования книги"""
-    cursor.execute("SELECT title FROM books ORDER BY title")
-    books = cursor.fetchall()
-    if not books:
-        await update.message.reply_text("В библиотеке нет книг для редактирования.")
-        return ConversationHandler.END
+    return await start_book_picker(update, context, "Выберите книгу для редактирования:",
+                                   "В библиотеке нет книг для редактирования.", EDIT_SELECT_BOOK)
 
-    book_list = "\n".join([f"{i+1}. {book[0]}" for i, book in enumerate(books)])
-    context.user_data['available_books'] = [book[0] for book in books]
 
-    await update.message.reply_text(
-        f"Выберите книгу для редактирования (введите номер):\n\n{book_list}",
-        reply_markup=cancel_keyboard
+async def edit_book_chosen(message, context: ContextTypes.DEFAULT_TYPE, _user_id, book_id):
+    """Книга для редактирования выбрана: предлагаем выбрать поле"""
+    book = await get_db(context).fetchone("SELECT title FROM books WHERE id = ?", (book_id,))
+    if not book:
+        await message.reply_text("Книга не найдена. Попробуйте еще раз:")
+        return EDIT_SELECT_BOOK
+
+    selected_book = book[0]
+    context.user_data['book_to_edit'] = book_id
+    context.user_data['book_title'] = selected_book  # Сохраняем название для отображения
+
+    # Создаем клавиатуру для выбора поля
+    field_keyboard = ReplyKeyboardMarkup(
+        keyboard=[
+            ["📝 Описание", "🔢 ISBN"],
+            ["👤 Авторы", "📚 Серия"],
+            ["❌ Отмена"]
+        ],
+        resize_keyboard=True
+    )
+
+    await message.reply_text(
+        f"Выберите, что хотите отредактировать в книге «{selected_book}»:",
+        reply_markup=field_keyboard
     )
-    return EDIT_SELECT_BOOK
+    return EDIT_SELECT_FIELD
 
 
 @owner_only
 async def edit_book_select(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка выбора книги для редактирования"""
-    try:
-        book_index = int(update.message.text.strip()) - 1
-        available_books = context.user_data.get('available_books', [])
-
-        if book_index < 0 or book_index >= len(available_books):
-            await update.message.reply_text("Неверный номер книги. Попробуйте еще раз:")
-            return EDIT_SELECT_BOOK
-
-        selected_book = available_books[book_index]
-        
-        # Получаем ID книги по названию
-        cur = getattr(context, 'cursor', cursor)
-        cur.execute("SELECT id FROM books WHERE title = ?", (selected_book,))
-        book_id_result = cur.fetchone()
-        
-        if not book_id_result:
-            await update.message.reply_text("Книга не найдена. Попробуйте еще раз:")
-            return EDIT_SELECT_BOOK
-            
-        book_id = book_id_result[0]
-        context.user_data['book_to_edit'] = book_id
-        context.user_data['book_title'] = selected_book  # Сохраняем название для отображения
-
-        # Создаем клавиатуру для выбора поля
-        field_keyboard = ReplyKeyboardMarkup(
-            keyboard=[
-                ["📝 Описание", "🔢 ISBN"],
-                ["👤 Авторы", "📚 Серия"],
-                ["❌ Отмена"]
-            ],
-            resize_keyboard=True
-        )
-
-        await update.message.reply_text(
-            f"Выберите, что хотите отредактировать в книге «{selected_book}»:",
-            reply_markup=field_keyboard
-        )
-        return EDIT_SELECT_FIELD
-
-    except ValueError:
-        await update.message.reply_text("Пожалуйста, введите числовой номер книги:")
+    """Обработка выбора книги для редактирования по введённому номеру"""
+    book_id = await typed_book_id(update, context)
+    if book_id is None:
         return EDIT_SELECT_BOOK
+    return await edit_book_chosen(update.message, context, update.effective_user.id, book_id)
 
 
 @owner_only
@@ -1075,39 +1547,27 @@ async def edit_field_select(update: Update, context: ContextTypes.DEFAULT_TYPE):
     book_title = context.user_data['book_title']
     field_name = field_mapping[field]
 
+    db = get_db(context)
     if field_name == "description" or field_name == "isbn":
-        cur = getattr(context, 'cursor', cursor)
-        cur.execute(f"SELECT {field_name} FROM books WHERE id = ?", (book_id,))
-        current_value = cur.fetchone()[0] or "Не задано"
+        current_value = (await db.fetchone(f"SELECT {field_name} FROM books WHERE id = ?", (book_id,)))[0] or "Не задано"
         await update.message.reply_text(
             f"Текущее значение: {current_value}\n\nВведите новое значение:",
             reply_markup=ReplyKeyboardRemove()
         )
     elif field_name == "authors":
-        cur = getattr(context, 'cursor', cursor)
-        cur.execute("""
-            SELECT GROUP_CONCAT(a.name, ', ') as authors
-            FROM books b
-            JOIN book_authors ba ON b.id = ba.book_id
-            JOIN authors a ON ba.author_id = a.id
-            WHERE b.id = ?
-            GROUP BY b.id
-        """, (book_id,))
-        result = cur.fetchone()
-        current_value = result[0] if result else "Не задано"
+        result = await db.fetchone("SELECT authors_display FROM books WHERE id = ?", (book_id,))
+        current_value = result[0] if result and result[0] else "Не задано"
         await update.message.reply_text(
             f"Текущие авторы: {current_value}\n\nВведите новых авторов через запятую:",
             reply_markup=ReplyKeyboardRemove()
         )
     elif field_name == "series":
-        cur = getattr(context, 'cursor', cursor)
-        cur.execute("""
+        result = await db.fetchone("""
             SELECT s.name, b.series_order
             FROM books b
             LEFT JOIN series s ON b.series_id = s.id
             WHERE b.id = ?
         """, (book_id,))
-        result = cur.fetchone()
         if result and result[0]:
             current_value = f"{result[0]} (книга {result[1]})" if result[1] else result[0]
         else:
@@ -1120,6 +1580,30 @@ async def edit_field_select(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return EDIT_VALUE
 
 
+def _update_book_field(cur, book_id, field_name, value):
+    """Обновляет простое поле книги (описание или ISBN)"""
+    cur.execute(f"UPDATE books SET {field_name} = ? WHERE id = ?", (value, book_id))
+
+
+def _replace_book_authors(cur, book_id, author_names):
+    """Заменяет список авторов книги"""
+    # Удаляем старых авторов
+    cur.execute("DELETE FROM book_authors WHERE book_id = ?", (book_id,))
+    # Добавляем новых авторов
+    _set_book_authors(cur, book_id, author_names)
+
+
+def _update_book_series(cur, book_id, series_name):
+    """Меняет серию книги; '-' убирает книгу из серии"""
+    if series_name == '-':
+        # Удаляем серию
+        cur.execute("UPDATE books SET series_id = NULL, series_order = NULL WHERE id = ?", (book_id,))
+    else:
+        # Добавляем или обновляем серию
+        series_id = _get_or_create_series(cur, series_name)
+        cur.execute("UPDATE books SET series_id = ? WHERE id = ?", (series_id, book_id))
+
+
 @owner_only
 async def edit_value_process(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка нового значения поля"""
@@ -1132,12 +1616,10 @@ async def edit_value_process(update: Update, context: ContextTypes.DEFAULT_TYPE)
     field_name = context.user_data['edit_field']
 
     try:
-        cur = getattr(context, 'cursor', cursor)
-        db_conn = getattr(context, 'conn', conn)
-        
+        db = get_db(context)
+
         if field_name == "description":
-            cur.execute("UPDATE books SET description = ? WHERE id = ?", (new_value, book_id))
-            db_conn.commit()
+            await db.transaction(_update_book_field, book_id, "description", new_value)
             await update.message.reply_text(
                 f"Описание книги «{book_title}» обновлено!",
                 reply_markup=menu_keyboard
@@ -1153,51 +1635,24 @@ async def edit_value_process(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 return EDIT_VALUE
 
             isbn_value = None if new_value == '-' else new_value
-            cur.execute("UPDATE books SET isbn = ? WHERE id = ?", (isbn_value, book_id))
-            db_conn.commit()
+            await db.transaction(_update_book_field, book_id, "isbn", isbn_value)
             await update.message.reply_text(
                 f"ISBN книги «{book_title}» обновлен!",
                 reply_markup=menu_keyboard
             )
 
         elif field_name == "authors":
-            # Удаляем старых авторов
-            cur.execute("DELETE FROM book_authors WHERE book_id = ?", (book_id,))
-
-            # Добавляем новых авторов
+            author_names = []
             if new_value and new_value != '-':
                 author_names = [a.strip() for a in new_value.split(',') if a.strip()]
-
-                for name in author_names:
-                    cur.execute("INSERT OR IGNORE INTO authors (name) VALUES (?)", (name,))
-                    cur.execute("SELECT id FROM authors WHERE name = ?", (name,))
-                    author_id = cur.fetchone()[0]
-                    cur.execute("INSERT OR IGNORE INTO book_authors (book_id, author_id) VALUES (?, ?)",
-                               (book_id, author_id))
-
-            db_conn.commit()
+            await db.transaction(_replace_book_authors, book_id, author_names)
             await update.message.reply_text(
                 f"Авторы книги «{book_title}» обновлены!",
                 reply_markup=menu_keyboard
             )
 
         elif field_name == "series":
-            if new_value == '-':
-                # Удаляем серию
-                cur.execute("UPDATE books SET series_id = NULL, series_order = NULL WHERE id = ?", (book_id,))
-            else:
-                # Добавляем или обновляем серию
-                cur.execute("SELECT id FROM series WHERE name = ? COLLATE NOCASE", (new_value,))
-                result = cur.fetchone()
-
-                if result:
-                    series_id = result[0]
-                else:
-                    cur.execute("INSERT INTO series (name) VALUES (?)", (new_value,))
-                    series_id = cur.lastrowid
-                cur.execute("UPDATE books SET series_id = ? WHERE id = ?", (series_id, book_id))
-
-            db_conn.commit()
+            await db.transaction(_update_book_series, book_id, new_value)
             await update.message.reply_text(
                 f"Серия книги «{book_title}» обновлена!",
                 reply_markup=menu_keyboard
@@ -1206,7 +1661,6 @@ async def edit_value_process(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ConversationHandler.END
 
     except Exception as e:
-        conn.rollback()
         logger.error(f"Ошибка при редактировании книги: {e}")
         if update.message is not None:
             await update.message.reply_text(
@@ -1236,15 +1690,19 @@ async def show_help(update: Update, _context: ContextTypes.DEFAULT_TYPE):
 
 **Управление книгами:**
 /add - Добавить новую книгу
+/quickadd Название | Автор | Серия #1 | ISBN - Добавить книгу одним сообщением (можно несколько строк или фото с такой подписью)
 /edit - Редактировать существующую книгу
 /delete - Удалить книгу из библиотеки
 /book_info - Просмотр информации о книге
 
 **Просмотр и поиск:**
 /list - Список всех книг
-/search <запрос> - Поиск книг по названию или автору
-/series - Просмотр серий книг
+/search <запрос> - Поиск книг по названию, автору, серии или описанию
+@бот <запрос> - Поиск из любого чата (inline-режим)
+/series - Просмотр серий книг с прогрессом чтения
+/series <название> - Книги одной серии по порядку
 /my - Мои книги с статусами
+/my <статус> <сортировка> - Например /my reading author: только читаемые, по автору
 
 **Управление статусами:**
 /status - Изменить статус книги (читаю/прочитано/запланировано)
@@ -1252,6 +1710,11 @@ async def show_help(update: Update, _context: ContextTypes.DEFAULT_TYPE):
 **Статистика и экспорт:**
 /statistics - Статистика библиотеки
 /export_library - Экспорт библиотеки в файл
+/export_library csv gz - Экспорт в CSV или JSON Lines (jsonl), gz — сжать
+/recount - Проверить и пересчитать счётчики статистики
+/export_db [compact] [gz] - Снимок базы данных (для администратора)
+Файл .csv или .jsonl - Импорт книг (формат /export_library или экспорт Goodreads)
+/jobs - Фоновые задания экспорта и импорта; /jobs cancel <номер> - отменить
 
 **Отмена операций:**
 /cancel - Отменить текущую операцию и вернуться в меню
@@ -1325,23 +1788,62 @@ async def start(update: Update, _context: ContextTypes.DEFAULT_TYPE):
 
 
 @owner_only
-async def show_covers(update: Update, _context: ContextTypes.DEFAULT_TYPE):
+async def show_covers(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать обложки книг"""
-    cursor.execute("SELECT title FROM books WHERE image_blob IS NOT NULL")
-    books_with_covers = cursor.fetchall()
-
-    if books_with_covers:
-        text = "📷 **Книги с обложками:**\n\n"
-        for i, (title,) in enumerate(books_with_covers, 1):
-            text += f"{i}. {title}\n"
-        await update.message.reply_text(text, parse_mode='Markdown')
-    else:
-        await update.message.reply_text("В библиотеке пока нет книг с обложками.")
+    await show_page(update, context, "covers")
 
 
 # --- BOT LAUNCH ---
+async def wal_checkpoint_job(_context: ContextTypes.DEFAULT_TYPE):
+    """Периодическая пассивная контрольная точка WAL"""
+    busy, wal_pages, checkpointed = await database.run(checkpoint)
+    logger.debug(f"Контрольная точка WAL: страниц в журнале {wal_pages}, перенесено {checkpointed}, busy={busy}")
+
+
+async def init_database(app):
+    """Сообщает действующие настройки хранения и планирует контрольные точки WAL"""
+    settings = await database.run(read_settings)
+    logger.info(f"Профиль хранения «{DB_STORAGE_PROFILE}»: " +
+                ", ".join(f"{name}={value}" for name, value in settings.items()))
+    if str(settings['journal_mode']).lower() != 'wal':
+        return
+    if app.job_queue is None:
+        logger.warning("JobQueue недоступна — контрольные точки WAL выполняются только автоматически")
+        return
+    app.job_queue.run_repeating(wal_checkpoint_job, interval=DB_CHECKPOINT_INTERVAL,
+                                first=DB_CHECKPOINT_INTERVAL, name="wal_checkpoint")
+
+
+async def schedule_cover_backfill(app):
+    """Планирует дозаполнение file_id обложек, если задан служебный чат"""
+    if not COVER_CACHE_CHAT_ID:
+        logger.info("COVER_CACHE_CHAT_ID не задан — file_id старых обложек появятся при первом просмотре")
+        return
+    if app.job_queue is None:
+        logger.warning("JobQueue недоступна — дозаполнение file_id обложек отключено")
+        return
+    app.job_queue.run_repeating(backfill_cover_file_ids, interval=COVER_BACKFILL_INTERVAL, first=10,
+                                name="cover_file_id_backfill")
+
+
+async def on_startup(app):
+    await init_database(app)
+    await schedule_cover_backfill(app)
+
+
+async def close_database(_app):
+    """Отменяет фоновые задания и закрывает пул подключений и писателя при остановке бота"""
+    await jobs.close()
+    await database.close()
+
+
 def build_application():
-    app = ApplicationBuilder().token(TOKEN).build()
+    builder = (ApplicationBuilder().token(TOKEN).post_init(on_startup).post_shutdown(close_database)
+               # Пользователи обслуживаются параллельно, обновления одного — в порядке прихода
+               .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES)))
+    if BOT_API_URL:
+        builder = builder.base_url(f"{BOT_API_URL}/bot").base_file_url(f"{BOT_API_URL}/file/bot")
+    app = builder.build()
 
     # Универсальные обработчики для кнопок отмены и возврата в меню (работают всегда)
     app.add_handler(MessageHandler(filters.Regex("^🔙 Отмена$"), universal_cancel), group=0)
@@ -1374,7 +1876,8 @@ def build_application():
         entry_points=[CommandHandler("status", status_start),
                       MessageHandler(filters.Regex("^🏷 Статусы$"), status_start)],
         states={
-            STATUS_SELECT_BOOK: [MessageHandler(filters.TEXT & ~filters.COMMAND, status_select_book)],
+            STATUS_SELECT_BOOK: [MessageHandler(filters.TEXT & ~filters.COMMAND, status_select_book),
+                                 book_picker_handler(status_book_chosen)],
             STATUS_SELECT_STATUS: [MessageHandler(filters.TEXT & ~filters.COMMAND, status_select_status)],
         },
         fallbacks=[
@@ -1405,7 +1908,8 @@ def build_application():
     book_info_conv_handler = ConversationHandler(
         entry_points=[MessageHandler(filters.Regex("^ℹ️ О книге$"), book_info_start)],
         states={
-            BOOK_INFO_SELECT: [MessageHandler(filters.TEXT & ~filters.COMMAND, book_info_select)],
+            BOOK_INFO_SELECT: [MessageHandler(filters.TEXT & ~filters.COMMAND, book_info_select),
+                               book_picker_handler(book_info_chosen)],
         },
         fallbacks=[
             CommandHandler("cancel", universal_cancel),
@@ -1420,7 +1924,8 @@ def build_application():
     delete_book_conv_handler = ConversationHandler(
         entry_points=[CommandHandler("delete", delete_book_start)],
         states={
-            DELETE_SELECT_BOOK: [MessageHandler(filters.TEXT & ~filters.COMMAND, delete_book_select)],
+            DELETE_SELECT_BOOK: [MessageHandler(filters.TEXT & ~filters.COMMAND, delete_book_select),
+                                 book_picker_handler(delete_book_chosen)],
             DELETE_CONFIRM: [MessageHandler(filters.TEXT & ~filters.COMMAND, delete_book_confirm)],
         },
         fallbacks=[
@@ -1436,7 +1941,8 @@ def build_application():
     edit_book_conv_handler = ConversationHandler(
         entry_points=[CommandHandler("edit", edit_book_start)],
         states={
-            EDIT_SELECT_BOOK: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_book_select)],
+            EDIT_SELECT_BOOK: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_book_select),
+                               book_picker_handler(edit_book_chosen)],
             EDIT_SELECT_FIELD: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_field_select)],
             EDIT_VALUE: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_value_process)],
         },
@@ -1463,36 +1969,41 @@ def build_application():
     app.add_handler(CommandHandler("series", list_series))
     app.add_handler(CommandHandler("my", my_books))
     app.add_handler(CommandHandler("search", search_books))
+    app.add_handler(CommandHandler("jobs", show_jobs))
     app.add_handler(CommandHandler("book_info", book_info_start))
     app.add_handler(CommandHandler("delete_book", delete_book_start))
     app.add_handler(CommandHandler("edit", edit_book_start))
     app.add_handler(CommandHandler("statistics", show_statistics))
     app.add_handler(CommandHandler("export_library", export_library))
+    app.add_handler(CommandHandler("recount", recount))
+    app.add_handler(CommandHandler("export_db", export_db))
+    app.add_handler(CommandHandler("quickadd", quick_add))
+    # Подпись к фото командой не считается — ловим её отдельно
+    app.add_handler(MessageHandler(filters.PHOTO & filters.CaptionRegex(r"^/quickadd(@\w+)?(\s|$)"), quick_add))
+    app.add_handler(MessageHandler(filters.Document.FileExtension("csv") | filters.Document.FileExtension("jsonl")
+                                   | filters.Document.FileExtension("json"), import_document))
     app.add_handler(MessageHandler(filters.Regex("^📋 Список книг$"), list_books))
     app.add_handler(MessageHandler(filters.Regex("^📖 Мои книги$"), my_books))
     app.add_handler(MessageHandler(filters.Regex("^📚 Серии$"), list_series))
     app.add_handler(MessageHandler(filters.Regex("^📷 Обложки$"), show_covers))
+    app.add_handler(CallbackQueryHandler(page_callback, pattern=f"^{CALLBACK_PREFIX}:"))
+    # Неблокирующий: новый запрос пользователя должен дойти до обработчика, пока старый ждёт паузу
+    app.add_handler(InlineQueryHandler(inline_search, block=False))
 
     return app
 
-# Удаляю дублирующее определение main и оставляю только одну функцию main
-async def main():
+def main():
+    schema_version = migrate_path(DB_PATH)
+    logger.info(f"Версия схемы базы данных: {schema_version}")
     app = build_application()
-    try:
-        app.run_polling()
-    except RuntimeError:
-        import nest_asyncio  # type: ignore
-        nest_asyncio.apply()
+    if WEBHOOK_URL:
+        # Обновления присылает Telegram; сервер PTB (tornado) сверяет секрет и кладёт их в очередь приложения
+        app.run_webhook(listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, url_path=urlsplit(WEBHOOK_URL).path.lstrip("/"),
+                        webhook_url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET,
+                        max_connections=WEBHOOK_MAX_CONNECTIONS)
+    else:
         app.run_polling()
 
 
 if __name__ == "__main__":
-    import asyncio
-
-    try:
-        asyncio.get_event_loop().run_until_complete(main())
-    except RuntimeError:
-        import nest_asyncio  # type: ignore
-
-        nest_asyncio.apply()
-        asyncio.get_event_loop().run_until_complete(main())
+    main()
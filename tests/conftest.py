@@ -9,6 +9,9 @@ from unittest.mock import AsyncMock, MagicMock
 from telegram import User, Chat, Message, Update, PhotoSize
 from telegram.ext import ContextTypes
 from typing import Dict, Any
+from booktracker.covers import CoverStore
+from booktracker.jobs import JobEngine
+from booktracker.migrations import migrate
 
 
 @pytest.fixture(scope="session")
@@ -78,6 +81,7 @@ def db_connection(test_db_path):
     )
     """)
     conn.commit()
+    migrate(conn)
     
     yield conn
     
@@ -87,6 +91,7 @@ def db_connection(test_db_path):
     cursor.execute("DELETE FROM books")
     cursor.execute("DELETE FROM authors")
     cursor.execute("DELETE FROM series")
+    cursor.execute("DELETE FROM counters")
     conn.commit()
     conn.close()
 
@@ -140,7 +145,8 @@ def mock_message(mock_user, mock_chat):
     message.date = None
     message.text = "Test message"
     message.photo = []
-    message.reply_text = AsyncMock()
+    # Ответ бота — сообщение, которое потом можно править (ход фоновых заданий)
+    message.reply_text = AsyncMock(return_value=MagicMock(edit_text=AsyncMock()))
     message.reply_photo = AsyncMock()
     message.reply_document = AsyncMock()
     
@@ -219,9 +225,51 @@ def setup_allowed_ids(allowed_user_id):
     ALLOWED_IDS.update(original_ids)
 
 
+@pytest.fixture(autouse=True)
+def cover_store(tmp_path, monkeypatch):
+    """Отдельный каталог обложек для каждого теста"""
+    store = CoverStore(str(tmp_path / "covers"))
+    monkeypatch.setattr('main.cover_store', store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def jobs(monkeypatch):
+    """Своя очередь фоновых заданий для каждого теста"""
+    engine = JobEngine(workers=2, progress_interval=0)
+    monkeypatch.setattr('main.jobs', engine)
+    return engine
+
+
 @pytest.fixture
-def mock_db_connection(monkeypatch, db_connection):
-    """Мокает подключение к базе данных"""
-    monkeypatch.setattr('main.conn', db_connection)
-    monkeypatch.setattr('main.cursor', db_connection.cursor())
-    return db_connection 
\ No newline at end of file
+def mock_db_connection(db_connection):
+    """Тестовая база; обработчики получают её через context.conn"""
+    return db_connection
+
+@pytest.fixture
+def walk_pages(mock_update, mock_context):
+    """Листает постраничный список кнопкой «Вперёд» и возвращает тексты всех страниц"""
+    from main import page_callback
+
+    def next_button(markup):
+        if markup is None:
+            return None
+        return next((b for b in markup.inline_keyboard[0] if b.text.startswith("Вперёд")), None)
+
+    async def walk():
+        call = mock_update.message.reply_text.call_args
+        pages = [call[0][0]]
+        button = next_button(call[1].get('reply_markup'))
+        while button is not None:
+            query = MagicMock()
+            query.data = button.callback_data
+            query.answer = AsyncMock()
+            query.edit_message_text = AsyncMock()
+            mock_update.callback_query = query
+            await page_callback(mock_update, mock_context)
+            call = query.edit_message_text.call_args
+            pages.append(call[0][0])
+            button = next_button(call[1].get('reply_markup'))
+        return pages
+
+    return walk
@@ -0,0 +1,77 @@
+"""
+Тесты асинхронного слоя доступа к базе данных
+"""
+import threading
+import pytest
+from unittest.mock import MagicMock
+from booktracker.aiodb import AsyncDatabase, ConnectionDatabase, from_context
+
+
+@pytest.fixture
+async def database(test_db_path, db_connection):
+    """Пул подключений к тестовой базе"""
+    db = AsyncDatabase(test_db_path, max_workers=2)
+    yield db
+    await db.close()
+
+
+class TestAsyncDatabase:
+    """Тесты пула потоков с подключением на поток"""
+
+    @pytest.mark.asyncio
+    async def test_fetch_runs_outside_event_loop_thread(self, database, db_connection):
+        """Тест: запросы выполняются не в потоке цикла событий"""
+        # Arrange
+        db_connection.execute("INSERT INTO books (title) VALUES (?)", ("Война и мир",))
+        db_connection.commit()
+
+        # Act
+        thread_name = await database.run(lambda conn: threading.current_thread().name)
+        rows = await database.fetchall("SELECT title FROM books")
+
+        # Assert
+        assert thread_name.startswith("booktracker-db")
+        assert rows == [("Война и мир",)]
+
+    @pytest.mark.asyncio
+    async def test_connection_per_thread(self, database):
+        """Тест: каждый поток пула использует собственное подключение"""
+        # Act
+        first = await database.run(lambda conn: conn)
+        second = await database.run(lambda conn: conn)
+
+        # Assert
+        assert len(database._connections) <= 2
+        assert first in database._connections
+        assert second in database._connections
+
+    @pytest.mark.asyncio
+    async def test_transaction_rollback_on_error(self, database, db_connection):
+        """Тест: при ошибке транзакция откатывается целиком"""
+        # Arrange
+        def failing(cur):
+            cur.execute("INSERT INTO books (title) VALUES (?)", ("Черновик",))
+            raise ValueError("boom")
+
+        # Act
+        with pytest.raises(ValueError):
+            await database.transaction(failing)
+
+        # Assert
+        assert await database.fetchone("SELECT COUNT(*) FROM books") == (0,)
+
+
+class TestContextInjection:
+    """Тесты подмены базы через context"""
+
+    def test_context_conn_is_used(self, mock_context, mock_db_connection):
+        """Тест: подключение из context.conn имеет приоритет над общим пулом"""
+        db = from_context(mock_context, default=None)
+        assert isinstance(db, ConnectionDatabase)
+        assert db.conn is mock_db_connection
+
+    def test_default_without_injection(self):
+        """Тест: без context.conn используется общий пул"""
+        context = MagicMock(spec=["user_data", "args"])
+        default = object()
+        assert from_context(context, default) is default
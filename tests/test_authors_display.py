@@ -0,0 +1,62 @@
+"""
+Тесты колонки books.authors_display
+"""
+import sqlite3
+from main import _insert_book, _replace_book_authors
+from booktracker.export import iter_books
+from booktracker.migrations import MIGRATIONS, migrate
+
+
+def new_book(title, authors):
+    return {'title': title, 'description': None, 'image_blob': None, 'isbn': None,
+            'authors': authors, 'series_id': None, 'series_order': None}
+
+
+def display(conn, title):
+    return conn.execute("SELECT authors_display FROM books WHERE title = ?", (title,)).fetchone()[0]
+
+
+class TestAuthorsDisplay:
+    """Тесты поддержки строки авторов триггерами"""
+
+    def test_kept_current_by_triggers(self, mock_db_connection):
+        """Тест: порядок ввода сохраняется, правки авторов сразу видны в строке"""
+        cur = mock_db_connection.cursor()
+        book_id = _insert_book(cur, new_book("Двенадцать стульев", ["Илья Ильф", "Евгений Петров"]))
+        _insert_book(cur, new_book("Золотой телёнок", ["Евгений Петров"]))
+        mock_db_connection.commit()
+        assert display(mock_db_connection, "Двенадцать стульев") == "Илья Ильф, Евгений Петров"
+
+        cur.execute("UPDATE authors SET name = 'Е. Петров' WHERE name = 'Евгений Петров'")
+        assert display(mock_db_connection, "Золотой телёнок") == "Е. Петров"
+        assert display(mock_db_connection, "Двенадцать стульев") == "Илья Ильф, Е. Петров"
+
+        _replace_book_authors(cur, book_id, ["Е. Петров", "Илья Ильф"])
+        assert display(mock_db_connection, "Двенадцать стульев") == "Е. Петров, Илья Ильф"
+
+        _replace_book_authors(cur, book_id, [])
+        assert display(mock_db_connection, "Двенадцать стульев") is None
+        mock_db_connection.commit()
+
+    def test_export_uses_column(self, mock_db_connection):
+        """Тест: экспорт берёт готовую строку авторов"""
+        _insert_book(mock_db_connection.cursor(), new_book("Книга", ["Автор"]))
+        mock_db_connection.execute("UPDATE books SET authors_display = 'Из колонки'")
+        mock_db_connection.commit()
+
+        assert next(iter_books(mock_db_connection))[-1] == "Из колонки"
+
+    def test_backfilled_by_migration(self, tmp_path):
+        """Тест: миграция заполняет строку авторов у существующих книг"""
+        conn = sqlite3.connect(tmp_path / "old.db")
+        for statement in MIGRATIONS[0][2]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO books (title) VALUES ('Старая книга')")
+        conn.execute("INSERT INTO authors (name) VALUES ('Второй'), ('Первый')")
+        conn.execute("INSERT INTO book_authors (book_id, author_id) VALUES (1, 2), (1, 1)")
+        conn.commit()
+
+        migrate(conn)
+
+        assert display(conn, "Старая книга") == "Первый, Второй"
+        conn.close()
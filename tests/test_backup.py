@@ -0,0 +1,132 @@
+"""
+Тесты снимка базы через backup API
+"""
+import gzip
+import os
+import sqlite3
+import pytest
+import main
+from main import export_db
+from booktracker.backup import make_backup, snapshot
+from booktracker.migrations import migrate
+from booktracker.normalize import register_functions
+from booktracker.storage import apply_profile
+
+
+@pytest.fixture
+def live_db(tmp_path):
+    """Рабочая база в WAL, как у бота"""
+    conn = register_functions(apply_profile(sqlite3.connect(tmp_path / "books.db"), "tuned"))
+    migrate(conn)
+    conn.executemany("INSERT INTO books (title, description) VALUES (?, ?)",
+                     ((f"Книга {i}", "x" * 500) for i in range(300)))
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def inspect(path):
+    """(книг в снимке, режим журнала)"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM books").fetchone()[0], \
+            conn.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestMakeBackup:
+    """Тесты снимка базы"""
+
+    def test_snapshot_while_writer_busy(self, live_db, tmp_path):
+        """Тест: снимок по шагам не ждёт незафиксированную запись и не видит её"""
+        writer = sqlite3.connect(tmp_path / "books.db")
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("DELETE FROM books")
+
+        path = make_backup(live_db, str(tmp_path / "copy.db"), pages=4)
+        writer.rollback()
+        writer.close()
+
+        assert path == str(tmp_path / "copy.db")
+        assert inspect(path) == (300, "delete")
+
+    def test_falls_back_to_vacuum_into_under_steady_writes(self, live_db, tmp_path, caplog):
+        """Тест: запись другим подключением после каждого шага — снимок всё равно готов и согласован"""
+        writer = register_functions(sqlite3.connect(tmp_path / "books.db"))
+        writes = []
+
+        def write_between_steps(_status, _remaining, _total):
+            writer.execute("INSERT INTO books (title) VALUES (?)", (f"Новая {len(writes)}",))
+            writer.commit()
+            writes.append(1)
+
+        try:
+            copied = snapshot(live_db, str(tmp_path / "copy.db"), pages=2, max_restarts=2,
+                              progress=write_between_steps)
+        finally:
+            writer.close()
+
+        assert len(writes) == 3
+        assert "VACUUM INTO" in caplog.text
+        assert copied > 0
+        assert inspect(tmp_path / "copy.db") == (303, "delete")
+
+    def test_compact_and_gzip(self, live_db, tmp_path):
+        """Тест: VACUUM INTO и gzip дают меньший файл с теми же данными"""
+        live_db.execute("DELETE FROM books WHERE id % 2 = 0")
+        live_db.commit()
+        plain = make_backup(live_db, str(tmp_path / "plain.db"))
+
+        packed = make_backup(live_db, str(tmp_path / "packed.db"), compacted=True, compressed=True)
+        unpacked = tmp_path / "unpacked.db"
+        with gzip.open(packed) as f:
+            unpacked.write_bytes(f.read())
+
+        assert packed.endswith("packed.db.gz")
+        assert sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("packed")) == ["packed.db.gz"]
+        assert inspect(unpacked)[0] == 150
+        assert unpacked.stat().st_size < os.path.getsize(plain)
+
+
+class TestExportDbCommand:
+    """Тесты команды /export_db"""
+
+    @pytest.mark.asyncio
+    async def test_admin_gets_document(self, mock_update, mock_context, mock_db_connection, monkeypatch, jobs):
+        """Тест: администратор получает сжатый снимок"""
+        monkeypatch.setattr(main, "ADMIN_IDS", {12345})
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Книга')")
+        mock_db_connection.commit()
+        sent = []
+        mock_update.message.reply_document.side_effect = lambda document, **kwargs: sent.append(
+            (gzip.decompress(document.read())[:16], kwargs['filename']))
+        mock_context.args = ["gz"]
+
+        await export_db(mock_update, mock_context)
+        await jobs.join()
+
+        header, filename = sent[0]
+        assert header == b"SQLite format 3\x00"
+        assert filename.startswith("books_") and filename.endswith(".db.gz")
+
+    @pytest.mark.asyncio
+    async def test_not_admin(self, mock_update, mock_context, mock_db_connection, monkeypatch):
+        """Тест: пользователь без прав администратора снимок не получает"""
+        monkeypatch.setattr(main, "ADMIN_IDS", {1})
+
+        await export_db(mock_update, mock_context)
+
+        assert "только администратору" in mock_update.message.reply_text.call_args[0][0]
+        mock_update.message.reply_document.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_denied_without_admin_ids(self, mock_update, mock_context, mock_db_connection, monkeypatch, jobs):
+        """Тест: без ADMIN_IDS снимок недоступен даже разрешённому пользователю"""
+        monkeypatch.setattr(main, "ALLOWED_IDS", {12345})
+        monkeypatch.setattr(main, "ADMIN_IDS", set())
+
+        await export_db(mock_update, mock_context)
+
+        assert "только администратору" in mock_update.message.reply_text.call_args[0][0]
+        assert jobs.jobs() == []
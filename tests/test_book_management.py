@@ -310,7 +310,6 @@ class TestBookDeletion:
         mock_db_connection.commit()
         
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Тестовая книга"]
         
         # Act
         await delete_book_select(mock_update, mock_context)
@@ -374,7 +373,6 @@ class TestBookEditing:
         mock_db_connection.commit()
         
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Тестовая книга"]
         
         # Act
         await edit_book_select(mock_update, mock_context)
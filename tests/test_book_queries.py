@@ -203,22 +203,22 @@ class TestBookInfo:
         assert "выберите книгу" in mock_update.message.reply_text.call_args[0][0].lower()
     
     @pytest.mark.asyncio
-    async def test_book_info_select_with_cover(self, mock_update, mock_context, mock_db_connection):
+    async def test_book_info_select_with_cover(self, mock_update, mock_context, mock_db_connection, cover_store):
         """Тест: выбор книги для просмотра информации с обложкой"""
         # Arrange
         cursor = mock_db_connection.cursor()
-        cursor.execute("INSERT INTO books (title, description, image_blob) VALUES (?, ?, ?)", 
-                      ("Война и мир", "Описание", b"test_image_data"))
+        cursor.execute("INSERT INTO books (title, description, cover_sha256) VALUES (?, ?, ?)", 
+                      ("Война и мир", "Описание", cover_store.put(b"test_image_data")))
         mock_db_connection.commit()
         
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Война и мир"]
         
         # Act
         await book_info_select(mock_update, mock_context)
         
         # Assert
         mock_update.message.reply_photo.assert_called_once()
+        assert mock_update.message.reply_photo.call_args[1]['photo'] == b"test_image_data"
         response_text = mock_update.message.reply_photo.call_args[1]['caption']
         assert "Война и мир" in response_text
         assert "Описание" in response_text
@@ -232,7 +232,6 @@ class TestBookInfo:
         mock_db_connection.commit()
         
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Война и мир"]
         
         # Act
         await book_info_select(mock_update, mock_context)
@@ -0,0 +1,105 @@
+"""
+Тесты счётчиков библиотеки
+"""
+import pytest
+from main import (
+    finalize_book, status_select_status, delete_book_confirm, show_statistics, export_library, recount
+)
+from booktracker.counters import verify_counters
+
+
+def counter(conn, kind, owner, key=''):
+    row = conn.execute("SELECT value FROM counters WHERE kind = ? AND owner = ? AND key = ?",
+                       (kind, owner, key)).fetchone()
+    return row[0] if row else 0
+
+
+def new_book(title, authors, series_id=None):
+    return {'title': title, 'description': None, 'image_blob': None, 'isbn': None,
+            'authors': authors, 'series_id': series_id, 'series_order': 1 if series_id else None}
+
+
+class TestCounterTriggers:
+    """Тесты поддержки счётчиков триггерами"""
+
+    @pytest.mark.asyncio
+    async def test_counters_follow_handlers(self, mock_update, mock_context, mock_db_connection):
+        """Тест: добавление, смена статуса и удаление книг не дают расхождений"""
+        series_id = mock_db_connection.execute("INSERT INTO series (name) VALUES ('Цикл')").lastrowid
+        mock_db_connection.commit()
+        for title, authors in (("Первая", ["Автор А", "Автор Б"]), ("Вторая", ["Автор А"])):
+            mock_context.user_data['new_book'] = new_book(title, authors, series_id)
+            await finalize_book(mock_update, mock_context)
+
+        first_id = mock_db_connection.execute("SELECT id FROM books WHERE title = 'Первая'").fetchone()[0]
+        for status in ("📖 Читаю", "✅ Прочитано"):
+            mock_context.user_data['selected_book'] = "Первая"
+            mock_context.user_data['selected_book_id'] = first_id
+            mock_update.message.text = status
+            await status_select_status(mock_update, mock_context)
+
+        author_id = mock_db_connection.execute("SELECT id FROM authors WHERE name = 'Автор А'").fetchone()[0]
+        assert counter(mock_db_connection, 'total', 0, 'books') == 2
+        assert counter(mock_db_connection, 'total', 0, 'authors') == 2
+        assert counter(mock_db_connection, 'author', author_id) == 2
+        assert counter(mock_db_connection, 'series', series_id) == 2
+        assert counter(mock_db_connection, 'status', 12345, 'reading') == 0
+        assert counter(mock_db_connection, 'status', 12345, 'finished') == 1
+
+        mock_context.user_data['book_to_delete'] = first_id
+        mock_update.message.text = "✅ Да, удалить"
+        await delete_book_confirm(mock_update, mock_context)
+
+        assert counter(mock_db_connection, 'total', 0, 'books') == 1
+        assert counter(mock_db_connection, 'author', author_id) == 1
+        assert counter(mock_db_connection, 'status', 12345, 'finished') == 0
+        assert verify_counters(mock_db_connection) == []
+
+    def test_series_change_moves_count(self, mock_db_connection):
+        """Тест: перенос книги в другую серию переносит и счётчик"""
+        first = mock_db_connection.execute("INSERT INTO series (name) VALUES ('Первая')").lastrowid
+        second = mock_db_connection.execute("INSERT INTO series (name) VALUES ('Вторая')").lastrowid
+        mock_db_connection.execute("INSERT INTO books (title, series_id) VALUES ('Книга', ?)", (first,))
+        mock_db_connection.execute("UPDATE books SET series_id = ? WHERE title = 'Книга'", (second,))
+        mock_db_connection.commit()
+
+        assert counter(mock_db_connection, 'series', first) == 0
+        assert counter(mock_db_connection, 'series', second) == 1
+        assert verify_counters(mock_db_connection) == []
+
+
+class TestCounterReaders:
+    """Тесты чтения и восстановления счётчиков"""
+
+    @pytest.mark.asyncio
+    async def test_statistics_read_counters(self, mock_update, mock_context, mock_db_connection, jobs):
+        """Тест: статистика и экспорт берут итоги из счётчиков, а не пересчитывают их"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Книга')")
+        mock_db_connection.execute("UPDATE counters SET value = 42 WHERE kind = 'total' AND key = 'books'")
+        mock_db_connection.commit()
+
+        exported = []
+        mock_update.message.reply_document.side_effect = lambda document, **kwargs: exported.append(
+            document.read().decode('utf-8'))
+
+        await show_statistics(mock_update, mock_context)
+        assert "Всего книг:** 42" in mock_update.message.reply_text.call_args[0][0]
+        await export_library(mock_update, mock_context)
+        await jobs.join()
+
+        assert "Всего книг: 42" in exported[0]
+
+    @pytest.mark.asyncio
+    async def test_recount_repairs_drift(self, mock_update, mock_context, mock_db_connection):
+        """Тест: /recount находит расхождения и пересчитывает счётчики"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Книга')")
+        mock_db_connection.execute("UPDATE counters SET value = 42 WHERE kind = 'total' AND key = 'books'")
+        mock_db_connection.commit()
+
+        await recount(mock_update, mock_context)
+
+        assert "total:0:books — было 42, стало 1" in mock_update.message.reply_text.call_args[0][0]
+        assert verify_counters(mock_db_connection) == []
+
+        await recount(mock_update, mock_context)
+        assert "совпадают" in mock_update.message.reply_text.call_args[0][0]
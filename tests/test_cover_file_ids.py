@@ -0,0 +1,114 @@
+"""
+Тесты кэша file_id обложек
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from telegram.error import BadRequest
+import main
+from main import add_cover, book_info_select, backfill_cover_file_ids
+
+
+def sent_photo(file_id):
+    """Сообщение с фото, как его возвращает Telegram"""
+    return SimpleNamespace(photo=[SimpleNamespace(file_id=f"{file_id}-small"), SimpleNamespace(file_id=file_id)],
+                           delete=AsyncMock())
+
+
+def insert_book(conn, title, cover_sha256, cover_file_id=None):
+    conn.execute("INSERT INTO books (title, cover_sha256, cover_file_id) VALUES (?, ?, ?)",
+                 (title, cover_sha256, cover_file_id))
+    conn.commit()
+
+
+def stored_file_id(conn, title):
+    return conn.execute("SELECT cover_file_id FROM books WHERE title = ?", (title,)).fetchone()[0]
+
+
+class TestBookInfoCover:
+    """Тесты отправки обложки в карточке книги"""
+
+    @pytest.mark.asyncio
+    async def test_cached_file_id_reused(self, mock_update, mock_context, mock_db_connection, cover_store):
+        """Тест: при известном file_id байты не загружаются"""
+        insert_book(mock_db_connection, "Книга", cover_store.put(b"jpeg"), "cached-id")
+        mock_update.message.text = "1"
+
+        await book_info_select(mock_update, mock_context)
+
+        mock_update.message.reply_photo.assert_called_once()
+        assert mock_update.message.reply_photo.call_args[1]['photo'] == "cached-id"
+
+    @pytest.mark.asyncio
+    async def test_upload_stores_file_id(self, mock_update, mock_context, mock_db_connection, cover_store):
+        """Тест: после первой загрузки file_id запоминается для всех книг с этой обложкой"""
+        key = cover_store.put(b"jpeg")
+        insert_book(mock_db_connection, "Том 1", key)
+        insert_book(mock_db_connection, "Том 2", key)
+        mock_update.message.text = "1"
+        mock_update.message.reply_photo = AsyncMock(return_value=sent_photo("new-id"))
+
+        await book_info_select(mock_update, mock_context)
+
+        assert mock_update.message.reply_photo.call_args[1]['photo'] == b"jpeg"
+        assert stored_file_id(mock_db_connection, "Том 1") == "new-id"
+        assert stored_file_id(mock_db_connection, "Том 2") == "new-id"
+
+    @pytest.mark.asyncio
+    async def test_rejected_file_id_falls_back_to_upload(self, mock_update, mock_context, mock_db_connection,
+                                                         cover_store):
+        """Тест: отклонённый file_id заменяется загрузкой байтов"""
+        insert_book(mock_db_connection, "Книга", cover_store.put(b"jpeg"), "stale-id")
+        mock_update.message.text = "1"
+        mock_update.message.reply_photo = AsyncMock(
+            side_effect=[BadRequest("Wrong file identifier"), sent_photo("fresh-id")])
+
+        await book_info_select(mock_update, mock_context)
+
+        photos = [call[1]['photo'] for call in mock_update.message.reply_photo.call_args_list]
+        assert photos == ["stale-id", b"jpeg"]
+        assert stored_file_id(mock_db_connection, "Книга") == "fresh-id"
+        mock_update.message.reply_text.assert_not_called()
+
+
+class TestAddCoverFileId:
+    """Тесты сохранения file_id при добавлении обложки"""
+
+    @pytest.mark.asyncio
+    async def test_add_cover_keeps_file_id(self, mock_update, mock_context):
+        """Тест: file_id присланного фото сохраняется вместе с книгой"""
+        photo = MagicMock()
+        photo.file_id = "user-photo-id"
+        photo.get_file = AsyncMock(return_value=MagicMock(download_as_bytearray=AsyncMock(return_value=bytearray(b"x"))))
+        mock_update.message.photo = [photo]
+        mock_context.user_data['new_book'] = {'title': 'Книга'}
+
+        await add_cover(mock_update, mock_context)
+
+        assert mock_context.user_data['new_book']['cover_file_id'] == "user-photo-id"
+
+
+class TestBackfillJob:
+    """Тесты фонового дозаполнения file_id"""
+
+    @pytest.mark.asyncio
+    async def test_backfill_fills_missing_file_ids(self, mock_context, mock_db_connection, cover_store, monkeypatch):
+        """Тест: задача загружает обложки без file_id и удаляет служебные сообщения"""
+        monkeypatch.setattr(main, "COVER_CACHE_CHAT_ID", "-100")
+        insert_book(mock_db_connection, "Старая", cover_store.put(b"old"))
+        insert_book(mock_db_connection, "Новая", cover_store.put(b"new"), "known-id")
+        message = sent_photo("backfilled-id")
+        mock_context.bot = MagicMock(send_photo=AsyncMock(return_value=message))
+        mock_context.job = MagicMock()
+
+        await backfill_cover_file_ids(mock_context)
+
+        mock_context.bot.send_photo.assert_called_once()
+        assert mock_context.bot.send_photo.call_args[1]['photo'] == b"old"
+        message.delete.assert_called_once()
+        assert stored_file_id(mock_db_connection, "Старая") == "backfilled-id"
+        assert stored_file_id(mock_db_connection, "Новая") == "known-id"
+
+        await backfill_cover_file_ids(mock_context)
+
+        mock_context.job.schedule_removal.assert_called_once()
@@ -0,0 +1,135 @@
+"""
+Тесты хранилища обложек
+"""
+import os
+import sqlite3
+import pytest
+from main import _insert_book, finalize_book, delete_book_confirm
+from booktracker.covers import CoverStore, cover_key
+from booktracker.migrations import MIGRATIONS, migrate
+
+
+class TestCoverStore:
+    """Тесты каталога обложек по SHA-256"""
+
+    def test_identical_uploads_stored_once(self, cover_store):
+        """Тест: одинаковые обложки хранятся одним файлом"""
+        first = cover_store.put(b"cover bytes")
+        second = cover_store.put(bytearray(b"cover bytes"))
+
+        assert first == second == cover_key(b"cover bytes")
+        files = [name for _, _, names in os.walk(cover_store.root) for name in names]
+        assert files == [first]
+        assert cover_store.get(first) == b"cover bytes"
+
+    def test_empty_cover(self, cover_store):
+        """Тест: пустая обложка не сохраняется"""
+        assert cover_store.put(None) is None
+        assert cover_store.put(b"") is None
+
+    def test_missing_file(self, cover_store):
+        """Тест: отсутствующий файл — None, а не исключение"""
+        assert cover_store.get(cover_key(b"nothing")) is None
+
+
+class TestCoverHandlers:
+    """Тесты работы обработчиков с обложками"""
+
+    @pytest.mark.asyncio
+    async def test_finalize_book_stores_reference(self, mock_update, mock_context, mock_db_connection, cover_store):
+        """Тест: книга хранит только ссылку на обложку"""
+        mock_context.user_data['new_book'] = {
+            'title': 'Война и мир', 'description': 'Описание', 'image_blob': bytearray(b'jpeg'),
+            'isbn': None, 'authors': ['Лев Толстой'], 'series_id': None, 'series_order': None,
+        }
+
+        await finalize_book(mock_update, mock_context)
+
+        key = mock_db_connection.execute("SELECT cover_sha256 FROM books WHERE title = ?", ("Война и мир",)).fetchone()[0]
+        assert key == cover_key(b'jpeg')
+        assert cover_store.get(key) == b'jpeg'
+
+    @pytest.mark.asyncio
+    async def test_duplicate_leaves_no_cover_file(self, mock_update, mock_context, mock_db_connection, cover_store):
+        """Тест: повторное добавление книги не оставляет файл обложки"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Война и мир')")
+        mock_db_connection.commit()
+        mock_context.user_data['new_book'] = {
+            'title': 'война и мир', 'description': None, 'image_blob': bytearray(b'jpeg'),
+            'isbn': None, 'authors': [], 'series_id': None, 'series_order': None,
+        }
+
+        await finalize_book(mock_update, mock_context)
+
+        assert "уже существует" in mock_update.message.reply_text.call_args[0][0]
+        assert [name for _, _, names in os.walk(cover_store.root) for name in names] == []
+
+    @pytest.mark.asyncio
+    async def test_shared_cover_survives_deletion(self, mock_update, mock_context, mock_db_connection, cover_store):
+        """Тест: общая обложка удаляется только вместе с последней книгой"""
+        key = cover_store.put(b"shared")
+        cursor = mock_db_connection.cursor()
+        cursor.execute("INSERT INTO books (title, cover_sha256) VALUES (?, ?)", ("Том 1", key))
+        first_id = cursor.lastrowid
+        cursor.execute("INSERT INTO books (title, cover_sha256) VALUES (?, ?)", ("Том 2", key))
+        second_id = cursor.lastrowid
+        mock_db_connection.commit()
+        mock_update.message.text = "✅ Да, удалить"
+
+        mock_context.user_data['book_to_delete'] = first_id
+        await delete_book_confirm(mock_update, mock_context)
+        assert os.path.exists(cover_store.path(key))
+
+        mock_context.user_data['book_to_delete'] = second_id
+        await delete_book_confirm(mock_update, mock_context)
+        assert not os.path.exists(cover_store.path(key))
+
+    @pytest.mark.asyncio
+    async def test_cover_restored_after_concurrent_delete(self, mock_update, mock_context, mock_db_connection,
+                                                          cover_store):
+        """Тест: файл, найденный put до удаления последней ссылки, вставка книги пишет заново"""
+        key = cover_store.put(b"shared")
+        book_id = mock_db_connection.execute("INSERT INTO books (title, cover_sha256) VALUES (?, ?)",
+                                             ("Том 1", key)).lastrowid
+        mock_db_connection.commit()
+        # Второй пользователь сохранил ту же обложку: файл уже был, put его не писал
+        assert cover_store.put(b"shared") == key
+
+        mock_update.message.text = "✅ Да, удалить"
+        mock_context.user_data['book_to_delete'] = book_id
+        await delete_book_confirm(mock_update, mock_context)
+        assert not os.path.exists(cover_store.path(key))
+
+        _insert_book(mock_db_connection.cursor(), {
+            'title': 'Том 2', 'description': None, 'image_blob': b"shared", 'cover_sha256': key,
+            'isbn': None, 'authors': [],
+        })
+        assert cover_store.get(key) == b"shared"
+
+
+class TestCoverMigration:
+    """Тесты переноса обложек из books.db"""
+
+    def test_blobs_moved_out_of_database(self, tmp_path, monkeypatch):
+        """Тест: миграция выносит обложки в файлы и уменьшает базу"""
+        monkeypatch.delenv("COVERS_DIR", raising=False)
+        path = tmp_path / "books.db"
+        conn = sqlite3.connect(path)
+        for statement in MIGRATIONS[0][2]:
+            conn.execute(statement)
+        image = os.urandom(200 * 1024)
+        conn.execute("INSERT INTO books (title, image_blob) VALUES (?, ?)", ("Первая", image))
+        conn.execute("INSERT INTO books (title, image_blob) VALUES (?, ?)", ("Вторая", image))
+        conn.execute("INSERT INTO books (title) VALUES (?)", ("Без обложки",))
+        conn.commit()
+        size_before = os.path.getsize(path)
+
+        migrate(conn)
+
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(books)")]
+        assert "image_blob" not in columns
+        keys = {row[0] for row in conn.execute("SELECT cover_sha256 FROM books")}
+        assert keys == {cover_key(image), None}
+        assert CoverStore(str(tmp_path / "covers")).get(cover_key(image)) == image
+        assert os.path.getsize(path) < size_before - 150 * 1024
+        conn.close()
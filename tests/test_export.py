@@ -0,0 +1,94 @@
+"""
+Тесты потокового экспорта библиотеки
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+import pytest
+from main import export_library
+from booktracker.export import write_export
+
+EXPORTED_AT = datetime(2024, 5, 1, 12, 30)
+
+
+def add_library(conn):
+    series_id = conn.execute("INSERT INTO series (name) VALUES ('Цикл')").lastrowid
+    author_id = conn.execute("INSERT INTO authors (name) VALUES ('Автор')").lastrowid
+    book_id = conn.execute("""
+        INSERT INTO books (title, description, isbn, series_id, series_order)
+        VALUES ('Книга 2', 'Строка, с "кавычками"' || char(10) || 'и переносом', '978', ?, 2)
+    """, (series_id,)).lastrowid
+    conn.execute("INSERT INTO books (title, description) VALUES ('Книга 10', ?)", ("д" * 300,))
+    conn.execute("INSERT INTO book_authors (book_id, author_id) VALUES (?, ?)", (book_id, author_id))
+    conn.commit()
+
+
+def export(conn, fmt, compress=False):
+    out = io.BytesIO()
+    count = write_export(conn, out, fmt, compress, (2, 1, 1), EXPORTED_AT)
+    data = out.getvalue()
+    return count, (gzip.decompress(data) if compress else data).decode("utf-8")
+
+
+class TestWriteExport:
+    """Тесты форматов экспорта"""
+
+    def test_txt_layout(self, mock_db_connection):
+        """Тест: TXT сохраняет прежний вид отчёта"""
+        add_library(mock_db_connection)
+
+        count, text = export(mock_db_connection, "txt")
+
+        assert count == 2
+        assert text.startswith("📚 МОЯ БИБЛИОТЕКА\n" + "=" * 50 + "\n\n1. Книга 2\n   Авторы: Автор\n"
+                               "   Серия: Цикл (книга 2)\n   ISBN: 978\n")
+        assert "2. Книга 10\n   Описание: " + "д" * 200 + "...\n\n" in text
+        assert text.endswith("Всего книг: 2\nСерий: 1\nАвторов: 1\nДата экспорта: 2024-05-01 12:30:00\n")
+
+    def test_csv_and_jsonl_round_trip(self, mock_db_connection):
+        """Тест: CSV и JSON Lines читаются обратно без потерь, описание не обрезается"""
+        add_library(mock_db_connection)
+
+        _, text = export(mock_db_connection, "csv")
+        rows = list(csv.DictReader(io.StringIO(text, newline="")))
+        _, text = export(mock_db_connection, "jsonl", compress=True)
+        records = [json.loads(line) for line in text.splitlines()]
+
+        assert rows[0]["description"] == 'Строка, с "кавычками"\nи переносом'
+        assert (rows[0]["authors"], rows[0]["series"], rows[0]["series_order"]) == ("Автор", "Цикл", "2")
+        assert len(rows[1]["description"]) == 300
+        assert records[0] == {"title": "Книга 2", "authors": "Автор", "series": "Цикл", "series_order": 2,
+                              "isbn": "978", "description": 'Строка, с "кавычками"\nи переносом'}
+        assert records[1]["authors"] is None
+
+
+class TestExportCommand:
+    """Тесты аргументов /export_library"""
+
+    @pytest.mark.asyncio
+    async def test_format_and_gzip(self, mock_update, mock_context, mock_db_connection, jobs):
+        """Тест: /export_library jsonl gz присылает сжатый JSON Lines"""
+        add_library(mock_db_connection)
+        exported = []
+        mock_update.message.reply_document.side_effect = lambda document, **kwargs: exported.append(
+            (document.read(), kwargs['filename']))
+        mock_context.args = ["JSONL", "gz"]
+
+        await export_library(mock_update, mock_context)
+        await jobs.join()
+
+        data, filename = exported[0]
+        assert filename.startswith("library_export_") and filename.endswith(".jsonl.gz")
+        assert [json.loads(line)["title"] for line in gzip.decompress(data).splitlines()] == ["Книга 2", "Книга 10"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_format(self, mock_update, mock_context, mock_db_connection):
+        """Тест: неизвестный формат — подсказка, файл не отправляется"""
+        mock_context.args = ["xlsx"]
+
+        await export_library(mock_update, mock_context)
+
+        assert "Использование: /export_library" in mock_update.message.reply_text.call_args[0][0]
+        mock_update.message.reply_document.assert_not_called()
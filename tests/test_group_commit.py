@@ -0,0 +1,88 @@
+"""
+Тесты писателя с групповой фиксацией изменений
+"""
+import asyncio
+import sqlite3
+import pytest
+from booktracker.writer import GroupCommitWriter
+
+
+@pytest.fixture
+async def writer(test_db_path, db_connection):
+    """Писатель поверх тестовой базы"""
+    w = GroupCommitWriter(lambda: sqlite3.connect(test_db_path, check_same_thread=False),
+                          max_batch=100, max_wait_ms=50)
+    yield w
+    await w.close()
+
+
+def set_status(cur, user_id, book_id, status):
+    cur.execute("INSERT OR REPLACE INTO user_books (user_id, book_id, status) VALUES (?, ?, ?)",
+                (user_id, book_id, status))
+    return user_id
+
+
+class TestGroupCommit:
+    """Тесты пакетной фиксации"""
+
+    @pytest.mark.asyncio
+    async def test_burst_is_committed_in_one_transaction(self, writer, db_connection):
+        """Тест: всплеск изменений статусов от многих пользователей — одна фиксация"""
+        # Arrange
+        db_connection.execute("INSERT INTO books (title) VALUES (?)", ("Война и мир",))
+        db_connection.commit()
+        book_id = db_connection.execute("SELECT id FROM books").fetchone()[0]
+
+        # Act
+        results = await asyncio.gather(*[
+            writer.submit(set_status, user_id, book_id, "reading") for user_id in range(1, 51)
+        ])
+
+        # Assert
+        assert results == list(range(1, 51))
+        assert writer.commits == 1
+        assert writer.jobs == 50
+        count = db_connection.execute("SELECT COUNT(*) FROM user_books").fetchone()[0]
+        assert count == 50
+
+    @pytest.mark.asyncio
+    async def test_failed_job_does_not_affect_batch(self, writer, db_connection):
+        """Тест: ошибка одного задания возвращается только его вызывающему"""
+        # Arrange
+        db_connection.execute("INSERT INTO books (title) VALUES (?)", ("Война и мир",))
+        db_connection.commit()
+        book_id = db_connection.execute("SELECT id FROM books").fetchone()[0]
+
+        # Act
+        results = await asyncio.gather(
+            writer.submit(set_status, 1, book_id, "reading"),
+            writer.submit(set_status, 2, book_id, "unknown"),  # нарушает CHECK
+            writer.submit(set_status, 3, book_id, "finished"),
+            return_exceptions=True,
+        )
+
+        # Assert
+        assert results[0] == 1
+        assert isinstance(results[1], sqlite3.IntegrityError)
+        assert results[2] == 3
+        assert writer.commits == 1
+        rows = db_connection.execute("SELECT user_id FROM user_books ORDER BY user_id").fetchall()
+        assert rows == [(1,), (3,)]
+
+    @pytest.mark.asyncio
+    async def test_batch_size_is_bounded(self, test_db_path, db_connection):
+        """Тест: пачка не превышает max_batch заданий"""
+        # Arrange
+        w = GroupCommitWriter(lambda: sqlite3.connect(test_db_path, check_same_thread=False),
+                              max_batch=10, max_wait_ms=50)
+
+        # Act
+        await asyncio.gather(*[
+            w.submit(lambda cur, i: cur.execute("INSERT INTO authors (name) VALUES (?)", (f"Автор {i}",)), i)
+            for i in range(30)
+        ])
+        await w.close()
+
+        # Assert
+        assert w.commits == 3
+        assert db_connection.execute("SELECT COUNT(*) FROM authors").fetchone()[0] == 30
@@ -0,0 +1,127 @@
+"""
+Тесты массового импорта книг
+"""
+import io
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+import main
+from main import import_document
+from booktracker.export import write_export
+from booktracker.importer import ImportFormatError, ImportState, import_batch, read_records
+
+GOODREADS = '''Book Id,Title,Author,Author l-f,Additional Authors,ISBN,ISBN13,My Rating,Exclusive Shelf,My Review
+1,"The Way of Kings (The Stormlight Archive, #1)",Brandon Sanderson,"Sanderson, Brandon",,"=""0765326353""","=""9780765326355""",5,read,
+2,"Words of Radiance (The Stormlight Archive, #2)",Brandon Sanderson,"Sanderson, Brandon",,,,0,currently-reading,
+3,Good Omens,Terry Pratchett,"Pratchett, Terry",Neil Gaiman,,,0,to-read,Смешно
+4,,Nobody,,,,,0,to-read,
+5,"The Way of Kings (The Stormlight Archive, #1)",Brandon Sanderson,,,,,0,read,
+'''
+
+
+def records_of(text, filename):
+    return list(read_records(io.BytesIO(text.encode("utf-8")), filename))
+
+
+def run_import(conn, text, filename, user_id=12345, batch=2):
+    """Импорт порциями по batch; (добавлено, дубликаты, ошибки)"""
+    rows = records_of(text, filename)
+    state, added, duplicates = ImportState(), 0, []
+    for start in range(0, len(rows), batch):
+        records = [record for record, _ in rows[start:start + batch] if record is not None]
+        count, skipped = import_batch(conn.cursor(), records, user_id, state)
+        added += count
+        duplicates += skipped
+    conn.commit()
+    return added, duplicates, [error for _, error in rows if error is not None]
+
+
+def book(conn, title):
+    return conn.execute("""
+        SELECT b.authors_display, s.name, b.series_order, b.isbn, ub.status FROM books b
+        LEFT JOIN series s ON s.id = b.series_id
+        LEFT JOIN user_books ub ON ub.book_id = b.id AND ub.user_id = 12345
+        WHERE b.title = ?
+    """, (title,)).fetchone()
+
+
+class TestImportBatch:
+    """Тесты разбора файлов и пакетной записи"""
+
+    def test_goodreads_export(self, mock_db_connection):
+        """Тест: серия из названия, ISBN без ="…", полка → статус, дубликаты и ошибки"""
+        added, duplicates, errors = run_import(mock_db_connection, GOODREADS, "goodreads_library_export.csv")
+
+        assert added == 3
+        assert duplicates == ["The Way of Kings"]
+        assert errors == [(5, "нет названия")]
+        assert book(mock_db_connection, "The Way of Kings") == \
+            ("Brandon Sanderson", "The Stormlight Archive", 1, "9780765326355", "finished")
+        assert book(mock_db_connection, "Words of Radiance")[1:] == ("The Stormlight Archive", 2, None, "reading")
+        assert book(mock_db_connection, "Good Omens") == ("Terry Pratchett, Neil Gaiman", None, None, None, "planning")
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM series").fetchone()[0] == 1
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM authors").fetchone()[0] == 3
+
+    def test_round_trip_of_own_csv(self, mock_db_connection):
+        """Тест: CSV из /export_library csv импортируется обратно; имеющиеся книги — дубликаты"""
+        conn = mock_db_connection
+        series_id = conn.execute("INSERT INTO series (name) VALUES ('Цикл')").lastrowid
+        conn.execute("INSERT INTO books (title, isbn, series_id, series_order) VALUES ('Книга 1', '978', ?, 1)",
+                     (series_id,))
+        conn.commit()
+        out = io.BytesIO()
+        write_export(conn, out, "csv", False, (1, 1, 0), datetime.now())
+        exported = out.getvalue().decode("utf-8")
+        conn.execute("DELETE FROM books")
+        conn.execute("INSERT INTO books (title) VALUES ('Чужая книга')")
+        conn.commit()
+
+        text = exported + "Чужая книга,,,,,\nКнига 2,\"А, Б\",Цикл,x,,\n"
+        added, duplicates, errors = run_import(conn, text, "library.csv")
+
+        assert (added, duplicates) == (1, ["Чужая книга"])
+        assert errors == [(4, "номер в серии «x» — не целое число")]
+        assert book(conn, "Книга 1") == (None, "Цикл", 1, "978", None)
+
+    def test_jsonl_and_unknown_format(self, mock_db_connection):
+        """Тест: JSON Lines с авторами списком, битые строки — ошибки; чужой формат отклоняется"""
+        text = ('{"title": "Книга", "authors": ["Первый", "Второй"], "status": "reading"}\n'
+                '{"title": \n'
+                '\n'
+                '{"title": "Другая", "status": "someday"}\n')
+
+        added, _, errors = run_import(mock_db_connection, text, "books.jsonl")
+
+        assert added == 1
+        assert [line for line, _ in errors] == [2, 4]
+        assert book(mock_db_connection, "Книга") == ("Первый, Второй", None, None, None, "reading")
+        with pytest.raises(ImportFormatError):
+            records_of("a,b\n1,2\n", "other.csv")
+        with pytest.raises(ImportFormatError):
+            records_of("", "books.xlsx")
+
+
+class TestImportDocument:
+    """Тесты обработчика присланного файла"""
+
+    @pytest.mark.asyncio
+    async def test_progress_message_gets_summary(self, mock_update, mock_context, mock_db_connection, monkeypatch, jobs):
+        """Тест: один ответ, который правится до итога с дубликатами и ошибками"""
+        monkeypatch.setattr(main, "IMPORT_BATCH", 2)
+        data = GOODREADS.encode("utf-8")
+        telegram_file = MagicMock()
+        telegram_file.download_to_memory = AsyncMock(side_effect=lambda out: out.write(data))
+        mock_update.message.document = MagicMock(file_name="goodreads_library_export.csv")
+        mock_update.message.document.get_file = AsyncMock(return_value=telegram_file)
+        progress = MagicMock(edit_text=AsyncMock())
+        mock_update.message.reply_text.return_value = progress
+        mock_update.effective_user.id = 12345
+
+        await import_document(mock_update, mock_context)
+        await jobs.join()
+
+        mock_update.message.reply_text.assert_called_once()
+        summary = progress.edit_text.call_args[0][0]
+        assert summary.startswith("✅ Импорт завершён: добавлено 3, дубликатов 1, ошибок 1.")
+        assert "• The Way of Kings" in summary
+        assert "• строка 5: нет названия" in summary
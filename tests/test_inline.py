@@ -0,0 +1,103 @@
+"""
+Тесты inline-режима поиска
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from telegram import InlineQueryResultArticle, InlineQueryResultCachedPhoto
+import main
+from main import inline_search
+from booktracker.debounce import Debouncer
+
+
+def inline_update(text, user_id=12345):
+    inline_query = SimpleNamespace(query=text, answer=AsyncMock())
+    return SimpleNamespace(inline_query=inline_query, effective_user=SimpleNamespace(id=user_id))
+
+
+@pytest.fixture
+def no_debounce(monkeypatch):
+    monkeypatch.setattr(main, "inline_debouncer", Debouncer(0))
+
+
+class TestInlineSearch:
+    """Тесты ответа на inline-запрос"""
+
+    @pytest.mark.asyncio
+    async def test_cards_use_cached_cover(self, no_debounce, mock_context, mock_db_connection):
+        """Тест: книга с file_id обложки отдаётся фото, без него — статьёй"""
+        mock_db_connection.execute("INSERT INTO books (title, cover_sha256, cover_file_id) "
+                                   "VALUES ('Дракон', 'abc', 'file-1')")
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Драконы юга')")
+        mock_db_connection.commit()
+        update = inline_update("драк")
+
+        await inline_search(update, mock_context)
+
+        results = update.inline_query.answer.call_args[0][0]
+        kwargs = update.inline_query.answer.call_args[1]
+        assert [type(r) for r in results] == [InlineQueryResultCachedPhoto, InlineQueryResultArticle]
+        assert results[0].photo_file_id == "file-1"
+        assert (kwargs['cache_time'], kwargs['is_personal']) == (main.INLINE_CACHE_TIME, True)
+
+    @pytest.mark.asyncio
+    async def test_results_capped(self, no_debounce, mock_context, mock_db_connection, monkeypatch):
+        """Тест: в ответе не больше INLINE_LIMIT карточек"""
+        monkeypatch.setattr(main, "INLINE_LIMIT", 5)
+        mock_db_connection.executemany("INSERT INTO books (title) VALUES (?)", [(f"Книга {i}",) for i in range(20)])
+        mock_db_connection.commit()
+        update = inline_update("книга")
+
+        await inline_search(update, mock_context)
+
+        assert len(update.inline_query.answer.call_args[0][0]) == 5
+
+    @pytest.mark.asyncio
+    async def test_empty_answer_short_cache(self, no_debounce, mock_context, mock_db_connection):
+        """Тест: пустой запрос и запрос без совпадений кэшируются ненадолго"""
+        for text in ("", "несуществующая"):
+            update = inline_update(text)
+            await inline_search(update, mock_context)
+            assert update.inline_query.answer.call_args[0][0] == []
+            assert update.inline_query.answer.call_args[1]['cache_time'] == main.INLINE_EMPTY_CACHE_TIME
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_user(self, no_debounce, mock_context, mock_db_connection):
+        """Тест: чужой пользователь получает пустой ответ"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Секрет')")
+        mock_db_connection.commit()
+        update = inline_update("секрет", user_id=99999)
+
+        await inline_search(update, mock_context)
+
+        assert update.inline_query.answer.call_args[0][0] == []
+
+
+class TestDebouncer:
+    """Тесты отмены устаревших запросов"""
+
+    @pytest.mark.asyncio
+    async def test_newer_query_cancels_stale(self, mock_context, mock_db_connection, monkeypatch):
+        """Тест: при быстром наборе отвечаем только на последний запрос пользователя"""
+        monkeypatch.setattr(main, "inline_debouncer", Debouncer(0.05))
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Дракон')")
+        mock_db_connection.commit()
+        updates = [inline_update(text) for text in ("д", "дра", "дракон")]
+
+        await asyncio.gather(*(inline_search(update, mock_context) for update in updates))
+
+        assert [u.inline_query.answer.called for u in updates] == [False, False, True]
+        assert main.inline_debouncer.cancelled == 2
+
+    @pytest.mark.asyncio
+    async def test_keys_independent(self):
+        """Тест: запросы разных пользователей не отменяют друг друга"""
+        debouncer = Debouncer(0.01)
+
+        async def echo(value):
+            return value
+
+        results = await asyncio.gather(debouncer.run(1, echo, "a"), debouncer.run(2, echo, "b"))
+
+        assert results == [(True, "a"), (True, "b")]
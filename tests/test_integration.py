@@ -2,7 +2,7 @@
 Интеграционные тесты для полных сценариев работы бота
 """
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 from main import (
     add_start, add_title, add_description, add_cover, add_isbn,
     add_authors, add_series, add_series_order, finalize_book,
@@ -12,10 +12,6 @@ from main import (
     edit_book_start, edit_book_select, edit_field_select, edit_value_process
 )
 
-@pytest.fixture(autouse=True)
-def patch_main_db(mock_db_connection):
-    with patch("main.cursor", mock_db_connection.cursor()), patch("main.conn", mock_db_connection):
-        yield
 
 class TestCompleteBookWorkflow:
     """Тесты полного рабочего процесса с книгой"""
@@ -259,7 +255,6 @@ class TestCompleteDeleteWorkflow:
         
         # Шаг 2: Выбор книги
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Война и мир"]
         await delete_book_select(mock_update, mock_context)
         assert mock_context.user_data['book_to_delete'] == book_id
         
@@ -294,7 +289,6 @@ class TestCompleteEditWorkflow:
         
         # Шаг 2: Выбор книги
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Старая книга"]
         await edit_book_select(mock_update, mock_context)
         assert mock_context.user_data['book_to_edit'] == book_id
         
@@ -382,7 +376,6 @@ class TestCrossFunctionality:
         mock_update.message.reply_text.reset_mock()
         await status_start(mock_update, mock_context)
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Война и мир"]
         await status_select_book(mock_update, mock_context)
         mock_update.message.text = "✅ Прочитано"
         await status_select_status(mock_update, mock_context)
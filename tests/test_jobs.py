@@ -0,0 +1,153 @@
+"""
+Тесты фоновых заданий и команды /jobs
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+import main
+from booktracker.jobs import CANCELLED, DONE, FAILED, HIGH, LOW, NORMAL, QUEUED, RUNNING, JobEngine
+
+
+class Gate:
+    """Задание, которое ждёт разрешения завершиться и запоминает порядок запуска"""
+
+    def __init__(self):
+        self.started = []
+        self.release = asyncio.Event()
+
+    async def run(self, job, name):
+        self.started.append(name)
+        await job.report(f"{name}: идёт")
+        await self.release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestJobEngine:
+    """Тесты очереди заданий"""
+
+    @pytest.mark.asyncio
+    async def test_priorities_and_bounded_pool(self):
+        """Тест: не больше workers заданий сразу, из очереди — по приоритету, затем по порядку"""
+        engine = JobEngine(workers=2)
+        gate = Gate()
+        for name, priority in (("a", NORMAL), ("b", NORMAL), ("c", LOW), ("d", NORMAL), ("e", HIGH)):
+            await engine.submit(1, name, gate.run, name, priority=priority)
+        await settle()
+
+        assert gate.started == ["a", "b"]
+        assert [job.state for job in engine.jobs()].count(RUNNING) == 2
+
+        gate.release.set()
+        await engine.join()
+
+        assert gate.started == ["a", "b", "e", "d", "c"]
+        assert {job.state for job in engine.jobs()} == {DONE}
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_and_running(self):
+        """Тест: отмена в очереди и на ходу; в сообщении остаётся последний ход задания"""
+        engine = JobEngine(workers=1)
+        gate = Gate()
+        message = MagicMock(edit_text=AsyncMock())
+        running = await engine.submit(1, "первое", gate.run, "первое")
+        queued = await engine.submit(1, "второе", gate.run, "второе", announce=AsyncMock(return_value=message))
+        await settle()
+
+        assert queued.state == QUEUED
+        assert await engine.cancel(queued)
+        assert message.edit_text.call_args[0][0] == "🚫 Задание #2 отменено: второе"
+        assert await engine.cancel(running)
+        assert running.state == CANCELLED
+        assert running.progress == "первое: идёт\n\n🚫 Задание #1 отменено"
+        assert not await engine.cancel(running)
+        assert gate.started == ["первое"]
+
+    @pytest.mark.asyncio
+    async def test_failure_frees_worker(self):
+        """Тест: ошибка задания отмечается и не останавливает очередь"""
+        engine = JobEngine(workers=1)
+        done = []
+
+        async def broken(_job):
+            raise RuntimeError("сбой")
+
+        async def fine(_job):
+            done.append(True)
+
+        failed = await engine.submit(1, "сломанное", broken)
+        await engine.submit(1, "обычное", fine)
+        await engine.join()
+
+        assert failed.state == FAILED
+        assert failed.progress.startswith("❌ Задание #1 не выполнено")
+        assert done == [True]
+
+    @pytest.mark.asyncio
+    async def test_progress_is_throttled(self):
+        """Тест: промежуточный ход правит сообщение не чаще progress_interval"""
+        now = [0.0]
+        engine = JobEngine(progress_interval=2, clock=lambda: now[0])
+        message = MagicMock(edit_text=AsyncMock())
+
+        async def steps(job):
+            for step in range(5):
+                await job.report(f"шаг {step}")
+                now[0] += 1
+            await job.report("готово", force=True)
+
+        await engine.submit(1, "шаги", steps, announce=AsyncMock(return_value=message))
+        await engine.join()
+
+        assert [call[0][0] for call in message.edit_text.call_args_list] == ["шаг 0", "шаг 2", "шаг 4", "готово"]
+
+
+class TestJobsCommand:
+    """Тесты /jobs и заданий тяжёлых команд"""
+
+    @pytest.mark.asyncio
+    async def test_export_returns_before_job_finishes(self, mock_update, mock_context, mock_db_connection, jobs):
+        """Тест: /export_library сразу отвечает номером задания, файл приходит из фона"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Книга')")
+        mock_db_connection.commit()
+
+        await main.export_library(mock_update, mock_context)
+
+        assert mock_update.message.reply_text.call_args[0][0].startswith("🕒 Задание #1 в очереди")
+        mock_update.message.reply_document.assert_not_called()
+        await jobs.join()
+        mock_update.message.reply_document.assert_called_once()
+        progress = mock_update.message.reply_text.return_value
+        assert progress.edit_text.call_args[0][0] == "✅ Экспорт готов: книг 1."
+
+    @pytest.mark.asyncio
+    async def test_list_and_cancel(self, mock_update, mock_context, jobs):
+        """Тест: /jobs показывает только свои задания, /jobs cancel отменяет своё"""
+        gate = Gate()
+        own = await jobs.submit(12345, "экспорт библиотеки (csv)", gate.run, "своё")
+        other = await jobs.submit(1, "чужое", gate.run, "чужое")
+        await settle()
+
+        await main.show_jobs(mock_update, mock_context)
+        listing = mock_update.message.reply_text.call_args[0][0]
+        assert "#1 экспорт библиотеки (csv) — ⏳ выполняется" in listing
+        assert "своё: идёт" in listing
+        assert "чужое" not in listing
+
+        mock_context.args = ["cancel", str(other.id)]
+        await main.show_jobs(mock_update, mock_context)
+        assert mock_update.message.reply_text.call_args[0][0].startswith("Задание не найдено")
+        assert other.state == RUNNING
+
+        mock_context.args = ["cancel", f"#{own.id}"]
+        await main.show_jobs(mock_update, mock_context)
+        assert mock_update.message.reply_text.call_args[0][0] == "🚫 Задание #1 отменено."
+        assert own.state == CANCELLED
+
+        mock_context.args = []
+        await main.show_jobs(mock_update, mock_context)
+        assert "#1 экспорт библиотеки (csv) — 🚫 отменено" in mock_update.message.reply_text.call_args[0][0]
+        await jobs.close()
@@ -0,0 +1,91 @@
+"""
+Тесты миграций схемы базы данных
+"""
+import sqlite3
+import pytest
+from booktracker.migrations import MIGRATIONS, LATEST_VERSION, get_version, migrate
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """База в исходном виде books.db: таблицы есть, user_version = 0"""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    for statement in MIGRATIONS[0][2]:
+        conn.execute(statement)
+    conn.execute("INSERT INTO series (name) VALUES (?)", ("Русская классика",))
+    conn.execute("INSERT INTO books (title, series_id, series_order) VALUES (?, ?, ?)", ("Война и мир", 1, 1))
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def query_plan(conn, sql, params=()):
+    return " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+class TestMigrations:
+    """Тесты применения миграций"""
+
+    def test_fresh_database(self, tmp_path):
+        """Тест: новая база получает полную схему и последнюю версию"""
+        conn = sqlite3.connect(tmp_path / "fresh.db")
+
+        version = migrate(conn)
+
+        assert version == LATEST_VERSION
+        assert get_version(conn) == LATEST_VERSION
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"books", "series", "authors", "book_authors", "user_books"} <= tables
+        conn.close()
+
+    def test_legacy_database_upgraded_in_place(self, legacy_db):
+        """Тест: существующая база обновляется без потери данных"""
+        assert get_version(legacy_db) == 0
+
+        migrate(legacy_db)
+
+        assert get_version(legacy_db) == LATEST_VERSION
+        assert legacy_db.execute("SELECT title FROM books").fetchall() == [("Война и мир",)]
+
+    def test_migrate_is_idempotent(self, legacy_db):
+        """Тест: повторный запуск ничего не меняет"""
+        migrate(legacy_db)
+        schema = legacy_db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+
+        assert migrate(legacy_db) == LATEST_VERSION
+        assert legacy_db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+    def test_failed_migration_is_rolled_back(self, legacy_db, monkeypatch):
+        """Тест: упавшая миграция не меняет схему и версию"""
+        broken = MIGRATIONS + [(LATEST_VERSION + 1, "Сломанная", [
+            "CREATE TABLE broken (id INTEGER)",
+            "INSERT INTO missing_table VALUES (1)",
+        ])]
+        monkeypatch.setattr("booktracker.migrations.MIGRATIONS", broken)
+
+        with pytest.raises(sqlite3.OperationalError):
+            migrate(legacy_db)
+
+        assert get_version(legacy_db) == LATEST_VERSION
+        tables = {row[0] for row in legacy_db.execute("SELECT name FROM sqlite_master")}
+        assert "broken" not in tables
+
+
+class TestPerformanceIndexes:
+    """Тесты индексов для запросов обработчиков"""
+
+    @pytest.mark.parametrize("sql, params, index", [
+        ("SELECT title FROM books WHERE series_id = ? ORDER BY series_order", (1,), "idx_books_series"),
+        ("SELECT status, COUNT(*) FROM user_books WHERE user_id = ? GROUP BY status", (1,),
+         "idx_user_books_status_"),
+        ("SELECT book_id FROM book_authors WHERE author_id = ?", (1,), "idx_book_authors_author"),
+        ("SELECT id FROM series WHERE name_norm = ?", ("x",), "idx_series_name_norm"),
+        ("SELECT id FROM books WHERE title_norm = ?", ("x",), "idx_books_title_norm"),
+        ("SELECT title FROM books ORDER BY title_sort", (), "idx_books_title_sort"),
+        ("DELETE FROM user_books WHERE book_id = ?", (1,), "idx_user_books_book"),
+    ])
+    def test_query_uses_index(self, legacy_db, sql, params, index):
+        """Тест: запросы обработчиков используют индексы вместо полного сканирования"""
+        migrate(legacy_db)
+        assert index in query_plan(legacy_db, sql, params)
@@ -0,0 +1,110 @@
+"""
+Тесты пакетного поиска авторов и серий и кэша их id
+"""
+import sqlite3
+import pytest
+from booktracker.names import NameCache, resolve_names
+from booktracker.normalize import register_functions
+from booktracker.writer import GroupCommitWriter
+
+
+class CountingCursor:
+    """Курсор, который считает отправленные запросы (executemany — один запрос)"""
+
+    def __init__(self, conn):
+        self._cur = conn.cursor()
+        self.connection = conn
+        self.statements = 0
+
+    def execute(self, sql, params=()):
+        self.statements += 1
+        return self._cur.execute(sql, params)
+
+    def executemany(self, sql, seq):
+        self.statements += 1
+        return self._cur.executemany(sql, seq)
+
+
+@pytest.fixture
+def conn(db_connection):
+    return register_functions(db_connection)
+
+
+@pytest.fixture
+async def writer(test_db_path, db_connection):
+    """Писатель с кэшем имён, как у бота"""
+    w = GroupCommitWriter(lambda: sqlite3.connect(test_db_path, check_same_thread=False), max_wait_ms=1)
+    w.caches.append(NameCache())
+    yield w
+    await w.close()
+
+
+class TestResolveNames:
+    """Тесты поиска id по именам"""
+
+    def test_constant_number_of_statements(self, conn):
+        """Тест: пять авторов, из них два уже есть, — три запроса; повтор — один"""
+        conn.executemany("INSERT INTO authors (name) VALUES (?)", [("Лев Толстой",), ("Антон Чехов",)])
+        names = ["Лев Толстой", "Фёдор Достоевский", "АНТОН ЧЕХОВ", "Иван Бунин", "Максим Горький"]
+        cur = CountingCursor(conn)
+
+        ids = resolve_names(cur, "authors", names + ["Федор Достоевский"])
+
+        assert cur.statements == 3
+        assert sorted(ids) == ["антон чехов", "иван бунин", "лев толстой", "максим горький", "федор достоевский"]
+        assert conn.execute("SELECT COUNT(*) FROM authors").fetchone()[0] == 5
+        cur = CountingCursor(conn)
+        assert resolve_names(cur, "authors", names) == ids
+        assert cur.statements == 1
+
+    def test_cache_only_on_bound_connection(self, conn, test_db_path):
+        """Тест: привязанный кэш отвечает без запросов, чужое подключение его не видит"""
+        cache = NameCache(max_entries=2)
+        cache.bind(conn)
+        resolve_names(conn.cursor(), "series", ["Дюна", "Основание", "Гиперион"], cache)
+        conn.commit()
+        cur = CountingCursor(conn)
+
+        ids = resolve_names(cur, "series", ["Основание", "Гиперион"], cache)
+
+        assert cur.statements == 0 and len(ids) == 2
+        assert cache.stats()["entries"] == 2
+        other = sqlite3.connect(test_db_path)
+        try:
+            other_cur = CountingCursor(other)
+            assert resolve_names(other_cur, "series", ["Гиперион"], cache) == {"гиперион": ids["гиперион"]}
+            assert other_cur.statements == 1
+        finally:
+            other.close()
+
+
+class TestNameCacheInvalidation:
+    """Тесты сброса кэша на подключении писателя"""
+
+    @pytest.mark.asyncio
+    async def test_delete_and_rename_forget_entry(self, writer):
+        """Тест: удалённый и переименованный автор ищется заново"""
+        cache = writer.caches[0]
+        first = await writer.submit(resolve_names, "authors", ["Автор", "Другой"], cache)
+        await writer.submit(lambda cur: cur.execute("DELETE FROM authors WHERE name = 'Автор'"))
+        await writer.submit(lambda cur: cur.execute("UPDATE authors SET name = 'Третий' WHERE name = 'Другой'"))
+
+        assert cache.stats()["entries"] == 0
+        second = await writer.submit(resolve_names, "authors", ["Автор", "Другой"], cache)
+        assert second["автор"] != first["автор"] and second["другой"] != first["другой"]
+
+    @pytest.mark.asyncio
+    async def test_rollback_clears_cache(self, writer, db_connection):
+        """Тест: откат задания не оставляет в кэше id несуществующей серии"""
+        cache = writer.caches[0]
+
+        def add_and_fail(cur):
+            resolve_names(cur, "series", ["Откатанная"], cache)
+            raise RuntimeError("сбой")
+
+        with pytest.raises(RuntimeError):
+            await writer.submit(add_and_fail)
+
+        assert cache.stats()["entries"] == 0
+        ids = await writer.submit(resolve_names, "series", ["Откатанная"], cache)
+        assert db_connection.execute("SELECT id FROM series").fetchall() == [(ids["откатанная"],)]
@@ -0,0 +1,110 @@
+"""
+Тесты нормализованных ключей поиска и сортировки
+"""
+import pytest
+from main import finalize_book, add_series, status_start
+from booktracker.normalize import normalize, codepoint_sort_key
+from booktracker.search import _find_books_like
+
+
+class TestKeys:
+    """Тесты функций нормализации"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("Гарри Поттер", "гарри поттер"),
+        ("ЁЖИК в тумане", "ежик в тумане"),
+        ("Пикник на обочине!", "пикник на обочине"),
+        ("  Война   и мир… ", "война и мир"),
+        ("Сто лет одиночества", "сто лет одиночества"),
+    ])
+    def test_normalize(self, text, expected):
+        """Тест: регистр, «ё», пунктуация и пробелы не влияют на ключ"""
+        assert normalize(text) == expected
+
+    def test_sort_order(self):
+        """Тест: алфавитный порядок без учёта регистра, «ё» и с числами по значению"""
+        titles = ["книга 10", "Ёлка", "Книга 2", "Ящер", "елань", "Азбука"]
+
+        assert sorted(titles, key=codepoint_sort_key) == ["Азбука", "елань", "Ёлка", "Книга 2", "книга 10", "Ящер"]
+
+    def test_other_scripts_by_codepoint(self):
+        """Тест: без правил локали — латиница раньше кириллицы, «é» после «z»"""
+        titles = ["Яблоко", "Zebra", "Éclair", "apple"]
+
+        assert sorted(titles, key=codepoint_sort_key) == ["apple", "Zebra", "Éclair", "Яблоко"]
+
+
+class TestNormalizedColumns:
+    """Тесты колонок, заполняемых триггерами"""
+
+    def test_columns_filled_on_write(self, mock_db_connection):
+        """Тест: колонки ключей заполняются при вставке и изменении"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Ёлка')")
+        mock_db_connection.execute("INSERT INTO authors (name) VALUES ('Лев ТОЛСТОЙ')")
+        mock_db_connection.execute("INSERT INTO series (name) VALUES ('Гарри Поттер')")
+        mock_db_connection.execute("UPDATE books SET title = 'Ёлка 2' WHERE title = 'Ёлка'")
+        mock_db_connection.commit()
+
+        assert mock_db_connection.execute("SELECT title_norm, title_sort FROM books").fetchone() == \
+            ("елка 2", "елка 0000000002")
+        assert mock_db_connection.execute("SELECT name_norm FROM authors").fetchone() == ("лев толстой",)
+        assert mock_db_connection.execute("SELECT name_norm FROM series").fetchone() == ("гарри поттер",)
+
+    def test_like_search_folds_cyrillic_case(self, mock_db_connection):
+        """Тест: поиск без FTS находит «Гарри» по запросу «гарри»"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Гарри Поттер и философский камень')")
+        mock_db_connection.commit()
+
+        results = _find_books_like(mock_db_connection, "гарри", 10)
+
+        assert [row[0] for row in results] == ["Гарри Поттер и философский камень"]
+
+
+class TestNormalizedHandlers:
+    """Тесты обработчиков, использующих ключи"""
+
+    @pytest.mark.asyncio
+    async def test_duplicate_title_differs_only_in_case(self, mock_update, mock_context, mock_db_connection):
+        """Тест: книга с тем же названием в другом регистре и с «ё» считается дубликатом"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Ёжик в тумане')")
+        mock_db_connection.commit()
+        mock_context.user_data['new_book'] = {
+            'title': 'ежик В ТУМАНЕ', 'description': None, 'image_blob': None, 'isbn': None,
+            'authors': [], 'series_id': None, 'series_order': None,
+        }
+
+        await finalize_book(mock_update, mock_context)
+
+        assert "уже существует" in mock_update.message.reply_text.call_args[0][0]
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_series_and_authors_deduplicated(self, mock_update, mock_context, mock_db_connection):
+        """Тест: серия и автор в другом регистре не создаются повторно"""
+        mock_db_connection.execute("INSERT INTO series (name) VALUES ('Гарри Поттер')")
+        mock_db_connection.execute("INSERT INTO authors (name) VALUES ('Джоан Роулинг')")
+        mock_db_connection.commit()
+        mock_context.user_data['new_book'] = {
+            'title': 'Тайная комната', 'description': None, 'image_blob': None, 'isbn': None,
+            'authors': ['джоан роулинг'],
+        }
+        mock_update.message.text = "гарри поттер"
+
+        await add_series(mock_update, mock_context)
+        mock_context.user_data['new_book']['series_order'] = 2
+        await finalize_book(mock_update, mock_context)
+
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM series").fetchone()[0] == 1
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM authors").fetchone()[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_book_picker_sorted_by_key(self, mock_update, mock_context, mock_db_connection):
+        """Тест: список книг для выбора отсортирован по ключу сортировки"""
+        for title in ("Книга 10", "ёлка", "Книга 2", "Азбука"):
+            mock_db_connection.execute("INSERT INTO books (title) VALUES (?)", (title,))
+        mock_db_connection.commit()
+
+        await status_start(mock_update, mock_context)
+
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+        assert [row[0].text for row in markup.inline_keyboard[:4]] == ["1. Азбука", "2. ёлка", "3. Книга 2", "4. Книга 10"]
@@ -0,0 +1,151 @@
+"""
+Тесты постраничного вывода списков
+"""
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+import main
+from main import PAGED_LISTS, PAGE_SIZE, list_books, my_books, page_callback
+from booktracker.pagination import NEXT, PREV, KeysetView, parse_callback_data
+
+
+def add_books(conn, count, user_id=None):
+    for i in range(count):
+        book_id = conn.execute("INSERT INTO books (title) VALUES (?)", (f"Книга {i}",)).lastrowid
+        if user_id is not None and i % 2 == 0:
+            conn.execute("INSERT INTO user_books (user_id, book_id, status) VALUES (?, ?, 'reading')",
+                         (user_id, book_id))
+    conn.commit()
+
+
+def press(mock_update, callback_data):
+    query = MagicMock()
+    query.data = callback_data
+    query.answer = AsyncMock()
+    query.edit_message_text = AsyncMock()
+    mock_update.callback_query = query
+    return query
+
+
+def buttons(markup):
+    return {button.text: button.callback_data for button in markup.inline_keyboard[0]}
+
+
+class TestKeysetView:
+    """Тесты выборки страниц по ключу"""
+
+    @pytest.fixture
+    def view(self):
+        return KeysetView("books", "title", "books", "title_sort", "id", page_size=3)
+
+    def test_pages_forward_and_back(self, view, mock_db_connection):
+        """Тест: переход вперёд и назад возвращает соседние страницы по порядку"""
+        add_books(mock_db_connection, 7)
+
+        first = view.fetch_page(mock_db_connection)
+        second = view.fetch_page(mock_db_connection, (), first.rows[-1][-1], NEXT)
+        third = view.fetch_page(mock_db_connection, (), second.rows[-1][-1], NEXT)
+        back = view.fetch_page(mock_db_connection, (), second.rows[0][-1], PREV)
+
+        assert [r[0] for r in first.rows] == ["Книга 0", "Книга 1", "Книга 2"]
+        assert (first.has_prev, first.has_next) == (False, True)
+        assert [r[0] for r in second.rows] == ["Книга 3", "Книга 4", "Книга 5"]
+        assert [r[0] for r in third.rows] == ["Книга 6"]
+        assert (third.has_prev, third.has_next) == (True, False)
+        assert back == first._replace(has_next=True)
+
+    def test_deleted_anchor_restarts(self, view, mock_db_connection):
+        """Тест: если якорь удалён, показывается первая страница"""
+        add_books(mock_db_connection, 4)
+        last_id = view.fetch_page(mock_db_connection).rows[-1][-1]
+        mock_db_connection.execute("DELETE FROM books")
+        mock_db_connection.commit()
+        add_books(mock_db_connection, 1)
+
+        page = view.fetch_page(mock_db_connection, (), last_id, NEXT)
+
+        assert [r[0] for r in page.rows] == ["Книга 0"]
+
+    @pytest.mark.parametrize("name", sorted(PAGED_LISTS))
+    def test_page_query_is_bounded(self, name, mock_db_connection):
+        """Тест: страница читается из индекса без сортировки всей выборки"""
+        view = PAGED_LISTS[name][0]
+        params = (1,) * view.where.count("?")
+        for anchored in (False, True):
+            # Подзапрос якоря проверяет where ещё раз
+            args = params + (params + (1,) if anchored else ()) + (view.page_size + 1,)
+            plan = " ".join(row[-1] for row in mock_db_connection.execute(
+                "EXPLAIN QUERY PLAN " + view._query(NEXT, anchored), args))
+            assert "TEMP B-TREE" not in plan
+            assert "INDEX" in plan
+
+
+class TestPagedHandlers:
+    """Тесты постраничных обработчиков и кнопок"""
+
+    @pytest.mark.asyncio
+    async def test_first_page_is_bounded(self, mock_update, mock_context, mock_db_connection):
+        """Тест: первая страница содержит не больше PAGE_SIZE книг и кнопку «Вперёд»"""
+        add_books(mock_db_connection, PAGE_SIZE * 2 + 1)
+
+        await list_books(mock_update, mock_context)
+
+        text = mock_update.message.reply_text.call_args[0][0]
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+        assert len(text.splitlines()) == PAGE_SIZE + 1
+        assert list(buttons(markup)) == ["Вперёд ▶️"]
+
+    @pytest.mark.asyncio
+    async def test_buttons_edit_same_message(self, mock_update, mock_context, mock_db_connection):
+        """Тест: кнопки правят то же сообщение, «Назад» возвращает предыдущую страницу"""
+        add_books(mock_db_connection, PAGE_SIZE * 2 + 1)
+        await list_books(mock_update, mock_context)
+        first_text = mock_update.message.reply_text.call_args[0][0]
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+
+        query = press(mock_update, buttons(markup)["Вперёд ▶️"])
+        await page_callback(mock_update, mock_context)
+
+        query.answer.assert_called_once()
+        second_text = query.edit_message_text.call_args[0][0]
+        markup = query.edit_message_text.call_args[1]['reply_markup']
+        assert second_text != first_text
+        assert list(buttons(markup)) == ["◀️ Назад", "Вперёд ▶️"]
+
+        query = press(mock_update, buttons(markup)["◀️ Назад"])
+        await page_callback(mock_update, mock_context)
+
+        assert query.edit_message_text.call_args[0][0] == first_text
+        mock_update.message.reply_text.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_my_books_pages_only_own_books(self, mock_update, mock_context, mock_db_connection, walk_pages):
+        """Тест: страницы «Мои книги» содержат только книги пользователя"""
+        add_books(mock_db_connection, PAGE_SIZE * 4, user_id=12345)
+        mock_update.effective_user.id = 12345
+
+        await my_books(mock_update, mock_context)
+        pages = await walk_pages()
+
+        titles = [line for page in pages for line in page.splitlines() if "Книга" in line]
+        assert len(pages) == 2
+        assert len(titles) == PAGE_SIZE * 2
+        assert "Книга 1 " not in "\n".join(pages)
+
+    @pytest.mark.asyncio
+    async def test_callback_from_stranger_rejected(self, mock_update, mock_context, mock_db_connection, monkeypatch):
+        """Тест: нажатие кнопки чужим пользователем отклоняется"""
+        monkeypatch.setattr(main, "ALLOWED_IDS", {1})
+        query = press(mock_update, PAGED_LISTS["books"][0].callback_data(NEXT, 1))
+
+        await page_callback(mock_update, mock_context)
+
+        query.answer.assert_called_once()
+        assert query.answer.call_args[1]['show_alert'] is True
+        query.edit_message_text.assert_not_called()
+
+    def test_callback_data_fits_telegram_limit(self):
+        """Тест: callback_data укладывается в 64 байта и разбирается обратно"""
+        data = PAGED_LISTS["series"][0].callback_data(PREV, 2 ** 63 - 1)
+
+        assert len(data.encode()) <= 64
+        assert parse_callback_data(data) == ("series", PREV, 2 ** 63 - 1)
@@ -19,7 +19,7 @@ class TestPerformanceWithLargeData:
     """Тесты производительности с большими объемами данных"""
     
     @pytest.mark.asyncio
-    async def test_list_books_performance(self, mock_update, mock_context, mock_db_connection):
+    async def test_list_books_performance(self, mock_update, mock_context, mock_db_connection, walk_pages):
         """Тест: производительность отображения большого списка книг"""
         # Arrange - Добавляем много книг
         cursor = mock_db_connection.cursor()
@@ -37,10 +37,11 @@ class TestPerformanceWithLargeData:
         execution_time = end_time - start_time
         assert execution_time < 1.0  # Должно выполняться менее чем за 1 секунду
         
-        # Проверяем, что все книги отображаются
-        response_text = mock_update.message.reply_text.call_args[0][0]
-        assert "Книга 0" in response_text
-        assert "Книга 99" in response_text
+        # Проверяем, что все книги доступны по страницам
+        pages = await walk_pages()
+        assert "Книга 0" in pages[0]
+        assert "Книга 99" in pages[-1]
+        assert all(len(page) <= 4096 for page in pages)
     
     @pytest.mark.asyncio
     async def test_search_performance(self, mock_update, mock_context, mock_db_connection):
@@ -97,7 +98,7 @@ class TestPerformanceWithLargeData:
             assert "прочитано" in response_text
     
     @pytest.mark.asyncio
-    async def test_series_performance(self, mock_update, mock_context, mock_db_connection):
+    async def test_series_performance(self, mock_update, mock_context, mock_db_connection, walk_pages):
         """Тест: производительность отображения серий с большим количеством книг"""
         # Arrange - Добавляем много серий и книг
         cursor = mock_db_connection.cursor()
@@ -117,10 +118,10 @@ class TestPerformanceWithLargeData:
         execution_time = end_time - start_time
         assert execution_time < 1.0  # Должно выполняться менее чем за 1 секунду
         
-        # Проверяем, что серии отображаются
-        response_text = mock_update.message.reply_text.call_args[0][0]
-        assert "Серия 0" in response_text
-        assert "Серия 49" in response_text
+        # Проверяем, что серии отображаются по страницам
+        pages = await walk_pages()
+        assert "Серия 0" in pages[0]
+        assert "Серия 49" in pages[-1]
     
     @pytest.mark.asyncio
     async def test_statistics_performance(self, mock_update, mock_context, mock_db_connection):
@@ -169,7 +170,7 @@ class TestPerformanceWithLargeData:
         assert "100" in response_text   # Количество авторов
     
     @pytest.mark.asyncio
-    async def test_export_performance(self, mock_update, mock_context, mock_db_connection):
+    async def test_export_performance(self, mock_update, mock_context, mock_db_connection, cover_store, jobs):
         """Тест: производительность экспорта большого объема данных"""
         # Arrange - Добавляем много данных
         cursor = mock_db_connection.cursor()
@@ -185,9 +186,9 @@ class TestPerformanceWithLargeData:
         # Добавляем книги с обложками
         for i in range(500):
             series_id = (i % 10) + 1
-            image_blob = f"image_data_{i}".encode()
-            cursor.execute("INSERT INTO books (title, description, image_blob, series_id, series_order, isbn) VALUES (?, ?, ?, ?, ?, ?)", 
-                          (f"Книга {i}", f"Описание {i}", image_blob, series_id, (i % 10) + 1, f"9783161484{i:03d}"))
+            cover_sha256 = cover_store.put(f"image_data_{i}".encode())
+            cursor.execute("INSERT INTO books (title, description, cover_sha256, series_id, series_order, isbn) VALUES (?, ?, ?, ?, ?, ?)", 
+                          (f"Книга {i}", f"Описание {i}", cover_sha256, series_id, (i % 10) + 1, f"9783161484{i:03d}"))
             
             # Добавляем связи с авторами
             author_id = (i % 50) + 1
@@ -203,6 +204,7 @@ class TestPerformanceWithLargeData:
         # Act
         start_time = time.time()
         await export_library(mock_update, mock_context)
+        await jobs.join()
         end_time = time.time()
         
         # Assert
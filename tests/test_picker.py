@@ -0,0 +1,161 @@
+"""
+Тесты выбора книги кнопками и по названию
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from telegram.ext import ConversationHandler
+import main
+from main import (
+    delete_book_start, delete_book_select, delete_book_chosen, status_start, status_book_chosen,
+    book_picker_handler, DELETE_CONFIRM, DELETE_SELECT_BOOK, STATUS_SELECT_STATUS
+)
+from booktracker.picker import BookPicker, CURSOR_KEY
+
+
+@pytest.fixture
+def small_pages(monkeypatch):
+    monkeypatch.setattr(main, "book_picker", BookPicker(page_size=3))
+
+
+def add_books(conn, count):
+    ids = [conn.execute("INSERT INTO books (title) VALUES (?)", (f"Книга {i:02d}",)).lastrowid for i in range(count)]
+    conn.commit()
+    return ids
+
+
+def button_texts(markup):
+    return [button.text for row in markup.inline_keyboard for button in row]
+
+
+def find_button(markup, text):
+    return next(b for row in markup.inline_keyboard for b in row if b.text.startswith(text))
+
+
+async def press(handler, mock_update, mock_context, button):
+    """Нажимает inline-кнопку; возвращает (состояние, query)"""
+    query = MagicMock()
+    query.data = button.callback_data
+    query.answer = AsyncMock()
+    query.edit_message_reply_markup = AsyncMock()
+    query.edit_message_text = AsyncMock()
+    query.message = mock_update.message
+    mock_update.callback_query = query
+    return await handler.callback(mock_update, mock_context), query
+
+
+class TestBookPicker:
+    """Тесты постраничного выбора книги"""
+
+    @pytest.mark.asyncio
+    async def test_first_page_and_state(self, small_pages, mock_update, mock_context, mock_db_connection):
+        """Тест: показывается одна страница, в состоянии — только курсор"""
+        add_books(mock_db_connection, 7)
+
+        assert await delete_book_start(mock_update, mock_context) == DELETE_SELECT_BOOK
+
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+        assert button_texts(markup) == ["1. Книга 00", "2. Книга 01", "3. Книга 02", "Вперёд ▶️", "🔙 Отмена"]
+        assert set(mock_context.user_data) == {CURSOR_KEY}
+
+    @pytest.mark.asyncio
+    async def test_button_passes_book_id(self, small_pages, mock_update, mock_context, mock_db_connection):
+        """Тест: после листания нажатие на книгу сразу передаёт её id следующему шагу"""
+        ids = add_books(mock_db_connection, 7)
+        handler = book_picker_handler(delete_book_chosen)
+        await delete_book_start(mock_update, mock_context)
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+
+        state, query = await press(handler, mock_update, mock_context, find_button(markup, "Вперёд"))
+        assert state is None
+        markup = query.edit_message_reply_markup.call_args[0][0]
+        assert button_texts(markup)[:4] == ["1. Книга 03", "2. Книга 04", "3. Книга 05", "◀️ Назад"]
+
+        state, _ = await press(handler, mock_update, mock_context, find_button(markup, "2."))
+
+        assert state == DELETE_CONFIRM
+        assert mock_context.user_data['book_to_delete'] == ids[4]
+        assert "Книга 04" in mock_update.message.reply_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_typed_number_uses_current_page(self, small_pages, mock_update, mock_context, mock_db_connection):
+        """Тест: введённый номер относится к открытой странице"""
+        ids = add_books(mock_db_connection, 7)
+        handler = book_picker_handler(delete_book_chosen)
+        await delete_book_start(mock_update, mock_context)
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+        await press(handler, mock_update, mock_context, find_button(markup, "Вперёд"))
+
+        mock_update.message.text = "3"
+        assert await delete_book_select(mock_update, mock_context) == DELETE_CONFIRM
+        assert mock_context.user_data['book_to_delete'] == ids[5]
+
+    @pytest.mark.asyncio
+    async def test_status_flow_by_id(self, mock_update, mock_context, mock_db_connection):
+        """Тест: выбор книги для статуса сохраняет id и название"""
+        (book_id,) = add_books(mock_db_connection, 1)
+        handler = book_picker_handler(status_book_chosen)
+        await status_start(mock_update, mock_context)
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+
+        state, query = await press(handler, mock_update, mock_context, find_button(markup, "1."))
+
+        assert state == STATUS_SELECT_STATUS
+        assert (mock_context.user_data['selected_book_id'], mock_context.user_data['selected_book']) == \
+            (book_id, "Книга 00")
+        query.edit_message_reply_markup.assert_awaited_once_with(None)
+
+    @pytest.mark.asyncio
+    async def test_cancel_button(self, mock_update, mock_context, mock_db_connection):
+        """Тест: кнопка отмены завершает диалог"""
+        add_books(mock_db_connection, 1)
+        handler = book_picker_handler(delete_book_chosen)
+        await delete_book_start(mock_update, mock_context)
+        markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+
+        state, query = await press(handler, mock_update, mock_context, find_button(markup, "🔙"))
+
+        assert state == ConversationHandler.END
+        assert 'book_to_delete' not in mock_context.user_data
+        query.edit_message_text.assert_awaited_once()
+
+
+class TestTypedTitle:
+    """Тесты выбора книги по введённому названию"""
+
+    @pytest.mark.asyncio
+    async def test_single_match_goes_through(self, mock_update, mock_context, mock_db_connection):
+        """Тест: точное название и уникальный фрагмент выбирают книгу сразу"""
+        ids = {title: mock_db_connection.execute("INSERT INTO books (title) VALUES (?)", (title,)).lastrowid
+               for title in ("Ёжик в тумане", "1984", "Война и мир")}
+        mock_db_connection.commit()
+
+        for text, title in (("ежик в тумане", "Ёжик в тумане"), ("1984", "1984"), ("войн", "Война и мир")):
+            mock_update.message.text = text
+            assert await delete_book_select(mock_update, mock_context) == DELETE_CONFIRM
+            assert mock_context.user_data['book_to_delete'] == ids[title]
+
+    @pytest.mark.asyncio
+    async def test_ambiguous_title_offers_short_choice(self, mock_update, mock_context, mock_db_connection):
+        """Тест: несколько совпадений — короткая клавиатура, а не вся библиотека"""
+        add_books(mock_db_connection, 30)
+        mock_update.message.text = "книга"
+
+        assert await delete_book_select(mock_update, mock_context) == DELETE_SELECT_BOOK
+
+        call = mock_update.message.reply_text.call_args
+        books = [text for text in button_texts(call[1]['reply_markup']) if text.startswith("Книга")]
+        assert len(books) == 5
+        assert "уточните" in call[0][0]
+        assert 'book_to_delete' not in mock_context.user_data
+        # Совпадения — не страница библиотеки: листание ушло бы к посторонним книгам
+        callbacks = [button.callback_data for row in call[1]['reply_markup'].inline_keyboard for button in row]
+        assert not [data for data in callbacks if data.startswith("pick:n:") or data.startswith("pick:p:")]
+
+    @pytest.mark.asyncio
+    async def test_unknown_title(self, mock_update, mock_context, mock_db_connection):
+        """Тест: ничего не найдено — просим уточнить"""
+        add_books(mock_db_connection, 3)
+        mock_update.message.text = "дракон"
+
+        assert await delete_book_select(mock_update, mock_context) == DELETE_SELECT_BOOK
+        assert "не найдена" in mock_update.message.reply_text.call_args[0][0]
@@ -0,0 +1,101 @@
+"""
+Тесты добавления книг одним сообщением
+"""
+import os
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from main import quick_add
+from booktracker.quickadd import parse_quick_add
+
+
+def book(conn, title):
+    return conn.execute("""
+        SELECT b.authors_display, s.name, b.series_order, b.isbn, b.description, b.cover_file_id FROM books b
+        LEFT JOIN series s ON s.id = b.series_id WHERE b.title = ?
+    """, (title,)).fetchone()
+
+
+class TestParseQuickAdd:
+    """Тесты разбора строк"""
+
+    def test_fields_in_any_order(self):
+        """Тест: ISBN, серия, описание и авторы распознаются по виду поля"""
+        books, errors = parse_quick_add(
+            "Дюна | 978-5-17-090001-6 | Хроники Дюны #1 | Фрэнк Герберт | описание: Пустыня\n"
+            "\n"
+            "1984|Джордж Оруэлл\n"
+            " | Без названия\n"
+            "Книга | Автор | Другой автор")
+
+        assert books[0] == {'title': "Дюна", 'description': "Пустыня", 'isbn': "978-5-17-090001-6",
+                            'authors': ["Фрэнк Герберт"], 'series': "Хроники Дюны", 'series_order': 1}
+        assert (books[1]['title'], books[1]['authors'], books[1]['isbn']) == ("1984", ["Джордж Оруэлл"], None)
+        assert errors == [(4, "нет названия"), (5, "непонятное поле «Другой автор»")]
+
+
+class TestQuickAddCommand:
+    """Тесты команды /quickadd"""
+
+    @pytest.mark.asyncio
+    async def test_several_books_one_transaction(self, mock_update, mock_context, mock_db_connection):
+        """Тест: строки сообщения добавляются вместе, повтор и имеющаяся книга — «уже есть»"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Старая книга')")
+        mock_db_connection.commit()
+        mock_update.message.text = ("/quickadd Пикник на обочине | Аркадий Стругацкий, Борис Стругацкий\n"
+                                    "Дюна | Фрэнк Герберт | Хроники Дюны #1\n"
+                                    "Мессия Дюны | Фрэнк Герберт | Хроники Дюны #2\n"
+                                    "старая книга\n"
+                                    "ДЮНА")
+
+        await quick_add(mock_update, mock_context)
+
+        text = mock_update.message.reply_text.call_args[0][0]
+        assert text.startswith("✅ Добавлено: 3\n• Пикник на обочине")
+        assert "Уже есть в базе:\n• старая книга\n• ДЮНА" in text
+        assert book(mock_db_connection, "Мессия Дюны")[:3] == ("Фрэнк Герберт", "Хроники Дюны", 2)
+        assert book(mock_db_connection, "Пикник на обочине")[0] == "Аркадий Стругацкий, Борис Стругацкий"
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM series").fetchone()[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_photo_caption_sets_cover(self, mock_update, mock_context, mock_db_connection, cover_store):
+        """Тест: фото с подписью /quickadd становится обложкой книги"""
+        photo = MagicMock(file_id="photo-file-id")
+        photo.get_file = AsyncMock(return_value=MagicMock(download_as_bytearray=AsyncMock(
+            return_value=bytearray(b"jpeg"))))
+        mock_update.message.photo = [photo]
+        mock_update.message.caption = "/quickadd Солярис | Станислав Лем | 9785170901234"
+
+        await quick_add(mock_update, mock_context)
+
+        authors, _, _, isbn, _, file_id = book(mock_db_connection, "Солярис")
+        assert (authors, isbn, file_id) == ("Станислав Лем", "9785170901234", "photo-file-id")
+        sha = mock_db_connection.execute("SELECT cover_sha256 FROM books WHERE title = 'Солярис'").fetchone()[0]
+        assert cover_store.get(sha) == b"jpeg"
+
+    @pytest.mark.asyncio
+    async def test_duplicate_leaves_no_series_or_cover(self, mock_update, mock_context, mock_db_connection,
+                                                       cover_store):
+        """Тест: дубликат с новой серией и фото не создаёт серию и не сохраняет обложку"""
+        mock_db_connection.execute("INSERT INTO books (title) VALUES ('Солярис')")
+        mock_db_connection.commit()
+        photo = MagicMock(file_id="photo-file-id")
+        photo.get_file = AsyncMock(return_value=MagicMock(download_as_bytearray=AsyncMock(
+            return_value=bytearray(b"jpeg"))))
+        mock_update.message.photo = [photo]
+        mock_update.message.caption = "/quickadd солярис | Станислав Лем | Новая серия #1"
+
+        await quick_add(mock_update, mock_context)
+
+        assert "Уже есть в базе:\n• солярис" in mock_update.message.reply_text.call_args[0][0]
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM series").fetchone()[0] == 0
+        assert not os.path.exists(cover_store.root) or not any(files for _, _, files in os.walk(cover_store.root))
+        photo.get_file.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_usage_without_books(self, mock_update, mock_context, mock_db_connection):
+        """Тест: пустая команда — подсказка формата"""
+        mock_update.message.text = "/quickadd"
+
+        await quick_add(mock_update, mock_context)
+
+        assert mock_update.message.reply_text.call_args[0][0].startswith("Формат: /quickadd")
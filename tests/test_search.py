@@ -0,0 +1,155 @@
+"""
+Тесты полнотекстового поиска
+"""
+import sqlite3
+import pytest
+from main import search_process
+from booktracker.migrations import migrate
+from booktracker.search import HIGHLIGHT_START, HIGHLIGHT_END, find_books, fts_query
+
+
+def add_book(conn, title, description=None, authors=(), series=None):
+    series_id = None
+    if series:
+        conn.execute("INSERT OR IGNORE INTO series (name) VALUES (?)", (series,))
+        series_id = conn.execute("SELECT id FROM series WHERE name = ?", (series,)).fetchone()[0]
+    book_id = conn.execute("INSERT INTO books (title, description, series_id) VALUES (?, ?, ?)",
+                           (title, description, series_id)).lastrowid
+    for name in authors:
+        conn.execute("INSERT OR IGNORE INTO authors (name) VALUES (?)", (name,))
+        author_id = conn.execute("SELECT id FROM authors WHERE name = ?", (name,)).fetchone()[0]
+        conn.execute("INSERT INTO book_authors (book_id, author_id) VALUES (?, ?)", (book_id, author_id))
+    conn.commit()
+    return book_id
+
+
+def titles(conn, query):
+    return [row[0] for row in find_books(conn, query)]
+
+
+class TestSearchIndex:
+    """Тесты синхронизации books_fts триггерами"""
+
+    def test_all_fields_indexed(self, mock_db_connection):
+        """Тест: поиск по названию, автору, серии и описанию"""
+        add_book(mock_db_connection, "Хоббит", "Путешествие туда и обратно", ["Толкин"], "Средиземье")
+
+        for query in ("хоббит", "Толкин", "средиземье", "путешествие"):
+            assert titles(mock_db_connection, query) == ["Хоббит"]
+
+    def test_updates_reach_index(self, mock_db_connection):
+        """Тест: изменения книги, автора и серии сразу видны в поиске"""
+        book_id = add_book(mock_db_connection, "Черновик", authors=["Аноним"], series="Цикл")
+
+        mock_db_connection.execute("UPDATE books SET title = 'Чистовик' WHERE id = ?", (book_id,))
+        mock_db_connection.execute("UPDATE authors SET name = 'Известный' WHERE name = 'Аноним'")
+        mock_db_connection.execute("UPDATE series SET name = 'Сага' WHERE name = 'Цикл'")
+        mock_db_connection.commit()
+
+        assert titles(mock_db_connection, "черновик") == []
+        assert titles(mock_db_connection, "аноним") == []
+        assert titles(mock_db_connection, "Чистовик Известный Сага") == ["Чистовик"]
+
+        mock_db_connection.execute("DELETE FROM book_authors WHERE book_id = ?", (book_id,))
+        mock_db_connection.execute("DELETE FROM books WHERE id = ?", (book_id,))
+        mock_db_connection.commit()
+        assert mock_db_connection.execute("SELECT COUNT(*) FROM books_fts").fetchone()[0] == 0
+
+    def test_existing_books_indexed_by_migration(self, tmp_path):
+        """Тест: миграция заполняет индекс уже существующими книгами"""
+        conn = sqlite3.connect(tmp_path / "old.db")
+        conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT UNIQUE, "
+                     "description TEXT, image_blob BLOB, series_id INTEGER, series_order INTEGER, isbn TEXT)")
+        conn.execute("INSERT INTO books (title) VALUES ('Старая книга')")
+        conn.commit()
+
+        migrate(conn)
+
+        assert titles(conn, "старая") == ["Старая книга"]
+        conn.close()
+
+
+class TestSearchQuery:
+    """Тесты разбора запроса и ранжирования"""
+
+    def test_special_characters_escaped(self, mock_db_connection):
+        """Тест: кавычки и операторы FTS5 в запросе не ломают поиск"""
+        add_book(mock_db_connection, "Война и мир")
+
+        assert fts_query('война" OR -мир*') == '"война"* "OR"* "мир"*'
+        assert titles(mock_db_connection, '"Война') == ["Война и мир"]
+        assert titles(mock_db_connection, "***") == []
+
+    def test_yo_matches_ye(self, mock_db_connection):
+        """Тест: «ё» и «е» в запросе и тексте взаимозаменяемы, название выводится как есть"""
+        add_book(mock_db_connection, "Ёжик в тумане", authors=["Сергей Козлов"])
+        add_book(mock_db_connection, "Зеленая миля")
+
+        assert titles(mock_db_connection, "ежик") == ["Ёжик в тумане"]
+        assert titles(mock_db_connection, "ЗЕЛЁНАЯ") == ["Зеленая миля"]
+        assert find_books(mock_db_connection, "ёжик")[0][1] == "Сергей Козлов"
+
+    def test_title_ranked_above_description(self, mock_db_connection):
+        """Тест: совпадение в названии выше совпадения в описании"""
+        add_book(mock_db_connection, "Сборник рассказов", "Среди прочих — рассказ про дракона")
+        add_book(mock_db_connection, "Дракон")
+
+        assert titles(mock_db_connection, "дракон") == ["Дракон", "Сборник рассказов"]
+
+    def test_snippet_highlights_match(self, mock_db_connection):
+        """Тест: фрагмент описания с подсвеченным словом"""
+        add_book(mock_db_connection, "Сборник", "Рассказ про дракона и рыцаря")
+
+        (_, _, snippet), = find_books(mock_db_connection, "дракон")
+
+        assert f"{HIGHLIGHT_START}дракона{HIGHLIGHT_END}" in snippet
+
+    def test_like_fallback_without_fts(self, mock_db_connection):
+        """Тест: без books_fts поиск работает через LIKE"""
+        add_book(mock_db_connection, "Война и мир", authors=["Лев Толстой", "Соавтор"])
+        conn = sqlite3.connect(":memory:")
+        for table in ("books", "authors", "book_authors"):
+            sql = mock_db_connection.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+            conn.execute(sql)
+            rows = mock_db_connection.execute(f"SELECT * FROM {table}").fetchall()
+            if rows:
+                conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+
+        assert find_books(conn, "Толстой") == [("Война и мир", "Лев Толстой, Соавтор", None)]
+        conn.close()
+
+
+class TestSearchHandler:
+    """Тесты вывода результатов поиска"""
+
+    @pytest.mark.asyncio
+    async def test_description_match_shown_with_snippet(self, mock_update, mock_context, mock_db_connection):
+        """Тест: совпадение в описании показывается фрагментом с выделением"""
+        add_book(mock_db_connection, "Сборник <избранное>", "Рассказ про дракона", ["Автор & Ко"])
+        mock_update.message.text = "дракон"
+
+        await search_process(mock_update, mock_context)
+
+        text = mock_update.message.reply_text.call_args[0][0]
+        assert mock_update.message.reply_text.call_args[1]['parse_mode'] == 'HTML'
+        assert "Сборник &lt;избранное&gt; (Автор &amp; Ко)" in text
+        assert "<b>дракона</b>" in text
+
+    @pytest.mark.asyncio
+    async def test_long_results_fit_message(self, mock_update, mock_context, mock_db_connection):
+        """Тест: 50 длинных совпадений — ответ не длиннее сообщения, книги не обрезаны, есть пометка"""
+        for i in range(50):
+            add_book(mock_db_connection, f"Дракон {i} " + "очень длинное название " * 4,
+                     "дракон " + "описание с подробностями " * 10, [f"Автор с длинным именем {i}"])
+        mock_update.message.text = "дракон"
+
+        await search_process(mock_update, mock_context)
+
+        text = mock_update.message.reply_text.call_args[0][0]
+        shown = text.count("📚")
+        assert len(text) <= 4096
+        assert 0 < shown < 50
+        assert text.endswith(f"Показаны первые {shown} совпадений — уточните запрос.")
+        assert text.count("<i>") == text.count("</i>") == shown
+        assert text.count("<b>") == text.count("</b>")
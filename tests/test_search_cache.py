@@ -0,0 +1,123 @@
+"""
+Тесты кэша результатов поиска
+"""
+import pytest
+import main
+from main import search_process, finalize_book, delete_book_confirm
+from booktracker.aiodb import AsyncDatabase
+from booktracker.cache import GenerationCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGenerationCache:
+    """Тесты LRU-кэша с TTL и поколениями"""
+
+    def test_hit_and_miss_counters(self):
+        """Тест: повторный запрос — попадание"""
+        cache = GenerationCache()
+
+        assert cache.get("война", 0) == (False, None)
+        cache.put("война", ["Война и мир"], 0)
+
+        assert cache.get("война", 0) == (True, ["Война и мир"])
+        assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    def test_lru_eviction(self):
+        """Тест: при переполнении вытесняется давно не использованная запись"""
+        cache = GenerationCache(max_entries=2)
+        cache.put("a", 1, 0)
+        cache.put("b", 2, 0)
+        cache.get("a", 0)
+        cache.put("c", 3, 0)
+
+        assert cache.get("b", 0) == (False, None)
+        assert cache.get("a", 0) == (True, 1)
+        assert cache.get("c", 0) == (True, 3)
+
+    def test_ttl_expiry(self):
+        """Тест: запись старше ttl не возвращается"""
+        clock = FakeClock()
+        cache = GenerationCache(ttl=10, clock=clock)
+        cache.get("a", 0)
+        cache.put("a", 1, 0)
+
+        clock.now = 9.9
+        assert cache.get("a", 0) == (True, 1)
+        clock.now = 10.0
+        assert cache.get("a", 0) == (False, None)
+
+    def test_generation_change_clears_cache(self):
+        """Тест: смена поколения сбрасывает кэш, устаревший результат не сохраняется"""
+        cache = GenerationCache()
+        cache.get("a", 1)
+        cache.put("a", 1, 1)
+
+        assert cache.get("a", 2) == (False, None)
+        cache.put("a", "устарело", 1)
+        assert cache.get("a", 2) == (False, None)
+
+
+@pytest.fixture
+async def pooled(test_db_path, db_connection, mock_context, monkeypatch):
+    """Обработчики работают через пул и писателя, а не через context.conn"""
+    db = AsyncDatabase(test_db_path, max_workers=2)
+    monkeypatch.setattr(main, "database", db)
+    monkeypatch.setattr(main, "search_cache", GenerationCache())
+    mock_context.conn = None
+    mock_context.cursor = None
+    yield db
+    await db.close()
+
+
+def new_book(title):
+    return {'title': title, 'description': None, 'image_blob': None, 'isbn': None,
+            'authors': [], 'series_id': None, 'series_order': None}
+
+
+async def search(mock_update, mock_context, text):
+    mock_update.message.reply_text.reset_mock()
+    mock_update.message.text = text
+    await search_process(mock_update, mock_context)
+    return mock_update.message.reply_text.call_args[0][0]
+
+
+class TestCachedSearch:
+    """Тесты кэширования в обработчиках поиска"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_served_from_cache(self, pooled, mock_update, mock_context):
+        """Тест: запрос, отличающийся регистром и «ё», берётся из кэша"""
+        mock_context.user_data['new_book'] = new_book("Ёжик в тумане")
+        await finalize_book(mock_update, mock_context)
+
+        first = await search(mock_update, mock_context, "ёжик")
+        second = await search(mock_update, mock_context, "ЕЖИК")
+
+        assert "Ёжик в тумане" in first and "Ёжик в тумане" in second
+        assert (main.search_cache.hits, main.search_cache.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_results(self, pooled, mock_update, mock_context, db_connection):
+        """Тест: после добавления и удаления книги поиск не возвращает устаревший результат"""
+        mock_context.user_data['new_book'] = new_book("Дракон")
+        await finalize_book(mock_update, mock_context)
+        assert "Дракон" in await search(mock_update, mock_context, "дракон")
+
+        mock_context.user_data['new_book'] = new_book("Дракон 2")
+        await finalize_book(mock_update, mock_context)
+        assert "Дракон 2" in await search(mock_update, mock_context, "дракон")
+
+        book_id = db_connection.execute("SELECT id FROM books WHERE title = 'Дракон 2'").fetchone()[0]
+        mock_context.user_data['book_to_delete'] = book_id
+        mock_update.message.text = "✅ Да, удалить"
+        await delete_book_confirm(mock_update, mock_context)
+
+        assert "Дракон 2" not in await search(mock_update, mock_context, "дракон")
+        assert main.search_cache.hits == 0
@@ -0,0 +1,113 @@
+"""
+Тесты просмотра серий
+"""
+import pytest
+from main import list_series
+from booktracker.pagination import PREV
+from booktracker.series import SeriesBrowser, load_series
+
+
+def add_series(conn, name, titles):
+    series_id = conn.execute("INSERT INTO series (name) VALUES (?)", (name,)).lastrowid
+    ids = [conn.execute("INSERT INTO books (title, series_id, series_order) VALUES (?, ?, ?)",
+                        (title, series_id, order)).lastrowid
+           for order, title in enumerate(titles, 1)]
+    conn.commit()
+    return series_id, ids
+
+
+def set_status(conn, book_id, status, user_id=12345):
+    conn.execute("INSERT INTO user_books (user_id, book_id, status) VALUES (?, ?, ?)", (user_id, book_id, status))
+    conn.commit()
+
+
+class TestSeriesBrowser:
+    """Тесты страницы серий"""
+
+    def test_page_in_one_query(self, mock_db_connection):
+        """Тест: серии страницы, их книги и прогресс читаются одним запросом"""
+        for i in range(6):
+            add_series(mock_db_connection, f"Серия {i}", [f"Книга {i}-{j}" for j in range(3)])
+        statements = []
+        mock_db_connection.set_trace_callback(statements.append)
+
+        page = SeriesBrowser(page_size=4).fetch_page(mock_db_connection, (12345,))
+
+        mock_db_connection.set_trace_callback(None)
+        assert len(statements) == 1
+        assert [entry.name for entry in page.rows] == ["Серия 0", "Серия 1", "Серия 2", "Серия 3"]
+        assert (page.has_prev, page.has_next) == (False, True)
+        assert [title for _, title, _ in page.rows[0].books] == ["Книга 0-0", "Книга 0-1", "Книга 0-2"]
+
+    def test_paging_back(self, mock_db_connection):
+        """Тест: страница назад возвращает предыдущие серии в прямом порядке"""
+        ids = [add_series(mock_db_connection, f"Серия {i}", [f"Книга {i}"])[0] for i in range(5)]
+        browser = SeriesBrowser(page_size=2)
+
+        page = browser.fetch_page(mock_db_connection, (12345,), ids[3], PREV)
+
+        assert [entry.name for entry in page.rows] == ["Серия 1", "Серия 2"]
+        assert (page.has_prev, page.has_next) == (True, True)
+
+    def test_progress_is_per_user(self, mock_db_connection):
+        """Тест: прочитано считается по статусам вызывающего пользователя"""
+        series_id, ids = add_series(mock_db_connection, "Трилогия", ["Том 1", "Том 2", "Том 3"])
+        add_series(mock_db_connection, "Пустая", [])
+        set_status(mock_db_connection, ids[0], "finished")
+        set_status(mock_db_connection, ids[1], "reading")
+        set_status(mock_db_connection, ids[2], "finished", user_id=999)
+
+        empty, trilogy = SeriesBrowser().fetch_page(mock_db_connection, (12345,)).rows
+
+        assert (trilogy.finished, trilogy.total) == (1, 3)
+        assert [status for _, _, status in trilogy.books] == ["finished", "reading", None]
+        assert (empty.finished, empty.total, empty.books) == (0, 0, [])
+        assert load_series(mock_db_connection, series_id, 999)[1:3] == (1, 3)
+
+    def test_detail_uses_series_index(self, mock_db_connection):
+        """Тест: книги одной серии читаются по индексу (series_id, series_order) без сортировки"""
+        plan = " ".join(row[-1] for row in mock_db_connection.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT b.series_order, b.title, ub.status FROM books b
+            LEFT JOIN user_books ub ON ub.user_id = ? AND ub.book_id = b.id
+            WHERE b.series_id = ? ORDER BY b.series_order
+        """, (1, 1)))
+
+        assert "idx_books_series" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestSeriesHandler:
+    """Тесты команды /series"""
+
+    @pytest.mark.asyncio
+    async def test_list_shows_progress(self, mock_update, mock_context, mock_db_connection):
+        """Тест: в списке серий виден прогресс и статусы книг"""
+        _, ids = add_series(mock_db_connection, "Хроники", ["Начало", "Продолжение"])
+        set_status(mock_db_connection, ids[0], "finished")
+
+        await list_series(mock_update, mock_context)
+
+        text = mock_update.message.reply_text.call_args[0][0]
+        assert "📚 Хроники — прочитано 1 из 2:" in text
+        assert "1. Начало ✅" in text
+
+    @pytest.mark.asyncio
+    async def test_series_by_name(self, mock_update, mock_context, mock_db_connection):
+        """Тест: /series <название> показывает одну серию, неоднозначное название просит уточнить"""
+        add_series(mock_db_connection, "Гарри Поттер", ["Философский камень", "Тайная комната"])
+        add_series(mock_db_connection, "Гарри Гаррисон", ["Стальная крыса"])
+
+        mock_context.args = ["гарри", "поттер"]
+        await list_series(mock_update, mock_context)
+        text = mock_update.message.reply_text.call_args[0][0]
+        assert text.startswith("📚 Гарри Поттер — прочитано 0 из 2")
+        assert "Стальная крыса" not in text
+
+        mock_context.args = ["Гарри"]
+        await list_series(mock_update, mock_context)
+        assert "уточните" in mock_update.message.reply_text.call_args[0][0]
+
+        mock_context.args = ["Дюна"]
+        await list_series(mock_update, mock_context)
+        assert "не найдена" in mock_update.message.reply_text.call_args[0][0]
@@ -0,0 +1,172 @@
+"""
+Тесты «Моих книг» с фильтром по статусу и сортировкой
+"""
+import sqlite3
+import pytest
+from main import my_books, _insert_book
+from booktracker.migrations import MIGRATIONS, migrate
+from booktracker.pagination import NEXT, PREV
+from booktracker.shelf import parse_shelf_args, shelf_views
+
+
+def add_book(conn, title, authors=(), series=None, order=None):
+    series_id = None
+    if series is not None:
+        row = conn.execute("SELECT id FROM series WHERE name = ?", (series,)).fetchone()
+        series_id = row[0] if row else conn.execute("INSERT INTO series (name) VALUES (?)", (series,)).lastrowid
+    return _insert_book(conn.cursor(), {'title': title, 'description': None, 'image_blob': None, 'isbn': None,
+                                        'authors': list(authors), 'series_id': series_id, 'series_order': order})
+
+
+def set_status(conn, book_id, status, user_id=12345):
+    conn.execute("""
+        INSERT INTO user_books (user_id, book_id, status) VALUES (?, ?, ?)
+        ON CONFLICT (user_id, book_id) DO UPDATE SET status = excluded.status
+    """, (user_id, book_id, status))
+    conn.commit()
+
+
+def titles(conn, status, sort, anchor_id=None, direction=NEXT, user_id=12345, page_size=20):
+    view = next(view for *key, view in shelf_views(page_size) if key == [status, sort])
+    params = (user_id,) if status is None else (user_id, status)
+    page = view.fetch_page(conn, params, anchor_id, direction)
+    return [row[0] for row in page.rows], page
+
+
+class TestShelfViews:
+    """Тесты выборок по статусу и ключам сортировки"""
+
+    def test_filter_and_sorts(self, mock_db_connection):
+        """Тест: фильтр по статусу и сортировки; книги без автора и серии — в конце"""
+        conn = mock_db_connection
+        books = {
+            "Дюна": add_book(conn, "Дюна", ["Фрэнк Герберт"], "Хроники Дюны", 1),
+            "Мессия Дюны": add_book(conn, "Мессия Дюны", ["Фрэнк Герберт"], "Хроники Дюны", 2),
+            "Азазель": add_book(conn, "Азазель", ["Борис Акунин"], "Фандорин", 1),
+            "Без автора": add_book(conn, "Без автора"),
+        }
+        for title, book_id in books.items():
+            set_status(conn, book_id, "reading")
+        set_status(conn, books["Дюна"], "finished")
+        set_status(conn, books["Азазель"], "finished", user_id=999)
+
+        assert titles(conn, "reading", "title")[0] == ["Азазель", "Без автора", "Мессия Дюны"]
+        assert titles(conn, None, "author")[0] == ["Азазель", "Дюна", "Мессия Дюны", "Без автора"]
+        assert titles(conn, None, "series")[0] == ["Азазель", "Дюна", "Мессия Дюны", "Без автора"]
+        assert titles(conn, "finished", "title")[0] == ["Дюна"]
+        assert titles(conn, "finished", "title", user_id=999)[0] == ["Азазель"]
+
+    def test_keys_follow_book_changes(self, mock_db_connection):
+        """Тест: правка названия, авторов и серии сразу меняет порядок в списке"""
+        conn = mock_db_connection
+        first = add_book(conn, "Альфа", ["Яков"], "Серия Я", 1)
+        second = add_book(conn, "Бета", ["Борис"], "Серия Б", 1)
+        set_status(conn, first, "reading")
+        set_status(conn, second, "reading")
+
+        conn.execute("UPDATE books SET title = 'Вега' WHERE id = ?", (first,))
+        conn.execute("UPDATE authors SET name = 'Анна' WHERE name = 'Яков'")
+        conn.execute("UPDATE series SET name = 'Серия А' WHERE name = 'Серия Я'")
+        conn.commit()
+
+        assert titles(conn, None, "title")[0] == ["Бета", "Вега"]
+        assert titles(conn, None, "author")[0] == ["Вега", "Бета"]
+        assert titles(conn, None, "series")[0] == ["Вега", "Бета"]
+
+    def test_recent_pages_newest_first(self, mock_db_connection):
+        """Тест: недавно изменённые — сверху, листание в обе стороны по убыванию"""
+        conn = mock_db_connection
+        ids = [add_book(conn, f"Книга {i}") for i in range(5)]
+        for i, book_id in enumerate(ids):
+            set_status(conn, book_id, "planning")
+            conn.execute("UPDATE user_books SET changed_at = ? WHERE book_id = ?", (f"2024-01-0{i + 1}", book_id))
+        conn.commit()
+        set_status(conn, ids[0], "reading")
+
+        first, page = titles(conn, None, "recent", page_size=2)
+        second, _ = titles(conn, None, "recent", page.rows[-1][-1], page_size=2)
+        back, back_page = titles(conn, None, "recent", ids[2], PREV, page_size=2)
+
+        assert first == ["Книга 0", "Книга 4"]
+        assert second == ["Книга 3", "Книга 2"]
+        assert back == ["Книга 4", "Книга 3"]
+        assert (back_page.has_prev, back_page.has_next) == (True, True)
+
+    def test_stale_anchor_restarts(self, mock_db_connection):
+        """Тест: книга-якорь сменила статус — фильтрованный список начинается сначала"""
+        conn = mock_db_connection
+        ids = [add_book(conn, f"Книга {i}") for i in range(3)]
+        for book_id in ids:
+            set_status(conn, book_id, "reading")
+        set_status(conn, ids[1], "finished")
+
+        assert titles(conn, "reading", "title", ids[1])[0] == ["Книга 0", "Книга 2"]
+
+    def test_backfilled_by_migration(self, tmp_path):
+        """Тест: миграция заполняет ключи у существующих строк user_books"""
+        conn = sqlite3.connect(tmp_path / "old.db")
+        for statement in MIGRATIONS[0][2]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO books (title) VALUES ('Книга 2'), ('Книга 10')")
+        conn.execute("INSERT INTO user_books (user_id, book_id, status) VALUES (1, 1, 'reading'), (1, 2, 'reading')")
+        conn.commit()
+
+        migrate(conn)
+
+        assert conn.execute("SELECT COUNT(*) FROM user_books WHERE changed_at IS NULL").fetchone()[0] == 0
+        assert [r[0] for r in conn.execute("""
+            SELECT b.title FROM user_books ub JOIN books b ON b.id = ub.book_id ORDER BY ub.title_sort
+        """)] == ["Книга 2", "Книга 10"]
+        conn.close()
+
+    def test_indexes(self, mock_db_connection):
+        """Тест: status только в индексах с фильтром; индекс (user_id, status) миграции 2 удалён"""
+        indexes = {name: [row[2] for row in mock_db_connection.execute(f"PRAGMA index_info({name})")]
+                   for name, in mock_db_connection.execute(
+                       "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'user_books' "
+                       "AND sql IS NOT NULL")}
+
+        assert "idx_user_books_user_status" not in indexes
+        assert [name for name, columns in indexes.items() if "status" in columns] == [
+            f"idx_user_books_status_{column}" for column in ("title_sort", "author_sort", "series_sort", "changed_at")]
+        assert indexes["idx_user_books_author_sort"] == ["user_id", "author_sort", "book_id"]
+
+
+class TestMyBooksCommand:
+    """Тесты аргументов /my"""
+
+    def test_parse_args(self):
+        """Тест: статус и сортировка в любом порядке, по-английски и по-русски"""
+        assert parse_shelf_args([]) == (None, "title")
+        assert parse_shelf_args(["Reading", "author"]) == ("reading", "author")
+        assert parse_shelf_args(["недавние", "прочитано"]) == ("finished", "recent")
+        with pytest.raises(ValueError):
+            parse_shelf_args(["скоро"])
+
+    @pytest.mark.asyncio
+    async def test_filtered_list(self, mock_update, mock_context, mock_db_connection):
+        """Тест: /my reading показывает только читаемые книги с подписью фильтра"""
+        set_status(mock_db_connection, add_book(mock_db_connection, "Читаемая", ["Автор"]), "reading")
+        set_status(mock_db_connection, add_book(mock_db_connection, "Прочитанная"), "finished")
+        mock_update.effective_user.id = 12345
+        mock_context.args = ["reading", "author"]
+
+        await my_books(mock_update, mock_context)
+
+        text = mock_update.message.reply_text.call_args[0][0]
+        assert text.startswith("📖 Ваши книги — Читаю (по автору):")
+        assert "📖 Читаемая — Автор" in text
+        assert "Прочитанная" not in text
+
+        mock_context.args = ["cancelled"]
+        await my_books(mock_update, mock_context)
+        assert "нет книг со статусом «Отменено»" in mock_update.message.reply_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_unknown_argument(self, mock_update, mock_context, mock_db_connection):
+        """Тест: неизвестное слово — подсказка по использованию"""
+        mock_context.args = ["скоро"]
+
+        await my_books(mock_update, mock_context)
+
+        assert "Использование: /my" in mock_update.message.reply_text.call_args[0][0]
@@ -46,7 +46,6 @@ class TestStatusManagement:
         mock_db_connection.commit()
         
         mock_update.message.text = "1"
-        mock_context.user_data['available_books'] = ["Война и мир"]
         
         # Act
         await status_select_book(mock_update, mock_context)
@@ -67,7 +66,6 @@ class TestStatusManagement:
         mock_db_connection.commit()
         
         mock_update.message.text = "999"
-        mock_context.user_data['available_books'] = ["Война и мир"]
         
         # Act
         await status_select_book(mock_update, mock_context)
@@ -87,6 +85,7 @@ class TestStatusManagement:
         
         mock_update.message.text = "📋 Запланировано"
         mock_context.user_data['selected_book'] = "Война и мир"
+        mock_context.user_data['selected_book_id'] = book_id
         mock_update.effective_user.id = 12345
         
         # Act
@@ -114,6 +113,7 @@ class TestStatusManagement:
         
         mock_update.message.text = "📖 Читаю"
         mock_context.user_data['selected_book'] = "Война и мир"
+        mock_context.user_data['selected_book_id'] = book_id
         mock_update.effective_user.id = 12345
         
         # Act
@@ -139,6 +139,7 @@ class TestStatusManagement:
         
         mock_update.message.text = "✅ Прочитано"
         mock_context.user_data['selected_book'] = "Война и мир"
+        mock_context.user_data['selected_book_id'] = book_id
         mock_update.effective_user.id = 12345
         
         # Act
@@ -164,6 +165,7 @@ class TestStatusManagement:
         
         mock_update.message.text = "❌ Отменено"
         mock_context.user_data['selected_book'] = "Война и мир"
+        mock_context.user_data['selected_book_id'] = book_id
         mock_update.effective_user.id = 12345
         
         # Act
@@ -184,10 +186,12 @@ class TestStatusManagement:
         # Arrange
         cursor = mock_db_connection.cursor()
         cursor.execute("INSERT INTO books (title, description) VALUES (?, ?)", ("Война и мир", "Описание"))
+        book_id = cursor.lastrowid
         mock_db_connection.commit()
         
         mock_update.message.text = "Неверный статус"
         mock_context.user_data['selected_book'] = "Война и мир"
+        mock_context.user_data['selected_book_id'] = book_id
         mock_update.effective_user.id = 12345
         
         # Act
@@ -209,6 +213,7 @@ class TestStatusManagement:
         
         mock_update.message.text = "📖 Читаю"
         mock_context.user_data['selected_book'] = "Война и мир"
+        mock_context.user_data['selected_book_id'] = book_id
         mock_update.effective_user.id = 12345
         
         # Act
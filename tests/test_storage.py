@@ -0,0 +1,66 @@
+"""
+Тесты профилей хранения SQLite
+"""
+import sqlite3
+import pytest
+from booktracker.aiodb import AsyncDatabase
+from booktracker.storage import apply_profile, checkpoint, read_settings
+
+
+@pytest.fixture
+def file_conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "storage.db")
+    yield conn
+    conn.close()
+
+
+class TestStorageProfiles:
+    """Тесты применения профилей"""
+
+    def test_tuned_profile(self, file_conn):
+        """Тест: профиль tuned включает WAL и остальные настройки"""
+        apply_profile(file_conn, "tuned")
+
+        settings = read_settings(file_conn)
+        assert settings["journal_mode"] == "wal"
+        assert settings["synchronous"] == 1  # NORMAL
+        assert settings["cache_size"] == -16384
+        assert settings["mmap_size"] == 64 * 1024 * 1024
+        assert settings["temp_store"] == 2  # MEMORY
+
+    def test_default_profile_keeps_sqlite_defaults(self, file_conn):
+        """Тест: профиль default ничего не меняет"""
+        apply_profile(file_conn, "default")
+
+        settings = read_settings(file_conn)
+        assert settings["journal_mode"] == "delete"
+        assert settings["synchronous"] == 2  # FULL
+
+    def test_unknown_profile(self, file_conn):
+        """Тест: неизвестный профиль — понятная ошибка"""
+        with pytest.raises(ValueError):
+            apply_profile(file_conn, "turbo")
+
+    def test_passive_checkpoint(self, file_conn):
+        """Тест: пассивная контрольная точка переносит WAL в базу"""
+        apply_profile(file_conn, "tuned")
+        file_conn.execute("CREATE TABLE t (x)")
+        file_conn.execute("INSERT INTO t VALUES (1)")
+        file_conn.commit()
+
+        busy, wal_pages, checkpointed = checkpoint(file_conn)
+
+        assert busy == 0
+        assert wal_pages == checkpointed
+
+    @pytest.mark.asyncio
+    async def test_pool_connections_use_profile(self, tmp_path):
+        """Тест: профиль применяется к каждому подключению пула"""
+        db = AsyncDatabase(str(tmp_path / "pool.db"), max_workers=1, profile="tuned")
+        try:
+            settings = await db.run(read_settings)
+        finally:
+            await db.close()
+
+        assert settings["journal_mode"] == "wal"
+        assert settings["temp_store"] == 2
@@ -0,0 +1,129 @@
+"""
+Тесты параллельной обработки обновлений с очередью на пользователя
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+import pytest
+from telegram import Chat, Message, Update, User
+from telegram.ext import ApplicationBuilder, ExtBot, MessageHandler, filters
+import main
+from booktracker.updates import PerUserUpdateProcessor
+
+
+def fake_update(user_id):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=None)
+
+
+class Recorder:
+    """Обработчик, запоминающий порядок и одновременность вызовов"""
+
+    def __init__(self, seed=1):
+        self.rng = random.Random(seed)
+        self.order = {}
+        self.running = set()
+        self.users_running = set()
+        self.overlaps = 0
+        self.max_running = 0
+
+    async def handle(self, user_id, seq):
+        if user_id in self.users_running:
+            self.overlaps += 1
+        self.users_running.add(user_id)
+        self.running.add((user_id, seq))
+        self.max_running = max(self.max_running, len(self.running))
+        await asyncio.sleep(self.rng.uniform(0, 0.005))
+        self.order.setdefault(user_id, []).append(seq)
+        self.running.discard((user_id, seq))
+        self.users_running.discard(user_id)
+
+
+class TestPerUserUpdateProcessor:
+    """Тесты порядка и предела одновременных обновлений"""
+
+    @pytest.mark.asyncio
+    async def test_interleaved_users(self):
+        """Тест: 30 пользователей вперемешку — параллельно до предела, у каждого по порядку"""
+        processor = PerUserUpdateProcessor(4)
+        recorder = Recorder()
+        tasks = [asyncio.create_task(processor.process_update(fake_update(user_id),
+                                                              recorder.handle(user_id, seq)))
+                 for seq in range(5) for user_id in range(1, 31)]
+
+        await asyncio.gather(*tasks)
+
+        assert recorder.order == {user_id: [0, 1, 2, 3, 4] for user_id in range(1, 31)}
+        assert recorder.overlaps == 0
+        assert recorder.max_running == 4
+        assert processor.waiting_users == 0
+
+    @pytest.mark.asyncio
+    async def test_busy_user_does_not_take_all_slots(self):
+        """Тест: очередь из 20 обновлений одного пользователя не задерживает другого"""
+        processor = PerUserUpdateProcessor(2)
+        finished = []
+
+        async def slow(seq):
+            await asyncio.sleep(0.01)
+            finished.append(("busy", seq))
+
+        async def quick():
+            finished.append(("other", 0))
+
+        tasks = [asyncio.create_task(processor.process_update(fake_update(1), slow(seq))) for seq in range(20)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(processor.process_update(fake_update(2), quick())))
+        await asyncio.gather(*tasks)
+
+        assert finished.index(("other", 0)) <= 1
+
+
+class TestApplicationUpdates:
+    """Тесты обработки через Application"""
+
+    @pytest.mark.asyncio
+    async def test_conversation_steps_stay_in_order(self, monkeypatch):
+        """Тест: сообщения многих пользователей из update_queue — у каждого в порядке отправки"""
+        async def get_me(bot, *_args, **_kwargs):
+            bot._bot_user = User(1, "BookTracker", True, username="booktracker_bot")
+            return bot._bot_user
+
+        monkeypatch.setattr(ExtBot, "get_me", get_me)
+        app = ApplicationBuilder().token("123:abc").updater(None).concurrent_updates(
+            PerUserUpdateProcessor(8)).build()
+        recorder = Recorder(seed=2)
+
+        async def on_message(update, _context):
+            await recorder.handle(update.effective_user.id, int(update.message.text))
+
+        app.add_handler(MessageHandler(filters.TEXT, on_message))
+        update_id = 0
+        async with app:
+            await app.start()
+            for seq in range(4):
+                for user_id in range(1, 21):
+                    update_id += 1
+                    user = User(user_id, f"Читатель {user_id}", False)
+                    message = Message(update_id, None, Chat(user_id, Chat.PRIVATE), from_user=user, text=str(seq))
+                    message.set_bot(app.bot)
+                    await app.update_queue.put(Update(update_id, message=message))
+            async def handled():
+                while sum(map(len, recorder.order.values())) < update_id:
+                    await asyncio.sleep(0.01)
+
+            await asyncio.wait_for(handled(), 5)
+            await app.stop()
+
+        assert recorder.order == {user_id: [0, 1, 2, 3] for user_id in range(1, 21)}
+        assert recorder.overlaps == 0
+        assert 1 < recorder.max_running <= 8
+
+    def test_bot_uses_processor(self, monkeypatch):
+        """Тест: бот собирается с очередью на пользователя и пределом CONCURRENT_UPDATES"""
+        monkeypatch.setattr(main, "TOKEN", "123:abc")
+        monkeypatch.setattr(main, "CONCURRENT_UPDATES", 5)
+
+        app = main.build_application()
+
+        assert isinstance(app.update_processor, PerUserUpdateProcessor)
+        assert app.update_processor.max_concurrent_updates == 5
@@ -63,16 +63,17 @@ class TestExportLibrary:
     """Тесты для функции экспорта библиотеки"""
 
     @pytest.mark.asyncio
-    async def test_export_library_empty(self, mock_update, mock_context, mock_db_connection):
+    async def test_export_library_empty(self, mock_update, mock_context, mock_db_connection, jobs):
         """Тест экспорта пустой библиотеки"""
         await export_library(mock_update, mock_context)
-        # Для пустой библиотеки должно быть сообщение, а не документ
-        assert mock_update.message.reply_text.called
-        response_text = mock_update.message.reply_text.call_args[0][0].lower()
+        await jobs.join()
+        # Для пустой библиотеки сообщение о задании правится на ответ, документа нет
+        mock_update.message.reply_document.assert_not_called()
+        response_text = mock_update.message.reply_text.return_value.edit_text.call_args[0][0].lower()
         assert "библиотека пуста" in response_text
 
     @pytest.mark.asyncio
-    async def test_export_library_with_data(self, mock_update, mock_context, mock_db_connection):
+    async def test_export_library_with_data(self, mock_update, mock_context, mock_db_connection, jobs):
         """Тест экспорта библиотеки с данными"""
         # Подготовка тестовых данных
         cursor = mock_db_connection.cursor()
@@ -90,6 +91,7 @@ class TestExportLibrary:
         mock_db_connection.commit()
 
         await export_library(mock_update, mock_context)
+        await jobs.join()
         assert mock_update.message.reply_document.called
         call_args = mock_update.message.reply_document.call_args[1]
         assert 'filename' in call_args
@@ -0,0 +1,116 @@
+"""
+Тесты приёма обновлений вебхуком
+"""
+import socket
+from unittest.mock import AsyncMock, MagicMock
+import httpx
+import pytest
+from telegram import User
+from telegram.ext import ApplicationBuilder, ExtBot
+import main
+
+SECRET = "s3cret_token-1"
+
+
+def message_update(update_id, user_id=12345, text="/start"):
+    user = {"id": user_id, "is_bot": False, "first_name": "Читатель"}
+    return {"update_id": update_id, "message": {"message_id": update_id, "date": 0, "text": text,
+                                                "chat": {"id": user_id, "type": "private"}, "from": user}}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+async def webhook_app(monkeypatch):
+    """Приложение с запущенным сервером вебхука PTB; setWebhook не уходит в Telegram"""
+    pytest.importorskip("tornado")
+
+    async def get_me(bot, *_args, **_kwargs):
+        bot._bot_user = User(1, "BookTracker", True, username="booktracker_bot")
+        return bot._bot_user
+
+    monkeypatch.setattr(ExtBot, "get_me", get_me)
+    monkeypatch.setattr(ExtBot, "set_webhook", AsyncMock(return_value=True))
+    app = ApplicationBuilder().token("123:abc").build()
+    port = free_port()
+    await app.initialize()
+    await app.updater.start_webhook(listen="127.0.0.1", port=port, url_path="hook", secret_token=SECRET,
+                                    webhook_url="https://bot.example.com/hook")
+    app.port = port
+    yield app
+    await app.updater.stop()
+    await app.shutdown()
+
+
+class TestWebhookServer:
+    """Тесты сервера вебхука PTB"""
+
+    @pytest.mark.asyncio
+    async def test_updates_over_keep_alive_connection(self, webhook_app):
+        """Тест: несколько обновлений по одному соединению попадают в очередь приложения по порядку"""
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{webhook_app.port}") as client:
+            statuses = [(await client.post("/hook", json=message_update(update_id),
+                                           headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})).status_code
+                        for update_id in (1, 2, 3)]
+
+        queue = webhook_app.update_queue
+        updates = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert statuses == [200, 200, 200]
+        assert [u.update_id for u in updates] == [1, 2, 3]
+        assert updates[0].effective_user.id == 12345 and updates[0].message.text == "/start"
+
+    @pytest.mark.asyncio
+    async def test_rejected_requests(self, webhook_app):
+        """Тест: чужой секрет, путь и битый JSON отклоняются, в очередь ничего не попадает"""
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{webhook_app.port}") as client:
+            statuses = [
+                (await client.post("/hook", json=message_update(1),
+                                   headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})).status_code,
+                (await client.post("/hook", json=message_update(1))).status_code,
+                (await client.post("/other", json=message_update(1),
+                                   headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})).status_code,
+                (await client.post("/hook", content=b"{not json",
+                                   headers={"X-Telegram-Bot-Api-Secret-Token": SECRET,
+                                            "Content-Type": "application/json"})).status_code,
+            ]
+
+        # Битый JSON PTB отклоняет ошибкой сервера — Telegram такого не шлёт, важно лишь, что не 200
+        assert statuses[:3] == [403, 403, 404] and statuses[3] >= 400
+        assert webhook_app.update_queue.empty()
+
+
+class TestMain:
+    """Тесты выбора режима при запуске"""
+
+    @pytest.fixture
+    def app(self, monkeypatch):
+        app = MagicMock()
+        monkeypatch.setattr(main, "migrate_path", lambda _path: 11)
+        monkeypatch.setattr(main, "build_application", lambda: app)
+        return app
+
+    def test_webhook_mode(self, app, monkeypatch):
+        """Тест: WEBHOOK_URL задан — Application.run_webhook с путём из адреса и секретом"""
+        monkeypatch.setattr(main, "WEBHOOK_URL", "https://bot.example.com/telegram/hook")
+        monkeypatch.setattr(main, "WEBHOOK_SECRET", SECRET)
+
+        main.main()
+
+        app.run_polling.assert_not_called()
+        app.run_webhook.assert_called_once_with(
+            listen=main.WEBHOOK_LISTEN, port=main.WEBHOOK_PORT, url_path="telegram/hook",
+            webhook_url="https://bot.example.com/telegram/hook", secret_token=SECRET,
+            max_connections=main.WEBHOOK_MAX_CONNECTIONS)
+
+    def test_polling_mode(self, app, monkeypatch):
+        """Тест: без WEBHOOK_URL — опрос getUpdates"""
+        monkeypatch.setattr(main, "WEBHOOK_URL", None)
+
+        main.main()
+
+        app.run_polling.assert_called_once_with()
+        app.run_webhook.assert_not_called()